@@ -8,6 +8,7 @@ import {
 } from '@chakra-ui/react';
 import { AddIcon, EditIcon, DeleteIcon, ChevronLeftIcon, ChevronRightIcon } from '@chakra-ui/icons';
 import { Helmet } from 'react-helmet-async';
+import { fetchAllPages } from '../../utils/fetchAllPages';
 
 type Contact = {
   id: string;
@@ -39,16 +40,11 @@ export default function Contact() {
 
   const fetchContacts = async () => {
     try {
-      const res = await fetch("http://localhost:8000/api/v1/contact", {
+      const data = await fetchAllPages<Contact>("http://localhost:8000/api/v1/contact/", "contacts", {
         method: "GET",
         credentials: "include"
       });
-      const data = await res.json();
-      console.log(data);
-
-      if (res.status === 200) {
-        setContacts(data);
-      }
+      setContacts(data);
     } catch (error) {
       throw error;
     }
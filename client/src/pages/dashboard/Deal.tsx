@@ -10,6 +10,7 @@ import { AddIcon, EditIcon, DeleteIcon, DownloadIcon, ChevronLeftIcon, ChevronRi
 import jsPDF from 'jspdf';
 import 'jspdf-autotable';
 import { Helmet } from 'react-helmet-async';
+import { fetchAllPages } from '../../utils/fetchAllPages';
 
 type Contact = {
   id: string;
@@ -43,11 +44,9 @@ export default function Deal() {
   const fetchDeals = useCallback(async () => {
     setIsLoading(true);
     try {
-      const res = await fetch('http://localhost:8000/api/v1/deal', {
+      const data = await fetchAllPages<Deal>('http://localhost:8000/api/v1/deal/', 'deals', {
         credentials: 'include'
       });
-      if (!res.ok) throw new Error('Deals fetching failed');
-      const data = await res.json();
       setAllDeals(data);
       setFilteredDeals(data);
     } catch (error) {
@@ -87,11 +86,9 @@ export default function Deal() {
   const fetchContacts = async () => {
     setIsContactsLoading(true);
     try {
-      const res = await fetch('http://localhost:8000/api/v1/contact', {
+      const data = await fetchAllPages<Contact>('http://localhost:8000/api/v1/contact/', 'contacts', {
         credentials: 'include'
       });
-      if (!res.ok) throw new Error('Contacts fetching failed');
-      const data = await res.json();
       setContacts(data);
     } catch (error) {
       console.error('Error fetching contacts:', error);
@@ -8,6 +8,7 @@ import {
 } from '@chakra-ui/react';
 import { AddIcon, EditIcon, DeleteIcon, ChevronLeftIcon, ChevronRightIcon } from '@chakra-ui/icons';
 import { Helmet } from 'react-helmet-async';
+import { fetchAllPages } from '../../utils/fetchAllPages';
 
 type Contact = {
   id: string;
@@ -41,11 +42,9 @@ export default function Ticket() {
   const fetchTickets = useCallback(async () => {
     setIsLoading(true);
     try {
-      const res = await fetch('http://localhost:8000/api/v1/ticket', {
+      const data = await fetchAllPages<Ticket>('http://localhost:8000/api/v1/ticket/', 'tickets', {
         credentials: 'include'
       });
-      if (!res.ok) throw new Error('Tickets fetching failed');
-      const data = await res.json();
       setTickets(data);
     } catch (error) {
       console.error('Error fetching tickets:', error);
@@ -63,11 +62,9 @@ export default function Ticket() {
   const fetchContacts = async () => {
     setIsContactsLoading(true);
     try {
-      const res = await fetch('http://localhost:8000/api/v1/contact', {
+      const data = await fetchAllPages<Contact>('http://localhost:8000/api/v1/contact/', 'contacts', {
         credentials: 'include'
       });
-      if (!res.ok) throw new Error('Contacts fetching failed');
-      const data = await res.json();
       setContacts(data);
     } catch (error) {
       console.error('Error fetching contacts:', error);
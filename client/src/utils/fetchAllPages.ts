@@ -0,0 +1,20 @@
+// List endpoints are cursor-paginated: { <key>: [...], next_cursor, has_more }.
+// Follows next_cursor until the last page and returns the concatenated items.
+export async function fetchAllPages<T>(url: string, key: string, init?: RequestInit): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const params = new URLSearchParams({ limit: '200' });
+    if (cursor) params.set('cursor', cursor);
+
+    const res = await fetch(`${url}?${params.toString()}`, init);
+    if (!res.ok) throw new Error(`Request to ${url} failed with status ${res.status}`);
+
+    const data = await res.json();
+    items.push(...data[key]);
+    cursor = data.has_more ? data.next_cursor : null;
+  } while (cursor);
+
+  return items;
+}
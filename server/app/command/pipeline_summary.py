@@ -0,0 +1,44 @@
+# Maintenance for the deal_pipeline_summary table.
+#
+#   python -m app.command.pipeline_summary rebuild
+#   python -m app.command.pipeline_summary check
+#
+# "rebuild" recomputes the table from deals; "check" compares it with a full
+# GROUP BY and exits with status 1 if anything differs.
+import argparse
+import asyncio
+import json
+import sys
+
+from app.database import AsyncSessionLocal
+from app.service.pipeline_service import PipelineService
+
+
+async def rebuild() -> int:
+    async with AsyncSessionLocal() as db:
+        rows = await PipelineService.rebuild(db)
+    print(f"Rebuilt deal_pipeline_summary: {rows} rows")
+    return 0
+
+
+async def check() -> int:
+    async with AsyncSessionLocal() as db:
+        mismatches = await PipelineService.check(db)
+    if mismatches:
+        print(json.dumps(mismatches, indent=2))
+        print(f"{len(mismatches)} mismatched rows", file=sys.stderr)
+        return 1
+    print("deal_pipeline_summary is consistent")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or check the deal pipeline summary.")
+    parser.add_argument("action", choices=["rebuild", "check"])
+    args = parser.parse_args()
+    command = rebuild if args.action == "rebuild" else check
+    sys.exit(asyncio.run(command()))
+
+
+if __name__ == "__main__":
+    main()
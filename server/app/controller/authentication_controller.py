@@ -1,20 +1,21 @@
 from fastapi import APIRouter, Response, Request, HTTPException, Depends
 from app.service.authentication_service import AuthenticationService
 from app.schema.authentication_schema import LoginUser, RegisterUser
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import get_db
 import jwt
 from app.util.helper import Helper
 from app.depend.authenticated_user import authenticated_user
 from typing import Dict
+from app.util.query_stats import query_budget
 
 router = APIRouter()
 helper = Helper()
 
 
 @router.post("/login")
-async def login(user: LoginUser, response: Response, db: Session = Depends(get_db)):
-    result = AuthenticationService.login(
+async def login(user: LoginUser, response: Response, db: AsyncSession = Depends(get_db)):
+    result = await AuthenticationService.login(
         email=user.email, password=user.password, db=db
     )
     response.set_cookie(key="access_token", value=result["access_token"], httponly=True)
@@ -25,24 +26,24 @@ async def login(user: LoginUser, response: Response, db: Session = Depends(get_d
 
 
 @router.post("/register", status_code=201)
-async def register(user: RegisterUser, db: Session = Depends(get_db)):
-    return AuthenticationService.register(payload=user, db=db)
+async def register(user: RegisterUser, db: AsyncSession = Depends(get_db)):
+    return await AuthenticationService.register(payload=user, db=db)
 
 
-@router.get("/private")
+@router.get("/private", dependencies=[query_budget(1)])
 async def private_route(user=Depends(authenticated_user)):
     return {"message": f"Welcome {user["username"]}, this is a private route."}
 
 
 @router.post("/verify", status_code=200)
-async def verify_user(request: Request, db: Session = Depends(get_db)):
+async def verify_user(request: Request, db: AsyncSession = Depends(get_db)):
     try:
         access_token = request.cookies.get("access_token")
         refresh_token = request.cookies.get("refresh_token")
 
         if access_token and refresh_token:
             user_id = helper.decode_jwt(token=access_token)
-            result = AuthenticationService.verify_user(user_id, db=db)
+            result = await AuthenticationService.verify_user(user_id, db=db)
 
             if result:
                 return {
@@ -1,50 +1,161 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, Header, Query, Response, status
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.depend.authenticated_user import authenticated_user
-from ..schema.contact_schema import ContactCreate, ContactShow, ContactList, ContactUpdate
+from ..schema.bulk_schema import BulkDelete, BulkDeleteResult
+from ..schema.job_schema import JobShow
+from ..schema.contact_schema import (
+    ContactCreate,
+    ContactShow,
+    ContactDetail,
+    ContactList,
+    ContactUpdate,
+    ContactBulkResult,
+)
 from ..service.contact_service import ContactService
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..model import User
+from ..util.bulk import Bulk
+from ..util.etag import ETag
+from ..util.export import Export
+from ..util.include import Include
+from ..util.job_runner import job_runner
+from ..util.pagination import Pagination
+from ..util.serializer import Serializer
+from ..util.search import Search
+from ..util.query_stats import query_budget
 
 router = APIRouter()
+Serializer.prepare(ContactShow, ContactDetail, ContactList)
 
 @router.post("/", response_model=ContactShow, status_code=status.HTTP_201_CREATED)
-def create_contact(
+async def create_contact(
     contact: ContactCreate, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
     current_user: dict = Depends(authenticated_user)
 ):
-    return ContactService.create(db, contact, current_user["id"])
+    return await ContactService.create(db, contact, current_user["id"])
 
-@router.get("/")
-def get_all_contacts(
-    db: Session = Depends(get_db), 
+@router.post("/bulk", response_model=ContactBulkResult)
+async def bulk_create_contacts(
+    contacts: List[Dict[str, Any]] = Body(..., min_length=1, max_length=Bulk.MAX_ITEMS),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(authenticated_user)
 ):
-    return ContactService.get_all(db, current_user["id"])
+    return await ContactService.bulk_create(db, contacts, current_user["id"])
 
-@router.get("/{contact_id}", response_model=ContactShow)
-def get_contact(
+@router.put("/bulk", response_model=ContactBulkResult)
+async def bulk_update_contacts(
+    contacts: List[Dict[str, Any]] = Body(..., min_length=1, max_length=Bulk.MAX_ITEMS),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(authenticated_user)
+):
+    return await ContactService.bulk_update(db, contacts, current_user["id"])
+
+@router.delete("/bulk", response_model=BulkDeleteResult, status_code=status.HTTP_202_ACCEPTED)
+async def bulk_delete_contacts(
+    payload: BulkDelete,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(authenticated_user)
+):
+    # Each contact is purged by its own background job, as in delete_contact.
+    result = await ContactService.bulk_delete(db, payload.ids, current_user["id"])
+    job_runner.wake()
+    return result
+
+@router.get("/", response_model=ContactList, dependencies=[query_budget(3)])
+async def get_all_contacts(
+    limit: int = Query(Pagination.DEFAULT_LIMIT, ge=1, le=Pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    include: Optional[str] = Query(None, pattern=Include.pattern("counts")),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db), 
+    current_user: User = Depends(authenticated_user)
+):
+    if include:
+        # Counts change with the deals and tickets, which the page ETag
+        # does not cover, so this variant is not cached.
+        result = await ContactService.get_all(db, current_user["id"], limit, cursor, counts=True)
+        return Serializer.response(ContactList, result, exclude_unset=True)
+    if if_none_match:
+        etag = await ContactService.get_all_version(db, current_user["id"], limit, cursor)
+        if ETag.matches_none(if_none_match, etag):
+            return ETag.not_modified(etag)
+    result = await ContactService.get_all(db, current_user["id"], limit, cursor)
+    etag = ETag.for_page(result["contacts"], result["next_cursor"])
+    return Serializer.response(ContactList, result, headers={"ETag": etag}, exclude_unset=True)
+
+@router.get("/export")
+async def export_contacts(
+    format: str = Query("ndjson", pattern=Export.FORMAT_PATTERN),
+    updated_since: Optional[datetime] = None,
+    current_user: User = Depends(authenticated_user)
+):
+    return StreamingResponse(
+        ContactService.export(current_user["id"], format, updated_since),
+        media_type=Export.media_type(format),
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
+
+@router.get("/search", response_model=ContactList, dependencies=[query_budget(2)])
+async def search_contacts(
+    q: str = Query(..., min_length=1, max_length=Search.MAX_QUERY_LENGTH),
+    limit: int = Query(Pagination.DEFAULT_LIMIT, ge=1, le=Pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(authenticated_user)
+):
+    result = await ContactService.search(db, current_user["id"], q, limit, cursor)
+    return Serializer.response(ContactList, result, exclude_unset=True)
+
+# Authentication, the contact and one query per included child type.
+@router.get("/{contact_id}", response_model=ContactDetail, dependencies=[query_budget(4)])
+async def get_contact(
     contact_id: int, 
-    db: Session = Depends(get_db), 
+    include: Optional[str] = Query(None, pattern=Include.pattern("deals", "tickets", "counts")),
+    child_limit: int = Query(Include.DEFAULT_CHILD_LIMIT, ge=1, le=Include.MAX_CHILD_LIMIT),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db), 
     current_user: User = Depends(authenticated_user)
 ):
-    return ContactService.get_by_id(db, contact_id, current_user["id"])
+    if include:
+        # Like the list with counts, the expanded view carries no ETag.
+        detail = await ContactService.get_detail(
+            db, contact_id, current_user["id"], Include.parse(include), child_limit
+        )
+        return Serializer.response(ContactDetail, detail, exclude_unset=True)
+    if if_none_match:
+        etag = await ContactService.get_version(db, contact_id, current_user["id"])
+        if ETag.matches_none(if_none_match, etag):
+            return ETag.not_modified(etag)
+    contact = await ContactService.get_by_id(db, contact_id, current_user["id"])
+    return Serializer.response(ContactShow, contact, headers={"ETag": ETag.for_row(contact)})
 
 @router.put("/{contact_id}", response_model=ContactShow)
-def update_contact(
+async def update_contact(
     contact_id: int, 
     contact: ContactUpdate, 
-    db: Session = Depends(get_db), 
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db), 
     current_user: User = Depends(authenticated_user)
 ):
-    return ContactService.update(db, contact_id, contact, current_user["id"])
+    updated = await ContactService.update(db, contact_id, contact, current_user["id"], if_match)
+    response.headers["ETag"] = ETag.for_row(updated)
+    return updated
 
-@router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_contact(
+@router.delete("/{contact_id}", response_model=JobShow, status_code=status.HTTP_202_ACCEPTED)
+async def delete_contact(
     contact_id: int, 
-    db: Session = Depends(get_db), 
+    response: Response,
+    db: AsyncSession = Depends(get_db), 
     current_user: User = Depends(authenticated_user)
 ):
-    ContactService.delete(db, contact_id, current_user["id"])
-    return {"message": "Contact deleted successfully"}
\ No newline at end of file
+    # The contact and its records are removed by a background job; its
+    # progress is at the Location URL.
+    job = await ContactService.delete(db, contact_id, current_user["id"])
+    job_runner.wake()
+    response.headers["Location"] = f"/api/v1/job/{job.id}"
+    return job
\ No newline at end of file
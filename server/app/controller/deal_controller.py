@@ -1,27 +1,122 @@
-from fastapi import APIRouter, Depends, status
-from app.schema.deal_schema import DealCreate, DealUpdate, DealShow
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, Header, Query, Response, status
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from app.schema.bulk_schema import BulkDelete, BulkDeleteResult
+from app.schema.deal_schema import DealCreate, DealUpdate, DealShow, DealList, DealBulkResult, PipelineSummary
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.service.deal_service import DealService
-from ..database import get_db
+from app.service.pipeline_service import PipelineService
+from app.depend.authenticated_user import authenticated_user
+from ..database import get_db, get_read_db
+from ..util.bulk import Bulk
+from ..util.etag import ETag
+from ..util.export import Export
+from ..util.pagination import Pagination
+from ..util.serializer import Serializer
+from ..util.query_stats import query_budget
 
 router = APIRouter()
+Serializer.prepare(DealShow, DealList)
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=DealShow)
-def create_deal(deal: DealCreate, db: Session = Depends(get_db)):
-    return DealService.create(db, deal)
+async def create_deal(
+    deal: DealCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    return await DealService.create(db, deal, current_user["id"])
 
-@router.get("/{deal_id}", response_model=DealShow)
-def get_deal(deal_id: int, db: Session = Depends(get_db)):
-    return DealService.get_by_id(db, deal_id)
+@router.post("/bulk", response_model=DealBulkResult)
+async def bulk_create_deals(
+    deals: List[Dict[str, Any]] = Body(..., min_length=1, max_length=Bulk.MAX_ITEMS),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    return await DealService.bulk_create(db, deals, current_user["id"])
 
-@router.get("/")
-def get_all_deals(db: Session = Depends(get_db)):
-    return DealService.get_all(db)
+@router.put("/bulk", response_model=DealBulkResult)
+async def bulk_update_deals(
+    deals: List[Dict[str, Any]] = Body(..., min_length=1, max_length=Bulk.MAX_ITEMS),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    return await DealService.bulk_update(db, deals, current_user["id"])
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def bulk_delete_deals(
+    payload: BulkDelete,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    return await DealService.bulk_delete(db, payload.ids, current_user["id"])
+
+@router.get("/export")
+async def export_deals(
+    format: str = Query("ndjson", pattern=Export.FORMAT_PATTERN),
+    updated_since: Optional[datetime] = None,
+    current_user: dict = Depends(authenticated_user),
+):
+    return StreamingResponse(
+        DealService.export(current_user["id"], format, updated_since),
+        media_type=Export.media_type(format),
+        headers={"Content-Disposition": f'attachment; filename="deals.{format}"'},
+    )
+
+@router.get("/pipeline", response_model=PipelineSummary, dependencies=[query_budget(2)])
+async def get_pipeline_summary(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    return await PipelineService.summary(db, current_user["id"])
+
+@router.get("/{deal_id}", response_model=DealShow, dependencies=[query_budget(3)])
+async def get_deal(
+    deal_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    if if_none_match:
+        etag = await DealService.get_version(db, deal_id, current_user["id"])
+        if ETag.matches_none(if_none_match, etag):
+            return ETag.not_modified(etag)
+    deal = await DealService.get_by_id(db, deal_id, current_user["id"])
+    return Serializer.response(DealShow, deal, headers={"ETag": ETag.for_row(deal)})
+
+@router.get("/", response_model=DealList, dependencies=[query_budget(3)])
+async def get_all_deals(
+    limit: int = Query(Pagination.DEFAULT_LIMIT, ge=1, le=Pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    if if_none_match:
+        etag = await DealService.get_all_version(db, current_user["id"], limit, cursor)
+        if ETag.matches_none(if_none_match, etag):
+            return ETag.not_modified(etag)
+    result = await DealService.get_all(db, current_user["id"], limit, cursor)
+    etag = ETag.for_page(result["deals"], result["next_cursor"])
+    return Serializer.response(DealList, result, headers={"ETag": etag})
 
 @router.put("/{deal_id}", response_model=DealShow)
-def update_deal(deal_id: int, deal: DealUpdate, db: Session = Depends(get_db)):
-    return DealService.update(db, deal_id, deal)
+async def update_deal(
+    deal_id: int,
+    deal: DealUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    updated = await DealService.update(db, deal_id, current_user["id"], deal, if_match)
+    response.headers["ETag"] = ETag.for_row(updated)
+    return updated
 
 @router.delete("/{deal_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_deal(deal_id: int, db: Session = Depends(get_db)):
-    DealService.delete(db, deal_id)
\ No newline at end of file
+async def delete_deal(
+    deal_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    await DealService.delete(db, deal_id, current_user["id"])
\ No newline at end of file
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.depend.authenticated_user import job_owner
+from ..database import get_db
+from ..schema.job_schema import JobShow
+from ..service.job_service import PURGE_ACCOUNT, JobService
+from ..util.query_stats import query_budget
+
+router = APIRouter()
+
+# Read from the primary: a job's progress is committed there batch by batch
+# and clients poll it right after queueing. A deleted account may only read
+# its own purge job.
+@router.get("/{job_id}", response_model=JobShow, dependencies=[query_budget(2)])
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(job_owner)
+):
+    kinds = [PURGE_ACCOUNT] if current_user.get("deleted") else None
+    return await JobService.get_by_id(db, job_id, current_user["id"], kinds)
@@ -0,0 +1,195 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.database import async_engine, replica_set
+from app.util.metrics import metrics
+from app.util.pool_monitor import pool_monitor
+from app.util.password_hasher import password_hasher
+from app.util.idempotency import idempotency_store
+from app.util.job_runner import job_runner
+from app.util.principal_cache import principal_cache
+from app.util.rate_limiter import rate_limiter
+
+router = APIRouter()
+
+
+def _principal_cache_events():
+    stats = principal_cache.stats()
+    return [
+        ({"event": "hit"}, stats["hits"]),
+        ({"event": "miss"}, stats["misses"]),
+        ({"event": "eviction"}, stats["evictions"]),
+        ({"event": "stale_fill"}, stats["stale_fills"]),
+    ]
+
+
+metrics.register(
+    "principal_cache_events_total",
+    "counter",
+    "Principal cache lookups and evictions.",
+    _principal_cache_events,
+)
+metrics.register(
+    "principal_cache_size",
+    "gauge",
+    "Principals currently cached.",
+    lambda: [({}, principal_cache.stats()["size"])],
+)
+metrics.register(
+    "password_hash_pending",
+    "gauge",
+    "Password hash jobs queued or running on the process pool.",
+    lambda: [({}, password_hasher.stats()["pending"])],
+)
+metrics.register(
+    "password_hash_rejected_total",
+    "counter",
+    "Password hash jobs rejected because the pool was saturated.",
+    lambda: [({}, password_hasher.stats()["rejected"])],
+)
+metrics.register(
+    "idempotency_requests_total",
+    "counter",
+    "Requests with an Idempotency-Key, by outcome.",
+    lambda: [
+        ({"result": result}, count) for result, count in sorted(idempotency_store.results.items())
+    ],
+)
+metrics.register(
+    "idempotency_keys",
+    "gauge",
+    "Idempotency keys currently stored.",
+    lambda: [({}, idempotency_store.stats()["size"])],
+)
+metrics.register(
+    "rate_limit_requests_total",
+    "counter",
+    "Requests counted by each rate limit rule, by result.",
+    lambda: [
+        ({"rule": rule, "result": result}, count)
+        for (rule, result), count in sorted(rate_limiter.results.items())
+    ],
+)
+metrics.register(
+    "rate_limit_buckets",
+    "gauge",
+    "Rate limit buckets currently held in memory.",
+    lambda: [({}, rate_limiter.backend.size())],
+)
+
+
+
+def _pool_connections():
+    pool = async_engine.pool
+    return [
+        ({"state": "checked_out"}, pool.checkedout()),
+        ({"state": "idle"}, pool.checkedin()),
+        ({"state": "overflow"}, max(pool.overflow(), 0)),
+    ]
+
+
+metrics.register(
+    "db_pool_connections",
+    "gauge",
+    "Database pool connections by state.",
+    _pool_connections,
+)
+metrics.register(
+    "db_pool_size",
+    "gauge",
+    "Configured database pool size (without overflow).",
+    lambda: [({}, async_engine.pool.size())],
+)
+metrics.register(
+    "db_pool_waiting",
+    "gauge",
+    "Requests currently waiting for a database connection.",
+    lambda: [({}, pool_monitor.stats()["waiting"])],
+)
+metrics.register(
+    "db_pool_wait_seconds",
+    "gauge",
+    "Decaying average time spent waiting for a database connection.",
+    lambda: [({}, round(pool_monitor.average_wait(), 6))],
+)
+metrics.register(
+    "db_pool_timeouts_total",
+    "counter",
+    "Checkouts that gave up after the pool timeout.",
+    lambda: [({}, pool_monitor.stats()["timeouts"])],
+)
+metrics.register(
+    "db_pool_shed_total",
+    "counter",
+    "Requests rejected with 503 because the pool was saturated.",
+    lambda: [({}, pool_monitor.stats()["shed"])],
+)
+
+
+def _replica_stats(key):
+    return [
+        ({"replica": replica["name"]}, float(replica[key]))
+        for replica in replica_set.stats()["replicas"]
+        if replica[key] is not None
+    ]
+
+
+metrics.register(
+    "db_read_sessions_total",
+    "counter",
+    "Read-only sessions by target.",
+    lambda: [
+        ({"target": "primary"}, replica_set.stats()["primary_reads"]),
+        ({"target": "replica"}, replica_set.stats()["replica_reads"]),
+    ],
+)
+metrics.register(
+    "db_replica_healthy",
+    "gauge",
+    "Whether the last probe of the read replica succeeded.",
+    lambda: _replica_stats("healthy"),
+)
+metrics.register(
+    "db_replica_lag_seconds",
+    "gauge",
+    "Replication lag of the read replica at the last probe.",
+    lambda: _replica_stats("lag"),
+)
+metrics.register(
+    "db_replica_connections_checked_out",
+    "gauge",
+    "Connections checked out from the read replica pool.",
+    lambda: _replica_stats("checked_out"),
+)
+
+metrics.register(
+    "jobs_total",
+    "counter",
+    "Background job attempts finished by this process, by kind and outcome.",
+    lambda: [
+        ({"kind": kind, "result": result}, count)
+        for (kind, result), count in sorted(job_runner.results.items())
+    ],
+)
+metrics.register(
+    "job_batches_total",
+    "counter",
+    "Batches committed by background jobs, by kind.",
+    lambda: [({"kind": kind}, count) for kind, count in sorted(job_runner.batches.items())],
+)
+metrics.register(
+    "job_rows_deleted_total",
+    "counter",
+    "Rows deleted by background jobs, by kind.",
+    lambda: [({"kind": kind}, count) for kind, count in sorted(job_runner.rows.items())],
+)
+metrics.register(
+    "jobs_running",
+    "gauge",
+    "Background jobs running in this process.",
+    lambda: [({}, job_runner.running())],
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,27 +1,126 @@
-from fastapi import APIRouter, Depends, status
-from app.schema.ticket_schema import TicketCreate, TicketUpdate, TicketShow
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, Header, Query, Response, status
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from app.schema.bulk_schema import BulkDelete, BulkDeleteResult
+from app.schema.ticket_schema import TicketCreate, TicketUpdate, TicketShow, TicketList, TicketBulkResult
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.service.ticket_service import TicketService
-from ..database import get_db
+from app.depend.authenticated_user import authenticated_user
+from ..database import get_db, get_read_db
+from ..util.bulk import Bulk
+from ..util.etag import ETag
+from ..util.export import Export
+from ..util.pagination import Pagination
+from ..util.serializer import Serializer
+from ..util.search import Search
+from ..util.query_stats import query_budget
 
 router = APIRouter()
+Serializer.prepare(TicketShow, TicketList)
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=TicketShow)
-def create_ticket(ticket: TicketCreate, db: Session = Depends(get_db)):
-    return TicketService.create(db, ticket)
+async def create_ticket(
+    ticket: TicketCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    return await TicketService.create(db, ticket, current_user["id"])
 
-@router.get("/{ticket_id}", response_model=TicketShow)
-def get_ticket(ticket_id: int, db: Session = Depends(get_db)):
-    return TicketService.get_by_id(db, ticket_id)
+@router.post("/bulk", response_model=TicketBulkResult)
+async def bulk_create_tickets(
+    tickets: List[Dict[str, Any]] = Body(..., min_length=1, max_length=Bulk.MAX_ITEMS),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    return await TicketService.bulk_create(db, tickets, current_user["id"])
 
-@router.get("/")
-def get_all_tickets(db: Session = Depends(get_db)):
-    return TicketService.get_all(db)
+@router.put("/bulk", response_model=TicketBulkResult)
+async def bulk_update_tickets(
+    tickets: List[Dict[str, Any]] = Body(..., min_length=1, max_length=Bulk.MAX_ITEMS),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    return await TicketService.bulk_update(db, tickets, current_user["id"])
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def bulk_delete_tickets(
+    payload: BulkDelete,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    return await TicketService.bulk_delete(db, payload.ids, current_user["id"])
+
+@router.get("/export")
+async def export_tickets(
+    format: str = Query("ndjson", pattern=Export.FORMAT_PATTERN),
+    updated_since: Optional[datetime] = None,
+    current_user: dict = Depends(authenticated_user),
+):
+    return StreamingResponse(
+        TicketService.export(current_user["id"], format, updated_since),
+        media_type=Export.media_type(format),
+        headers={"Content-Disposition": f'attachment; filename="tickets.{format}"'},
+    )
+
+@router.get("/search", response_model=TicketList, dependencies=[query_budget(2)])
+async def search_tickets(
+    q: str = Query(..., min_length=1, max_length=Search.MAX_QUERY_LENGTH),
+    limit: int = Query(Pagination.DEFAULT_LIMIT, ge=1, le=Pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    result = await TicketService.search(db, current_user["id"], q, limit, cursor)
+    return Serializer.response(TicketList, result)
+
+@router.get("/{ticket_id}", response_model=TicketShow, dependencies=[query_budget(3)])
+async def get_ticket(
+    ticket_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    if if_none_match:
+        etag = await TicketService.get_version(db, ticket_id, current_user["id"])
+        if ETag.matches_none(if_none_match, etag):
+            return ETag.not_modified(etag)
+    ticket = await TicketService.get_by_id(db, ticket_id, current_user["id"])
+    return Serializer.response(TicketShow, ticket, headers={"ETag": ETag.for_row(ticket)})
+
+@router.get("/", response_model=TicketList, dependencies=[query_budget(3)])
+async def get_all_tickets(
+    limit: int = Query(Pagination.DEFAULT_LIMIT, ge=1, le=Pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    if if_none_match:
+        etag = await TicketService.get_all_version(db, current_user["id"], limit, cursor)
+        if ETag.matches_none(if_none_match, etag):
+            return ETag.not_modified(etag)
+    result = await TicketService.get_all(db, current_user["id"], limit, cursor)
+    etag = ETag.for_page(result["tickets"], result["next_cursor"])
+    return Serializer.response(TicketList, result, headers={"ETag": etag})
 
 @router.put("/{ticket_id}", response_model=TicketShow)
-def update_ticket(ticket_id: int, ticket: TicketUpdate, db: Session = Depends(get_db)):
-    return TicketService.update(db, ticket_id, ticket)
+async def update_ticket(
+    ticket_id: int,
+    ticket: TicketUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    updated = await TicketService.update(db, ticket_id, current_user["id"], ticket, if_match)
+    response.headers["ETag"] = ETag.for_row(updated)
+    return updated
 
 @router.delete("/{ticket_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_ticket(ticket_id: int, db: Session = Depends(get_db)):
-    TicketService.delete(db, ticket_id)
\ No newline at end of file
+async def delete_ticket(
+    ticket_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(authenticated_user),
+):
+    await TicketService.delete(db, ticket_id, current_user["id"])
\ No newline at end of file
@@ -1,27 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import get_db
 from app.schema.user_schema import UserUpdate, PasswordChange
 from app.service.user_service import UserService
 from app.depend.authenticated_user import authenticated_user
+from app.util.job_runner import job_runner
 
 router = APIRouter()
 
 @router.put("/profile")
-def update_profile(user_update: UserUpdate, current_user: dict = Depends(authenticated_user), db: Session = Depends(get_db)):
-    updated_user = UserService.update_profile(db, current_user["id"], user_update)
+async def update_profile(user_update: UserUpdate, current_user: dict = Depends(authenticated_user), db: AsyncSession = Depends(get_db)):
+    updated_user = await UserService.update_profile(db, current_user["id"], user_update)
     if updated_user:
         return {"message": "Profile updated successfully"}
     raise HTTPException(status_code=404, detail="User not found")
 
 @router.put("/change-password")
-def change_password(password_change: PasswordChange, current_user: dict = Depends(authenticated_user), db: Session = Depends(get_db)):
-    if UserService.change_password(db, current_user["id"], password_change):
+async def change_password(password_change: PasswordChange, current_user: dict = Depends(authenticated_user), db: AsyncSession = Depends(get_db)):
+    if await UserService.change_password(db, current_user["id"], password_change):
         return {"message": "Password changed successfully"}
     raise HTTPException(status_code=400, detail="Invalid current password")
 
-@router.delete("/delete-account")
-def delete_account(current_user: dict = Depends(authenticated_user), db: Session = Depends(get_db)):
-    if UserService.delete_account(db, current_user["id"]):
-        return {"message": "Account deleted successfully"}
+@router.delete("/delete-account", status_code=status.HTTP_202_ACCEPTED)
+async def delete_account(response: Response, current_user: dict = Depends(authenticated_user), db: AsyncSession = Depends(get_db)):
+    job = await UserService.delete_account(db, current_user["id"])
+    if job:
+        job_runner.wake()
+        # The purge job stays readable with the same access token.
+        response.headers["Location"] = f"/api/v1/job/{job.id}"
+        return {"message": "Account deleted successfully", "job_id": job.id}
     raise HTTPException(status_code=404, detail="User not found")
\ No newline at end of file
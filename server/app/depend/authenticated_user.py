@@ -1,30 +1,63 @@
+from typing import Any, Dict, Optional
 from fastapi import Request, HTTPException
-from ..database import SessionLocal
+from sqlalchemy import select
+from ..database import AsyncSessionLocal
 from ..model import User
+from ..util.principal_cache import principal_cache
 import jwt
 
 
-async def authenticated_user(request: Request):
+def _token_user_id(request: Request) -> int:
     access_token = request.cookies.get("access_token")
-    if access_token:
-        try:
-            payload = jwt.decode(access_token, "secret_key", algorithms=["HS256"])
-            user_id = payload.get("payload")["user_id"]  
-            db = SessionLocal()
-            try:
-                user = db.query(User).filter(User.id == user_id).first()
-                if not user:
-                    raise HTTPException(status_code=401, detail="Invalid token")
-                return {
-                    "id": user.id,
-                    "username": user.username,
-                    "email": user.email
-                }
-            finally:
-                db.close()
-        except jwt.ExpiredSignatureError:
-            raise HTTPException(status_code=401, detail="Token has expired")
-        except jwt.InvalidTokenError:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    else:
+    if not access_token:
         raise HTTPException(status_code=401, detail="No access token found")
+    try:
+        payload = jwt.decode(access_token, "secret_key", algorithms=["HS256"])
+        return payload.get("payload")["user_id"]
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token has expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+
+async def _principal(user_id: int) -> Optional[Dict[str, Any]]:
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    # Filled from the primary: a lagging replica could return a row
+    # that was changed or deleted after the last invalidation.
+    version = principal_cache.version()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(User.id, User.username, User.email).where(
+                User.id == user_id, User.deleted_at.is_(None)
+            )
+        )
+        user = result.first()
+    if not user:
+        return None
+    principal = {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email
+    }
+    principal_cache.set(user_id, principal, version)
+    return principal
+
+
+async def authenticated_user(request: Request):
+    principal = await _principal(_token_user_id(request))
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return principal
+
+
+async def job_owner(request: Request):
+    # authenticated_user that also admits a deleted (or already purged)
+    # account, marked "deleted", so its owner can follow the purge job
+    # returned by delete-account. The token signature is still checked.
+    user_id = _token_user_id(request)
+    principal = await _principal(user_id)
+    if principal is None:
+        return {"id": user_id, "deleted": True}
+    return principal
@@ -0,0 +1,23 @@
+import math
+from fastapi import HTTPException
+from ..database import DB_MAX_OVERFLOW, DB_POOL_SIZE, DB_SHED_WAIT_THRESHOLD, async_engine
+from ..util.pool_monitor import pool_monitor
+
+
+async def shed_load():
+    # Fail fast instead of queueing behind an exhausted connection pool:
+    # once checkouts have been waiting longer than the threshold and no
+    # connection is free, new requests get a 503 until the pool recovers.
+    if DB_SHED_WAIT_THRESHOLD <= 0:
+        return
+    wait = pool_monitor.average_wait()
+    if wait < DB_SHED_WAIT_THRESHOLD:
+        return
+    exhausted = async_engine.pool.checkedout() >= DB_POOL_SIZE + DB_MAX_OVERFLOW
+    if exhausted or pool_monitor.waiting:
+        pool_monitor.shed += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please try again.",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
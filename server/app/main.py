@@ -1,22 +1,54 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from .controller import (
     authentication_controller,
     user_controller,
     deal_controller,
     ticket_controller,
     contact_controller,
+    job_controller,
+    metrics_controller,
 )
 
-from .database import engine
-from . import model
+from .database import replica_set
+from app.depend.load_shedding import shed_load
+from app.middleware.idempotency_middleware import IdempotencyMiddleware
 from app.middleware.logging_middleware import logging_middleware
+from app.middleware.rate_limit_middleware import RateLimitMiddleware
+from app.middleware.read_your_writes import read_your_writes_middleware
+from app.middleware.security_middleware import SECURITY_FILTER_ENABLED, SecurityMiddleware
+from app.util.job_runner import job_runner
+from app.util.password_hasher import password_hasher
+from app.util.rate_limiter import rate_limiter
 
-model.Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    replica_set.start()
+    rate_limiter.start()
+    job_runner.start()
+    yield
+    await job_runner.stop()
+    await rate_limiter.stop()
+    await replica_set.stop()
+    password_hasher.shutdown()
 
-app.middleware("http")(logging_middleware)
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Middleware added later wraps middleware added earlier.
+app.middleware("http")(read_your_writes_middleware)
+# Replays are served before the read-your-writes middleware and after rate
+# limiting.
+app.add_middleware(IdempotencyMiddleware)
+# Suspicious bodies are rejected before anything reads them.
+if SECURITY_FILTER_ENABLED:
+    app.add_middleware(SecurityMiddleware)
+# Inside CORS, so a 429 still carries the CORS headers the browser needs to
+# read it, and outside everything that touches the database.
+app.add_middleware(RateLimitMiddleware)
 
 origins = ["http://localhost:5173", "https://localhost:5173"]
 
@@ -27,14 +59,25 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so every response is logged, timed and counted, including
+# rate-limit, security filter and idempotency replay responses.
+app.middleware("http")(logging_middleware)
+
+# Routers that use the database shed load when the connection pool is
+# saturated; /metrics stays reachable.
+db_dependencies = [Depends(shed_load)]
 
 app.include_router(
-    router=authentication_controller.router, prefix="/api/v1/authentication"
+    router=authentication_controller.router,
+    prefix="/api/v1/authentication",
+    dependencies=db_dependencies,
 )
-app.include_router(router=user_controller.router, prefix="/api/v1/user")
-app.include_router(router=deal_controller.router, prefix="/api/v1/deal")
-app.include_router(router=ticket_controller.router, prefix="/api/v1/ticket")
-app.include_router(router=contact_controller.router, prefix="/api/v1/contact")
+app.include_router(router=user_controller.router, prefix="/api/v1/user", dependencies=db_dependencies)
+app.include_router(router=deal_controller.router, prefix="/api/v1/deal", dependencies=db_dependencies)
+app.include_router(router=ticket_controller.router, prefix="/api/v1/ticket", dependencies=db_dependencies)
+app.include_router(router=contact_controller.router, prefix="/api/v1/contact", dependencies=db_dependencies)
+app.include_router(router=job_controller.router, prefix="/api/v1/job", dependencies=db_dependencies)
+app.include_router(router=metrics_controller.router)
 
 
 @app.get("/")
@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.util.helper import Helper
+from app.util.idempotency import (
+    IDEMPOTENCY_MAX_BODY,
+    IDEMPOTENCY_WAIT,
+    IdempotencyStore,
+    StoredResponse,
+    idempotency_store,
+)
+
+MAX_KEY_LENGTH = 255
+# Outcomes worth replaying; anything else (5xx, 408, 409, 425, 429)
+# releases the key so a retry runs again.
+RETRYABLE = {408, 409, 425, 429}
+
+
+def _storable(status: int) -> bool:
+    return status < 500 and status not in RETRYABLE
+
+
+class IdempotencyMiddleware:
+    # Pure ASGI middleware for POST requests with an Idempotency-Key header
+    # from a signed-in user. The first request runs and its response is
+    # stored with a fingerprint of the request; a retry with the same key
+    # gets the stored response back without reaching the application (and
+    # so without touching the database), and a duplicate that arrives while
+    # the first is still running waits for it. Reusing a key for a
+    # different request is a 422.
+    def __init__(self, app: ASGIApp, store: IdempotencyStore = idempotency_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        user_id = None
+        if idempotency_key:
+            user_id = Helper.user_id_from_cookies(headers.get("cookie", ""))
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            await self._reject(scope, receive, send, 400, "Idempotency-Key is too long")
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(
+            b"\0".join([scope["path"].encode(), scope.get("query_string", b""), body])
+        ).hexdigest()
+        key = (user_id, scope["path"], idempotency_key)
+
+        while True:
+            entry = self.store.get(key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                self.store.results["mismatch"] += 1
+                await self._reject(
+                    scope, receive, send, 422,
+                    "Idempotency-Key was already used for a different request",
+                )
+                return
+            if not entry.done.is_set():
+                self.store.results["waited"] += 1
+                try:
+                    await asyncio.wait_for(entry.done.wait(), IDEMPOTENCY_WAIT)
+                except asyncio.TimeoutError:
+                    self.store.results["conflict"] += 1
+                    await self._reject(
+                        scope, receive, send, 409,
+                        "A request with this Idempotency-Key is still being processed",
+                        {"Retry-After": "1"},
+                    )
+                    return
+            if entry.response is not None:
+                self.store.results["replayed"] += 1
+                await self._replay(entry.response, send)
+                return
+            # The original failed and released the key; run this one.
+
+        entry = self.store.begin(key, fingerprint)
+        response = {"status": 500, "headers": [], "body": [], "size": 0}
+        body_sent = False
+
+        async def replay() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture(message: Message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                response["size"] += len(chunk)
+                if response["size"] <= IDEMPOTENCY_MAX_BODY:
+                    response["body"].append(chunk)
+            await send(message)
+
+        stored = None
+        try:
+            await self.app(scope, replay, capture)
+            if _storable(response["status"]) and response["size"] <= IDEMPOTENCY_MAX_BODY:
+                stored = StoredResponse(
+                    response["status"], response["headers"], b"".join(response["body"])
+                )
+                self.store.results["stored"] += 1
+        finally:
+            self.store.finish(key, entry, stored)
+
+    async def _replay(self, stored: StoredResponse, send: Send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": stored.status,
+                "headers": stored.headers + [(b"idempotent-replayed", b"true")],
+            }
+        )
+        await send({"type": "http.response.body", "body": stored.body})
+
+    async def _reject(self, scope, receive, send, status_code: int, detail: str, headers=None):
+        response = JSONResponse({"detail": detail}, status_code=status_code, headers=headers)
+        await response(scope, receive, send)
@@ -1,5 +1,16 @@
 from fastapi import Request
+from logging.handlers import QueueHandler, QueueListener
+from app.util.metrics import metrics
+from app.util.query_stats import (
+    QUERY_BUDGET_STRICT,
+    QueryBudgetExceeded,
+    QueryStats,
+    current_query_stats,
+)
+import atexit
+import json
 import logging
+import queue
 import time
 import os
 
@@ -10,23 +21,110 @@ os.makedirs(log_directory, exist_ok=True)
 # Log dosyasının yolunu belirleyin
 log_file_path = os.path.join(log_directory, "app.log")
 
-# Logging konfigürasyonunu güncelleyin
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    filename=log_file_path,
-    filemode="a",
-)
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line; structured fields are passed to the logger
+    # as extra={"fields": {...}}.
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+# Handlers on the event loop only enqueue records; a background thread owned
+# by the QueueListener formats them and does the file I/O.
+log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+file_handler = logging.FileHandler(log_file_path, mode="a")
+file_handler.setFormatter(JsonFormatter())
+log_listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+
+root_logger = logging.getLogger()
+if not any(isinstance(handler, QueueHandler) for handler in root_logger.handlers):
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(QueueHandler(log_queue))
+    log_listener.start()
+    atexit.register(log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
 
 async def logging_middleware(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    status_code = response.status_code
-    logger.info(
-        f"{request.method} {request.url.path} completed in {process_time:.4f}s with status code {status_code}"
+    start_time = time.perf_counter()
+    # Filled in by the engine hooks for every statement this request runs.
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        response = await call_next(request)
+    except BaseException:
+        record_request(request, 500, start_time, stats)
+        raise
+    finally:
+        current_query_stats.reset(token)
+    # Sent with the headers, so it covers the statements run before the
+    # body; a streamed export runs its queries while the body is sent.
+    response.headers["Server-Timing"] = (
+        f'db;dur={stats.db_time * 1000:.3f};desc="{stats.count} queries", '
+        f"app;dur={(time.perf_counter() - start_time) * 1000:.3f}"
     )
+    # The application keeps adding to stats until the last chunk is out,
+    # so the request is logged, counted and checked against its budget
+    # once the body has been sent.
+    body_iterator = response.body_iterator
 
+    async def send_body():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            record_request(request, response.status_code, start_time, stats)
+
+    response.body_iterator = send_body()
     return response
+
+
+def record_request(request: Request, status_code: int, start_time: float, stats: QueryStats) -> None:
+    process_time = time.perf_counter() - start_time
+    # The matched route template, not the raw path, keeps metric labels
+    # bounded (ids are not part of the label).
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", "<unmatched>")
+    metrics.observe_request(request.method, route_path, status_code, process_time)
+    logger.info(
+        "request completed",
+        extra={
+            "fields": {
+                "method": request.method,
+                "path": request.url.path,
+                "route": route_path,
+                "status_code": status_code,
+                "duration_ms": round(process_time * 1000, 3),
+                "db_queries": stats.count,
+                "db_ms": round(stats.db_time * 1000, 3),
+                "client": request.client.host if request.client else None,
+            }
+        },
+    )
+    check_queries(request.method, route_path, stats)
+
+
+def check_queries(method: str, route_path: str, stats: QueryStats) -> None:
+    for statement, count in stats.repeated():
+        logger.warning(
+            "repeated query, possible N+1",
+            extra={"fields": {"route": route_path, "count": count, "statement": statement}},
+        )
+    if stats.over_budget():
+        message = f"{method} {route_path} ran {stats.count} queries, budget is {stats.budget}"
+        logger.warning(
+            "query budget exceeded",
+            extra={"fields": {"route": route_path, "db_queries": stats.count, "budget": stats.budget}},
+        )
+        if QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
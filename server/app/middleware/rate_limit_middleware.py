@@ -0,0 +1,78 @@
+from typing import Dict, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.util.helper import Helper
+from app.util.rate_limiter import (
+    RATE_LIMIT_TRUST_FORWARDED_FOR,
+    Decision,
+    RateLimiter,
+    rate_limiter,
+)
+
+
+def _client_ip(scope: Scope, headers: Headers) -> Optional[str]:
+    if RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded_for = headers.get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.rsplit(",", 1)[-1].strip()
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def _headers(decision: Decision) -> Dict[str, str]:
+    headers = {
+        "RateLimit-Limit": str(decision.limit),
+        "RateLimit-Remaining": str(decision.remaining),
+        "RateLimit-Reset": str(decision.reset),
+        "RateLimit-Policy": f"{decision.limit};w={int(decision.window)}",
+    }
+    if not decision.allowed:
+        headers["Retry-After"] = str(decision.retry_after)
+    return headers
+
+
+class RateLimitMiddleware:
+    # Pure ASGI middleware: requests over a limit get a 429 before routing,
+    # so no dependency has run and no database session has been opened.
+    # Admitted responses carry the RateLimit-* headers of the tightest
+    # bucket that applied.
+    def __init__(self, app: ASGIApp, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rules = self.limiter.matching(scope["method"], scope["path"])
+        if not rules:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        keys = {"ip": _client_ip(scope, headers)}
+        if any(rule.scope == "user" for rule in rules):
+            user_id = Helper.user_id_from_cookies(headers.get("cookie", ""))
+            keys["user"] = None if user_id is None else str(user_id)
+        decision = await self.limiter.check(rules, keys)
+        if decision is None:
+            await self.app(scope, receive, send)
+            return
+        extra = _headers(decision)
+
+        if not decision.allowed:
+            response = JSONResponse(
+                {"detail": "Too many requests, please try again later."},
+                status_code=429,
+                headers=extra,
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(extra)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
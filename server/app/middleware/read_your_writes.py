@@ -0,0 +1,32 @@
+import time
+from fastapi import Request
+from app.database import READ_YOUR_WRITES_WINDOW, ReadRoute, read_route
+
+STICKY_COOKIE = "db_primary_until"
+
+
+def _sticky(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    # A client that has just written reads from the primary until its
+    # cookie expires, so it never sees a replica that has not caught up yet.
+    route = ReadRoute(primary=_sticky(request))
+    token = read_route.set(route)
+    try:
+        response = await call_next(request)
+    finally:
+        read_route.reset(token)
+    if route.wrote and READ_YOUR_WRITES_WINDOW > 0:
+        response.set_cookie(
+            STICKY_COOKIE,
+            str(time.time() + READ_YOUR_WRITES_WINDOW),
+            max_age=READ_YOUR_WRITES_WINDOW,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
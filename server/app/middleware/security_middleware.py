@@ -1,50 +1,82 @@
-from fastapi import Request, HTTPException
-from app.util.security_rule import SecurityRule
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.util.security_rule import StreamScanner
 import os
 import logging
 
-# Logging klasörünün yolunu belirleyin
-log_directory = os.path.join(os.path.dirname(__file__), "../logs")
-os.makedirs(log_directory, exist_ok=True)
+# Off by default: the command injection rule also matches ';', '$' and '\\'
+# in ordinary JSON bodies.
+SECURITY_FILTER_ENABLED = os.getenv("SECURITY_FILTER_ENABLED", "0") == "1"
+SECURITY_MAX_BODY_SIZE = int(os.getenv("SECURITY_MAX_BODY_SIZE", str(1024 * 1024)))
+# Matched text is logged up to this many characters, never the body.
+LOGGED_MATCH_LENGTH = 32
 
-# Log dosyasının yolunu belirleyin
-log_file_path = os.path.join(log_directory, "security.log")
-
-# Logging konfigürasyonunu güncelleyin
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    filename=log_file_path,
-    filemode="a",
-)
 logger = logging.getLogger(__name__)
 
-async def security_middleware(request: Request, call_next):
-    # İstek gövdesini oku
-    body = await request.body()
-    body_str = body.decode("utf-8")
-    
-    # SQL Injection Tespiti
-    if SecurityRule.detect_sql_injection(body_str):
-        logger.warning(f"SQL Injection attempt detected: {body_str}")
-        raise HTTPException(status_code=400, detail="Potential SQL Injection detected")
-    
-    # XSS Tespiti
-    if SecurityRule.detect_xss(body_str):
-        logger.warning(f"XSS attempt detected: {body_str}")
-        raise HTTPException(status_code=400, detail="Potential XSS attack detected")
-    
-    # Path Traversal Tespiti
-    if SecurityRule.detect_path_traversal(body_str):
-        logger.warning(f"Path Traversal attempt detected: {body_str}")
-        raise HTTPException(status_code=400, detail="Potential Path Traversal attack detected")
-
-    # Command Injection Tespiti
-    if SecurityRule.detect_command_injection(body_str):
-        logger.warning(f"Command Injection attempt detected: {body_str}")
-        raise HTTPException(status_code=400, detail="Potential Command Injection attack detected")
-
-    # İsteği işle ve yanıtı al
-    response = await call_next(request)
-
-    return response
+DETAILS = {
+    "sql_injection": "Potential SQL Injection detected",
+    "xss": "Potential XSS attack detected",
+    "path_traversal": "Potential Path Traversal attack detected",
+    "command_injection": "Potential Command Injection attack detected",
+}
+
+
+class SecurityMiddleware:
+    # Pure ASGI middleware: the request body is scanned chunk by chunk as it
+    # is received, so an attack or an oversized body is rejected before the
+    # rest is read. The buffered body is then replayed to the application.
+    def __init__(self, app: ASGIApp, max_body_size: int = SECURITY_MAX_BODY_SIZE):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        scanner = StreamScanner()
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # Client disconnected before the body was complete.
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_size:
+                await self._reject(scope, receive, send, 413, "Request body too large")
+                return
+            rule = scanner.feed(chunk)
+            if rule is not None:
+                logger.warning(
+                    DETAILS[rule],
+                    extra={
+                        "fields": {
+                            "rule": rule,
+                            "match": scanner.match[:LOGGED_MATCH_LENGTH].decode("utf-8", "replace"),
+                            "method": scope["method"],
+                            "path": scope["path"],
+                        }
+                    },
+                )
+                await self._reject(scope, receive, send, 400, DETAILS[rule])
+                return
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+
+        body_sent = False
+
+        async def replay() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": b"".join(chunks), "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay, send)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, status_code: int, detail: str):
+        response = JSONResponse({"detail": detail}, status_code=status_code)
+        await response(scope, receive, send)
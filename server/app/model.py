@@ -1,6 +1,7 @@
 from .database import Base
-from sqlalchemy import Integer, String, Column, ForeignKey, DateTime, Float, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Integer, String, Column, ForeignKey, DateTime, Float, Text, Index, Computed, DDL, event, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 
 
@@ -19,7 +20,10 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     password = Column(String)
     role_id = Column(Integer, ForeignKey("roles.id"), default=1)
-    created_at = Column(DateTime, default=datetime.now())
+    created_at = Column(DateTime, default=datetime.now)
+    # Set when the account is deleted; the user can no longer sign in and
+    # a purge job removes the data and then the row.
+    deleted_at = Column(DateTime)
 
 
     
@@ -32,29 +36,185 @@ class Contact(Base):
     last_name = Column(String, nullable=False)
     email = Column(String, unique=True, index=True)
     phone = Column(String)
-    created_at = Column(DateTime, default=datetime.now())
-    updated_at = Column(DateTime, default=datetime.now(), onupdate=datetime.now())
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    # Set when the contact is deleted; it is hidden from then on and a
+    # purge job removes it with its deals and tickets.
+    deleted_at = Column(DateTime)
+
+    # Newest first. Never lazy-loaded (sessions are async): load them with
+    # selectinload(), see ContactService.get_detail(). The database deletes
+    # them with the contact.
+    deals = relationship(
+        "Deal",
+        back_populates="contact",
+        lazy="raise",
+        passive_deletes=True,
+        order_by="[Deal.created_at.desc(), Deal.id.desc()]",
+    )
+    tickets = relationship(
+        "Ticket",
+        back_populates="contact",
+        lazy="raise",
+        passive_deletes=True,
+        order_by="[Ticket.created_at.desc(), Ticket.id.desc()]",
+    )
+
+    # Search columns are generated by PostgreSQL and deferred so regular
+    # queries do not load them.
+    full_name = deferred(
+        Column(String, Computed("first_name || ' ' || last_name", persisted=True))
+    )
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "to_tsvector('simple', first_name || ' ' || last_name || ' ' "
+                "|| coalesce(email, '') || ' ' || coalesce(phone, ''))",
+                persisted=True,
+            ),
+        )
+    )
+
+    # The (user_id, ...) indexes also serve plain user_id lookups.
+    __table_args__ = (
+        Index("ix_contacts_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_contacts_user_id_updated_at_id", "user_id", "updated_at", "id"),
+        Index("ix_contacts_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_contacts_full_name_trgm",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_contacts_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+    )
 
 class Deal(Base):
     __tablename__ = "deals"
 
     id = Column(Integer, primary_key=True)
-    contact_id = Column(Integer, ForeignKey("contacts.id"))
+    contact_id = Column(Integer, ForeignKey("contacts.id", ondelete="CASCADE"))
+    # Denormalized from the contact's user_id (which never changes) so
+    # ownership checks and per-owner lists are one index lookup.
+    owner_id = Column(Integer)
     title = Column(String, nullable=False)
     amount = Column(Float)
     status = Column(String, default="open")
-    created_at = Column(DateTime, default=datetime.now())
-    updated_at = Column(DateTime, default=datetime.now(), onupdate=datetime.now())
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    contact = relationship("Contact", back_populates="deals", lazy="raise")
+
+    # (contact_id, created_at, id) covers the foreign key and reads a
+    # contact's deals newest first.
+    __table_args__ = (
+        Index("ix_deals_contact_id_created_at_id", "contact_id", "created_at", "id"),
+        Index("ix_deals_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_deals_owner_id_updated_at_id", "owner_id", "updated_at", "id"),
+    )
+
+
+class DealPipelineSummary(Base):
+    # Deal counts and amounts per owner (the contact's user) and status,
+    # kept up to date by DealService in the same transaction as each write.
+    __tablename__ = "deal_pipeline_summary"
+
+    user_id = Column(Integer, primary_key=True)
+    status = Column(String, primary_key=True)
+    deal_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0)
 
 
 class Ticket(Base):
     __tablename__ = "tickets"
 
     id = Column(Integer, primary_key=True)
-    contact_id = Column(Integer, ForeignKey("contacts.id"))
+    contact_id = Column(Integer, ForeignKey("contacts.id", ondelete="CASCADE"))
+    # Denormalized from the contact's user_id, as on deals.
+    owner_id = Column(Integer)
     subject = Column(String, nullable=False)
     description = Column(Text)
     status = Column(String, default="new")
-    created_at = Column(DateTime, default=datetime.now())
-    updated_at = Column(DateTime, default=datetime.now(), onupdate=datetime.now())
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    contact = relationship("Contact", back_populates="tickets", lazy="raise")
+
+    # Subject words rank above description words.
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('english', subject), 'A') "
+                "|| setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+        )
+    )
+
+    __table_args__ = (
+        Index("ix_tickets_contact_id_created_at_id", "contact_id", "created_at", "id"),
+        Index("ix_tickets_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_tickets_owner_id_updated_at_id", "owner_id", "updated_at", "id"),
+        Index("ix_tickets_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+
+class Job(Base):
+    # Background work run by JobRunner, one row per job. A job moves
+    # through its kind's phases in step, committing progress with every
+    # batch, so after a restart it continues where it stopped.
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    # No foreign keys: an account purge deletes the user it belongs to.
+    user_id = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)
+    target_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="queued")
+    step = Column(String)
+    total = Column(Integer)
+    processed = Column(Integer, nullable=False, default=0)
+    # Incremented on every claim; a worker only commits progress while the
+    # job still carries the attempt it claimed.
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    run_after = Column(DateTime, default=datetime.now)
+    heartbeat_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_jobs_user_id_id", "user_id", "id"),
+        # Workers claim from the unfinished jobs only.
+        Index(
+            "ix_jobs_unfinished_run_after",
+            "run_after",
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+        # At most one unfinished job per target, so repeated deletes share it.
+        Index(
+            "uq_jobs_unfinished_kind_target_id",
+            "kind",
+            "target_id",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
 
+# Trigram indexes need pg_trgm before the tables are created.
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import Any, List
+from app.util.bulk import Bulk
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: Any
+
+class BulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=Bulk.MAX_ITEMS)
+
+class BulkDeleteResult(BaseModel):
+    deleted: List[int]
+    errors: List[BulkItemError] = []
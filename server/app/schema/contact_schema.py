@@ -1,6 +1,9 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+from app.schema.bulk_schema import BulkItemError
+from app.schema.deal_schema import DealShow
+from app.schema.ticket_schema import TicketShow
 
 class ContactCreate(BaseModel):
     first_name: str
@@ -24,5 +27,27 @@ class ContactShow(BaseModel):
     updated_at: datetime
 
 
+# Counts and children are only present when asked for with ?include=.
+class ContactSummary(ContactShow):
+    deal_count: Optional[int] = None
+    ticket_count: Optional[int] = None
+
+
+class ContactDetail(ContactSummary):
+    deals: Optional[List[DealShow]] = None
+    tickets: Optional[List[TicketShow]] = None
+
+
 class ContactList(BaseModel):
+    contacts: List[ContactSummary]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+
+class ContactBulkUpdate(ContactUpdate):
+    id: int
+
+
+class ContactBulkResult(BaseModel):
     contacts: List[ContactShow]
+    errors: List[BulkItemError] = []
@@ -2,6 +2,7 @@ from pydantic import BaseModel
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+from app.schema.bulk_schema import BulkItemError
 
 class DealCreate(BaseModel):
     title: str
@@ -24,4 +25,23 @@ class DealShow(BaseModel):
     updated_at: datetime
 
 class DealList(BaseModel):
-    deals: List[DealShow]
\ No newline at end of file
+    deals: List[DealShow]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+class DealBulkUpdate(DealUpdate):
+    id: int
+
+class DealBulkResult(BaseModel):
+    deals: List[DealShow]
+    errors: List[BulkItemError] = []
+
+class PipelineStatus(BaseModel):
+    status: Optional[str] = None
+    deal_count: int
+    total_amount: float
+
+class PipelineSummary(BaseModel):
+    statuses: List[PipelineStatus]
+    deal_count: int
+    total_amount: float
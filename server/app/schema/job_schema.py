@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class JobShow(BaseModel):
+    id: int
+    kind: str
+    target_id: int
+    status: str
+    step: Optional[str] = None
+    total: Optional[int] = None
+    processed: int = 0
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
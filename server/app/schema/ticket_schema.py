@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+from app.schema.bulk_schema import BulkItemError
 
 class TicketCreate(BaseModel):
     subject: str
@@ -24,3 +25,12 @@ class TicketShow(BaseModel):
 
 class TicketList(BaseModel):
     tickets: List[TicketShow]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+class TicketBulkUpdate(TicketUpdate):
+    id: int
+
+class TicketBulkResult(BaseModel):
+    tickets: List[TicketShow]
+    errors: List[BulkItemError] = []
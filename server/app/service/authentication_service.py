@@ -1,8 +1,10 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 from ..model import User
 from app.schema.authentication_schema import RegisterUser
 from app.util.helper import Helper
+from app.util.password_hasher import password_hasher
 from sqlalchemy.exc import SQLAlchemyError
 from typing import Dict
 
@@ -12,18 +14,35 @@ helper = Helper()
 class AuthenticationService:
 
     @staticmethod
-    def verify_user(id: int, db: Session):
-        user = db.query(User).filter_by(id=id).first()
+    async def verify_user(id: int, db: AsyncSession):
+        result = await db.execute(select(User).where(User.id == id, User.deleted_at.is_(None)))
+        user = result.scalars().first()
         return user if user else None
 
     @staticmethod
-    def login(
-        email: str, password: str, db: Session
+    async def login(
+        email: str, password: str, db: AsyncSession
     ) -> Dict[str, str]:
         try:
-            user = db.query(User).filter_by(email=email).first()
-            if user is None or not helper.match_hash_text(str(user.password), password):
+            result = await db.execute(
+                select(User).where(User.email == email, User.deleted_at.is_(None))
+            )
+            user = result.scalars().first()
+            if user is None:
+                raise HTTPException(status_code=400, detail="Email or password wrong!")
+            matches, needs_rehash = await password_hasher.verify(str(user.password), password)
+            if not matches:
                 raise HTTPException(status_code=400, detail="Email or password wrong!")
+            if needs_rehash:
+                # Upgrade legacy or outdated hashes while the plain password
+                # is at hand; skipped if the password changed meanwhile.
+                new_hash = await password_hasher.hash(password)
+                await db.execute(
+                    update(User)
+                    .where(User.id == user.id, User.password == user.password)
+                    .values(password=new_hash)
+                )
+                await db.commit()
 
             access_token = helper.generate_access_token({"user_id": user.id})
             refresh_token = helper.generate_refresh_token({"user_id": user.id})
@@ -32,28 +51,29 @@ class AuthenticationService:
         except HTTPException as http_exc:
             raise http_exc
         except SQLAlchemyError:
+            await db.rollback()
             raise HTTPException(
                 status_code=500, detail="An unexpected server error occurred."
             )
 
     @staticmethod
-    def register(payload: RegisterUser, db: Session):
+    async def register(payload: RegisterUser, db: AsyncSession):
         try:
-            existing_user = db.query(User).filter_by(email=payload.email).first()
+            result = await db.execute(select(User.id).where(User.email == payload.email))
+            existing_user = result.first()
             if existing_user:
                 raise HTTPException(status_code=400, detail="Email already registered!")
 
             user = User(
                 username=payload.username,
                 email=payload.email,
-                password=helper.generate_hash_password(payload.password),
+                password=await password_hasher.hash(payload.password),
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
             return {"message": "Account created."}
         except SQLAlchemyError:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=500, detail="An unexpected server error occurred."
             )
@@ -1,43 +1,89 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from ..model import Contact, Deal, Ticket  # Ticket'ı import etmeyi unutmayın
+from sqlalchemy.orm import selectinload
+from ..model import Contact, Deal, Job, Ticket
 from app.schema.contact_schema import (
     ContactCreate,
     ContactShow,
     ContactList,
     ContactUpdate,
+    ContactBulkUpdate,
 )
-from typing import List, Any
+from app.service.job_service import PURGE_CONTACT, JobService
+from app.util.bulk import Bulk
+from app.util.etag import ETag
+from app.util.export import Export
+from app.util.pagination import Pagination
+from app.util.search import Search
+from typing import List, Any, Dict, Iterable, Optional, Set
+from datetime import datetime
 from fastapi import HTTPException, status
 
 
 class ContactService:
 
     @staticmethod
-    def create(db: Session, data: ContactCreate, user_id: int) -> Contact:
+    def visible(user_id: int):
+        # The user's contacts, minus those deleted and waiting for their
+        # purge job.
+        return and_(Contact.user_id == user_id, Contact.deleted_at.is_(None))
+
+    @staticmethod
+    async def create(db: AsyncSession, data: ContactCreate, user_id: int) -> Contact:
+        now = datetime.now()
         try:
-            new_contact = Contact(
-                first_name=data.first_name,
-                last_name=data.last_name,
-                email=data.email,
-                phone=data.phone,
-                user_id=user_id
-            )
-            db.add(new_contact)
-            db.commit()
-            db.refresh(new_contact)
+            result = await db.scalars(
+                insert(Contact)
+                .values(**data.model_dump(), user_id=user_id, created_at=now, updated_at=now)
+                .returning(Contact)
+            )
+            new_contact = result.one()
+            await db.commit()
             return new_contact
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"An error occurred while creating the contact: {str(e)}",
             )
 
     @staticmethod
-    def get_all(db: Session, user_id: int) -> List[Any]:
+    def count_columns():
+        # Correlated counts, each an index-only lookup on the
+        # (contact_id, created_at, id) index; added to the contact query so
+        # counts cost no extra round trip.
+        return [
+            select(func.count())
+            .where(model.contact_id == Contact.id)
+            .scalar_subquery()
+            .label(f"{name}_count")
+            for name, model in (("deal", Deal), ("ticket", Ticket))
+        ]
+
+    @staticmethod
+    async def get_all(
+        db: AsyncSession,
+        user_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        counts: bool = False,
+    ) -> Dict[str, Any]:
         try:
-            return db.query(Contact).filter(Contact.user_id == user_id).all()
+            # Plain column rows: the list is serialized straight from them
+            # without building ORM instances.
+            columns = [getattr(Contact, c) for c in ContactShow.model_fields]
+            if counts:
+                columns += ContactService.count_columns()
+            query = select(*columns).where(ContactService.visible(user_id))
+            result = await db.execute(Pagination.apply(query, Contact, limit, cursor))
+            contacts, next_cursor = Pagination.page(result.all(), limit)
+            return {
+                "contacts": contacts,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None,
+            }
         except SQLAlchemyError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -45,8 +91,71 @@ class ContactService:
             )
 
     @staticmethod
-    def get_by_id(db: Session, contact_id: int, user_id: int) -> Contact:
-        contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user_id).first()
+    async def get_all_version(
+        db: AsyncSession, user_id: int, limit: int, cursor: Optional[str] = None
+    ) -> str:
+        # Same page as get_all, reading only the columns the ETag needs.
+        query = select(Contact.id, Contact.created_at, Contact.updated_at).where(
+            ContactService.visible(user_id)
+        )
+        result = await db.execute(Pagination.apply(query, Contact, limit, cursor))
+        rows, next_cursor = Pagination.page(result.all(), limit)
+        return ETag.for_page(rows, next_cursor)
+
+    @staticmethod
+    async def search(
+        db: AsyncSession, user_id: int, q: str, limit: int, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        # Full-text match on name, email and phone, plus trigram matching on
+        # the name and email for prefixes and typos. Each branch of the OR is
+        # served by its own GIN index.
+        tsquery = Search.tsquery("simple", q)
+        prefix = Search.prefix(q)
+        score = (
+            func.ts_rank_cd(Contact.search_vector, tsquery)
+            + func.similarity(Contact.full_name, q)
+            + func.coalesce(func.similarity(Contact.email, q), 0)
+        )
+        query = select(Contact, score.label("score")).where(
+            ContactService.visible(user_id),
+            or_(
+                Contact.search_vector.bool_op("@@")(tsquery),
+                Contact.full_name.bool_op("%")(q),
+                Contact.email.bool_op("%")(q),
+                Contact.full_name.ilike(prefix, escape=Search.ESCAPE),
+                Contact.email.ilike(prefix, escape=Search.ESCAPE),
+            ),
+        )
+        try:
+            result = await db.execute(Search.apply(query, score, Contact.id, limit, cursor))
+            contacts, next_cursor = Search.page(result.all(), limit)
+            return {
+                "contacts": contacts,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None,
+            }
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred while searching contacts: {str(e)}",
+            )
+
+    @staticmethod
+    def export(user_id: int, fmt: str, updated_since: Optional[datetime] = None):
+        columns = list(ContactShow.model_fields)
+        stmt = select(*[getattr(Contact, c) for c in columns]).where(
+            ContactService.visible(user_id)
+        )
+        if updated_since:
+            stmt = stmt.where(Contact.updated_at >= updated_since)
+        stmt = stmt.order_by(Contact.updated_at, Contact.id)
+        return Export.stream(stmt, columns, fmt)
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, contact_id: int, user_id: int) -> Contact:
+        stmt = select(Contact).where(Contact.id == contact_id, ContactService.visible(user_id))
+        result = await db.execute(stmt)
+        contact = result.scalars().first()
         if not contact:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -55,48 +164,273 @@ class ContactService:
         return contact
 
     @staticmethod
-    def update(db: Session, contact_id: int, data: ContactUpdate, user_id: int) -> Contact:
-        contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user_id).first()
-        if not contact:
+    def _newest(model: Any, contact_ids: List[int], limit: int):
+        # Loader criteria keeping each contact's newest `limit` children;
+        # selectinload itself has no per-parent LIMIT.
+        rank = (
+            func.row_number()
+            .over(
+                partition_by=model.contact_id,
+                order_by=(model.created_at.desc(), model.id.desc()),
+            )
+            .label("rank")
+        )
+        ranked = select(model.id, rank).where(model.contact_id.in_(contact_ids)).subquery()
+        return model.id.in_(select(ranked.c.id).where(ranked.c.rank <= limit))
+
+    @staticmethod
+    async def get_detail(
+        db: AsyncSession, contact_id: int, user_id: int, include: Set[str], child_limit: int
+    ) -> Dict[str, Any]:
+        # The contact (with its counts) in one query, then one selectinload
+        # query per included child type.
+        columns = ContactService.count_columns() if "counts" in include else []
+        stmt = select(Contact, *columns).where(
+            Contact.id == contact_id, ContactService.visible(user_id)
+        )
+        for relation, model in ((Contact.deals, Deal), (Contact.tickets, Ticket)):
+            if relation.key in include:
+                criteria = ContactService._newest(model, [contact_id], child_limit)
+                stmt = stmt.options(selectinload(relation.and_(criteria)))
+        try:
+            row = (await db.execute(stmt)).first()
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred while fetching the contact: {str(e)}",
+            )
+        if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Contact with id {contact_id} not found",
             )
-        for key, value in data.model_dump(exclude_unset=True).items():
-            setattr(contact, key, value)
+        contact = row.Contact
+        detail = {column: getattr(contact, column) for column in ContactShow.model_fields}
+        if "counts" in include:
+            detail.update(deal_count=row.deal_count, ticket_count=row.ticket_count)
+        for relation in (Contact.deals, Contact.tickets):
+            if relation.key in include:
+                detail[relation.key] = getattr(contact, relation.key)
+        return detail
+
+    @staticmethod
+    async def owned_ids(db: AsyncSession, contact_ids: Iterable[int], user_id: int) -> Set[int]:
+        # The subset of contact_ids that belong to the user.
+        contact_ids = set(contact_ids)
+        if not contact_ids:
+            return set()
+        result = await db.scalars(
+            select(Contact.id).where(Contact.id.in_(contact_ids), ContactService.visible(user_id))
+        )
+        return set(result.all())
+
+    @staticmethod
+    async def get_version(db: AsyncSession, contact_id: int, user_id: int) -> str:
+        result = await db.execute(
+            select(Contact.id, Contact.updated_at).where(
+                Contact.id == contact_id, ContactService.visible(user_id)
+            )
+        )
+        row = result.first()
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Contact with id {contact_id} not found",
+            )
+        return ETag.for_row(row)
+
+    @staticmethod
+    async def update(
+        db: AsyncSession,
+        contact_id: int,
+        data: ContactUpdate,
+        user_id: int,
+        if_match: Optional[str] = None,
+    ) -> Contact:
+        # One UPDATE ... RETURNING, with the If-Match version checked in its
+        # WHERE clause; a miss is told apart as 412 or 404 afterwards.
         try:
-            db.commit()
-            db.refresh(contact)
+            result = await db.scalars(
+                update(Contact)
+                .where(
+                    Contact.id == contact_id,
+                    ContactService.visible(user_id),
+                    ETag.match_clause(Contact, if_match),
+                )
+                .values(**data.model_dump(exclude_unset=True), updated_at=datetime.now())
+                .returning(Contact)
+            )
+            contact = result.first()
+            if contact is None:
+                if if_match:
+                    etag = await ContactService.get_version(db, contact_id, user_id)
+                    ETag.check_match(if_match, etag)
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Contact with id {contact_id} not found",
+                )
+            await db.commit()
             return contact
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"An error occurred while updating the contact: {str(e)}",
             )
 
     @staticmethod
-    def delete(db: Session, contact_id: int, user_id: int) -> None:
-        contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user_id).first()
-        if not contact:
+    async def delete(db: AsyncSession, contact_id: int, user_id: int) -> Job:
+        # A contact can have thousands of deals and tickets, so they are
+        # deleted by a background job in batches; see JobService. The
+        # contact is hidden at once. Deleting it again returns the same job.
+        try:
+            result = await db.scalars(
+                update(Contact)
+                .where(Contact.id == contact_id, Contact.user_id == user_id)
+                .values(deleted_at=func.coalesce(Contact.deleted_at, datetime.now()))
+                .returning(Contact.id)
+                .execution_options(synchronize_session=False)
+            )
+            if result.first() is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Contact with id {contact_id} not found",
+                )
+            job = await JobService.enqueue(db, PURGE_CONTACT, user_id, contact_id)
+            await db.commit()
+            return job
+        except SQLAlchemyError as e:
+            await db.rollback()
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Contact with id {contact_id} not found",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred while deleting the contact and related records: {str(e)}",
             )
-        
+
+    @staticmethod
+    async def bulk_create(
+        db: AsyncSession, items: List[Dict[str, Any]], user_id: int
+    ) -> Dict[str, Any]:
+        valid, errors = Bulk.validate(ContactCreate, items)
+        valid, duplicates = Bulk.unique_by(valid, "email", "email")
+        errors += duplicates
+        contacts = []
+        if valid:
+            now = datetime.now()
+            rows = [
+                dict(item.model_dump(), user_id=user_id, created_at=now, updated_at=now)
+                for _, item in valid
+            ]
+            try:
+                # One multi-row INSERT; rows whose email is already taken are
+                # skipped by the database and reported per item below.
+                result = await db.scalars(
+                    insert(Contact)
+                    .values(rows)
+                    .on_conflict_do_nothing(index_elements=[Contact.email])
+                    .returning(Contact)
+                )
+                created = {contact.email: contact for contact in result.all()}
+                await db.commit()
+            except SQLAlchemyError as e:
+                await db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"An error occurred while creating the contacts: {str(e)}",
+                )
+            for index, item in valid:
+                if item.email in created:
+                    contacts.append(created[item.email])
+                else:
+                    errors.append(
+                        Bulk.error(index, f"Contact with email {item.email} already exists")
+                    )
+        return {"contacts": contacts, "errors": sorted(errors, key=lambda e: e["index"])}
+
+    @staticmethod
+    async def bulk_update(
+        db: AsyncSession, items: List[Dict[str, Any]], user_id: int
+    ) -> Dict[str, Any]:
+        valid, errors = Bulk.validate(ContactBulkUpdate, items)
+        valid, duplicates = Bulk.unique_by(valid, "id", "id")
+        errors += duplicates
+        valid, duplicates = Bulk.unique_by(valid, "email", "email")
+        errors += duplicates
+        contacts = []
+        if valid:
+            try:
+                ids = [item.id for _, item in valid]
+                owned = set(
+                    (
+                        await db.scalars(
+                            select(Contact.id).where(
+                                Contact.id.in_(ids), ContactService.visible(user_id)
+                            )
+                        )
+                    ).all()
+                )
+                emails = [item.email for _, item in valid if item.email]
+                taken = {}
+                if emails:
+                    result = await db.execute(
+                        select(Contact.email, Contact.id).where(Contact.email.in_(emails))
+                    )
+                    taken = dict(result.all())
+
+                now = datetime.now()
+                params = []
+                for index, item in valid:
+                    if item.id not in owned:
+                        errors.append(Bulk.error(index, f"Contact with id {item.id} not found"))
+                    elif item.email and taken.get(item.email, item.id) != item.id:
+                        errors.append(
+                            Bulk.error(index, f"Contact with email {item.email} already exists")
+                        )
+                    else:
+                        params.append(dict(item.model_dump(exclude_unset=True), updated_at=now))
+
+                if params:
+                    # Bulk UPDATE by primary key, sent as executemany batches.
+                    await db.execute(update(Contact), params)
+                    result = await db.scalars(
+                        select(Contact)
+                        .where(Contact.id.in_([p["id"] for p in params]))
+                        .execution_options(populate_existing=True)
+                    )
+                    contacts = result.all()
+                await db.commit()
+            except SQLAlchemyError as e:
+                await db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"An error occurred while updating the contacts: {str(e)}",
+                )
+        return {"contacts": contacts, "errors": sorted(errors, key=lambda e: e["index"])}
+
+    @staticmethod
+    async def bulk_delete(db: AsyncSession, ids: List[int], user_id: int) -> Dict[str, Any]:
+        # Like delete(): the contacts are hidden and one purge job per
+        # contact is queued, all in one short transaction.
         try:
-            # İlişkili deal'ları sil
-            db.query(Deal).filter(Deal.contact_id == contact_id).delete()
-            
-            # İlişkili ticket'ları sil
-            db.query(Ticket).filter(Ticket.contact_id == contact_id).delete()
-            
-            # Kişiyi sil
-            db.delete(contact)
-            db.commit()
+            result = await db.scalars(
+                update(Contact)
+                .where(Contact.id.in_(ids), Contact.user_id == user_id)
+                .values(deleted_at=func.coalesce(Contact.deleted_at, datetime.now()))
+                .returning(Contact.id)
+                .execution_options(synchronize_session=False)
+            )
+            deleted = result.all()
+            await JobService.enqueue_many(db, PURGE_CONTACT, user_id, deleted)
+            await db.commit()
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"An error occurred while deleting the contact and related records: {str(e)}",
+                detail=f"An error occurred while deleting the contacts and related records: {str(e)}",
             )
+        found = set(deleted)
+        errors = [
+            Bulk.error(index, f"Contact with id {id} not found")
+            for index, id in enumerate(ids)
+            if id not in found
+        ]
+        return {"deleted": deleted, "errors": errors}
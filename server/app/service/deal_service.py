@@ -1,37 +1,56 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from ..model import Deal
-from app.schema.deal_schema import DealCreate, DealUpdate, DealShow
-from typing import List, Any
+from ..model import Contact, Deal
+from app.schema.deal_schema import DealCreate, DealUpdate, DealShow, DealBulkUpdate
+from app.service.contact_service import ContactService
+from app.service.pipeline_service import PipelineService
+from app.util.bulk import Bulk
+from app.util.etag import ETag
+from app.util.export import Export
+from app.util.pagination import Pagination
+from typing import List, Any, Dict, Optional
+from datetime import datetime
 from fastapi import HTTPException, status
 
 
 class DealService:
 
     @staticmethod
-    def create(db: Session, data: DealCreate) -> Deal:
+    async def create(db: AsyncSession, data: DealCreate, user_id: int) -> Deal:
+        # INSERT ... SELECT from the caller's contact: the ownership check
+        # and the insert are one statement, and RETURNING loads the row.
+        now = datetime.now()
+        values = dict(data.model_dump(), owner_id=user_id, created_at=now, updated_at=now)
+        owned = select(
+            *[literal(value, getattr(Deal, key).type) for key, value in values.items()]
+        ).where(Contact.id == data.contact_id, ContactService.visible(user_id))
         try:
-            new_deal = Deal(
-                title=data.title,
-                amount=data.amount,
-                status=data.status,
-                contact_id=data.contact_id,
-            )
-            db.add(new_deal)
-            db.commit()
-            db.refresh(new_deal)
+            result = await db.scalars(
+                insert(Deal).from_select(list(values), owned).returning(Deal)
+            )
+            new_deal = result.first()
+            if new_deal is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Contact with id {data.contact_id} not found",
+                )
+            await PipelineService.apply(db, [PipelineService.added(new_deal)])
+            await db.commit()
             return new_deal
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"An error occurred while creating the deal: {str(e)}",
             )
 
     @staticmethod
-    def get_by_id(db: Session, deal_id: int) -> Deal:
+    async def get_by_id(db: AsyncSession, deal_id: int, user_id: int) -> Deal:
         try:
-            deal = db.query(Deal).filter(Deal.id == deal_id).first()
+            stmt = select(Deal).where(Deal.id == deal_id, Deal.owner_id == user_id)
+            result = await db.execute(stmt)
+            deal = result.scalars().first()
             if not deal:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -45,9 +64,43 @@ class DealService:
             )
 
     @staticmethod
-    def get_all(db: Session) -> List[Any]:
+    async def get_version(db: AsyncSession, deal_id: int, user_id: int) -> str:
+        result = await db.execute(
+            select(Deal.id, Deal.updated_at).where(Deal.id == deal_id, Deal.owner_id == user_id)
+        )
+        row = result.first()
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Deal with id {deal_id} not found",
+            )
+        return ETag.for_row(row)
+
+    @staticmethod
+    async def get_all_version(
+        db: AsyncSession, user_id: int, limit: int, cursor: Optional[str] = None
+    ) -> str:
+        query = select(Deal.id, Deal.created_at, Deal.updated_at).where(Deal.owner_id == user_id)
+        result = await db.execute(Pagination.apply(query, Deal, limit, cursor))
+        rows, next_cursor = Pagination.page(result.all(), limit)
+        return ETag.for_page(rows, next_cursor)
+
+    @staticmethod
+    async def get_all(
+        db: AsyncSession, user_id: int, limit: int, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
         try:
-            return db.query(Deal).all()
+            # Served by ix_deals_owner_id_created_at_id.
+            query = select(*[getattr(Deal, c) for c in DealShow.model_fields]).where(
+                Deal.owner_id == user_id
+            )
+            result = await db.execute(Pagination.apply(query, Deal, limit, cursor))
+            deals, next_cursor = Pagination.page(result.all(), limit)
+            return {
+                "deals": deals,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None,
+            }
         except SQLAlchemyError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -55,40 +108,195 @@ class DealService:
             )
 
     @staticmethod
-    def update(db: Session, deal_id: int, data: DealUpdate) -> Deal:
+    def export(user_id: int, fmt: str, updated_since: Optional[datetime] = None):
+        columns = list(DealShow.model_fields)
+        stmt = select(*[getattr(Deal, col) for col in columns]).where(Deal.owner_id == user_id)
+        if updated_since:
+            stmt = stmt.where(Deal.updated_at >= updated_since)
+        stmt = stmt.order_by(Deal.updated_at, Deal.id)
+        return Export.stream(stmt, columns, fmt)
+
+    @staticmethod
+    async def update(
+        db: AsyncSession,
+        deal_id: int,
+        user_id: int,
+        data: DealUpdate,
+        if_match: Optional[str] = None,
+    ) -> Deal:
+        # One UPDATE ... RETURNING. The locked sub-select supplies the values
+        # being replaced, for the pipeline deltas, and the If-Match version
+        # is checked in its WHERE clause.
+        previous = (
+            select(Deal.id, Deal.owner_id, Deal.status, Deal.amount)
+            .where(Deal.id == deal_id, Deal.owner_id == user_id, ETag.match_clause(Deal, if_match))
+            .with_for_update()
+            .subquery("previous")
+        )
         try:
-            deal = db.query(Deal).filter(Deal.id == deal_id).first()
-            if not deal:
+            result = await db.execute(
+                update(Deal)
+                .where(Deal.id == previous.c.id)
+                .values(**data.model_dump(exclude_unset=True), updated_at=datetime.now())
+                .returning(Deal, previous.c.owner_id, previous.c.status, previous.c.amount)
+            )
+            row = result.first()
+            if row is None:
+                if if_match:
+                    etag = await DealService.get_version(db, deal_id, user_id)
+                    ETag.check_match(if_match, etag)
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Deal with id {deal_id} not found",
                 )
-            for key, value in data.model_dump(exclude_unset=True).items():
-                setattr(deal, key, value)
-            db.commit()
-            db.refresh(deal)
-            return deal
+            await PipelineService.apply(
+                db, [PipelineService.removed(row), PipelineService.added(row.Deal)]
+            )
+            await db.commit()
+            return row.Deal
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"An error occurred while updating the deal: {str(e)}",
             )
 
     @staticmethod
-    def delete(db: Session, deal_id: int) -> None:
+    async def delete(db: AsyncSession, deal_id: int, user_id: int) -> None:
         try:
-            deal = db.query(Deal).filter(Deal.id == deal_id).first()
-            if not deal:
+            result = await db.execute(
+                delete(Deal)
+                .where(Deal.id == deal_id, Deal.owner_id == user_id)
+                .returning(Deal.id, Deal.owner_id, Deal.status, Deal.amount)
+                .execution_options(synchronize_session=False)
+            )
+            row = result.first()
+            if row is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Deal with id {deal_id} not found",
                 )
-            db.delete(deal)
-            db.commit()
+            await PipelineService.apply(db, [PipelineService.removed(row)])
+            await db.commit()
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"An error occurred while deleting the deal: {str(e)}",
             )
+
+    @staticmethod
+    async def bulk_create(
+        db: AsyncSession, items: List[Dict[str, Any]], user_id: int
+    ) -> Dict[str, Any]:
+        valid, errors = Bulk.validate(DealCreate, items)
+        deals = []
+        try:
+            existing = await ContactService.owned_ids(
+                db, {item.contact_id for _, item in valid}, user_id
+            )
+
+            now = datetime.now()
+            rows = []
+            for index, item in valid:
+                if item.contact_id not in existing:
+                    errors.append(
+                        Bulk.error(index, f"Contact with id {item.contact_id} not found")
+                    )
+                else:
+                    rows.append(
+                        dict(item.model_dump(), owner_id=user_id, created_at=now, updated_at=now)
+                    )
+
+            if rows:
+                result = await db.scalars(insert(Deal).values(rows).returning(Deal))
+                deals = result.all()
+                await PipelineService.apply(db, map(PipelineService.added, deals))
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred while creating the deals: {str(e)}",
+            )
+        return {"deals": deals, "errors": sorted(errors, key=lambda e: e["index"])}
+
+    @staticmethod
+    async def bulk_update(
+        db: AsyncSession, items: List[Dict[str, Any]], user_id: int
+    ) -> Dict[str, Any]:
+        valid, errors = Bulk.validate(DealBulkUpdate, items)
+        valid, duplicates = Bulk.unique_by(valid, "id", "id")
+        errors += duplicates
+        deals = []
+        try:
+            ids = [item.id for _, item in valid]
+            previous = []
+            if ids:
+                # Lock the rows so the pipeline deltas below are computed
+                # from the state this update replaces.
+                result = await db.execute(
+                    select(Deal.id, Deal.owner_id, Deal.status, Deal.amount)
+                    .where(Deal.id.in_(ids), Deal.owner_id == user_id)
+                    .with_for_update()
+                )
+                previous = result.all()
+            existing = {row.id for row in previous}
+
+            now = datetime.now()
+            params = []
+            for index, item in valid:
+                if item.id not in existing:
+                    errors.append(Bulk.error(index, f"Deal with id {item.id} not found"))
+                else:
+                    params.append(dict(item.model_dump(exclude_unset=True), updated_at=now))
+
+            if params:
+                # Bulk UPDATE by primary key, sent as executemany batches.
+                await db.execute(update(Deal), params)
+                result = await db.scalars(
+                    select(Deal)
+                    .where(Deal.id.in_([p["id"] for p in params]))
+                    .execution_options(populate_existing=True)
+                )
+                deals = result.all()
+                await PipelineService.apply(
+                    db,
+                    [PipelineService.removed(row) for row in previous]
+                    + [PipelineService.added(deal) for deal in deals],
+                )
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred while updating the deals: {str(e)}",
+            )
+        return {"deals": deals, "errors": sorted(errors, key=lambda e: e["index"])}
+
+    @staticmethod
+    async def bulk_delete(db: AsyncSession, ids: List[int], user_id: int) -> Dict[str, Any]:
+        try:
+            result = await db.execute(
+                delete(Deal)
+                .where(Deal.id.in_(ids), Deal.owner_id == user_id)
+                .returning(Deal.id, Deal.owner_id, Deal.status, Deal.amount)
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+            await PipelineService.apply(db, map(PipelineService.removed, rows))
+            deleted = [row.id for row in rows]
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred while deleting the deals: {str(e)}",
+            )
+        found = set(deleted)
+        errors = [
+            Bulk.error(index, f"Deal with id {id} not found")
+            for index, id in enumerate(ids)
+            if id not in found
+        ]
+        return {"deleted": deleted, "errors": errors}
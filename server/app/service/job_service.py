@@ -0,0 +1,328 @@
+from sqlalchemy import delete, func, or_, and_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import aliased
+from ..model import Contact, Deal, DealPipelineSummary, Job, Ticket, User
+from app.service.pipeline_service import PipelineService
+from typing import Any, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+
+PURGE_CONTACT = "purge_contact"
+PURGE_ACCOUNT = "purge_account"
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+UNFINISHED = (QUEUED, RUNNING)
+
+# Longer errors are cut before they are stored on the job.
+MAX_ERROR_LENGTH = 2000
+
+
+async def _delete_batch(db: AsyncSession, model: Any, criterion: Any, limit: Optional[int]) -> int:
+    # Deletes up to limit matching rows in one statement. Deleted deals are
+    # taken out of the pipeline summary in the same transaction.
+    batch = select(model.id).where(criterion)
+    if limit is not None:
+        batch = batch.limit(limit)
+    stmt = (
+        delete(model)
+        .where(model.id.in_(batch.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    if model is Deal:
+        result = await db.execute(stmt.returning(Deal.owner_id, Deal.status, Deal.amount))
+        rows = result.all()
+        await PipelineService.apply(db, map(PipelineService.removed, rows))
+        return len(rows)
+    result = await db.execute(stmt)
+    return result.rowcount
+
+
+class JobService:
+
+    @staticmethod
+    async def enqueue(db: AsyncSession, kind: str, user_id: int, target_id: int) -> Job:
+        # Runs in the caller's transaction, which commits it. A target with
+        # an unfinished job already gets that job back.
+        now = datetime.now()
+        stmt = insert(Job).values(
+            user_id=user_id,
+            kind=kind,
+            target_id=target_id,
+            status=QUEUED,
+            processed=0,
+            attempts=0,
+            run_after=now,
+            created_at=now,
+        )
+        result = await db.scalars(
+            stmt.on_conflict_do_nothing(
+                index_elements=[Job.kind, Job.target_id],
+                index_where=Job.status.in_(UNFINISHED),
+            ).returning(Job)
+        )
+        job = result.first()
+        if job is None:
+            result = await db.scalars(
+                select(Job).where(
+                    Job.kind == kind, Job.target_id == target_id, Job.status.in_(UNFINISHED)
+                )
+            )
+            job = result.one()
+        return job
+
+    @staticmethod
+    async def enqueue_many(
+        db: AsyncSession, kind: str, user_id: int, target_ids: List[int]
+    ) -> None:
+        # enqueue() for many targets in one INSERT; targets that already
+        # have an unfinished job keep it.
+        if not target_ids:
+            return
+        now = datetime.now()
+        stmt = insert(Job).values(
+            [
+                dict(
+                    user_id=user_id,
+                    kind=kind,
+                    target_id=target_id,
+                    status=QUEUED,
+                    processed=0,
+                    attempts=0,
+                    run_after=now,
+                    created_at=now,
+                )
+                for target_id in target_ids
+            ]
+        )
+        await db.execute(
+            stmt.on_conflict_do_nothing(
+                index_elements=[Job.kind, Job.target_id],
+                index_where=Job.status.in_(UNFINISHED),
+            )
+        )
+
+    @staticmethod
+    async def get_by_id(
+        db: AsyncSession, job_id: int, user_id: int, kinds: Optional[Iterable[str]] = None
+    ) -> Job:
+        # kinds limits which of the user's jobs may be read.
+        query = select(Job).where(Job.id == job_id, Job.user_id == user_id)
+        if kinds is not None:
+            query = query.where(Job.kind.in_(kinds))
+        try:
+            result = await db.scalars(query)
+            job = result.first()
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred while fetching the job: {str(e)}",
+            )
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Job with id {job_id} not found",
+            )
+        return job
+
+    @staticmethod
+    async def claim(db: AsyncSession, stale_after: float) -> Optional[Job]:
+        # Takes the next due job, or a running one whose worker stopped
+        # sending heartbeats (e.g. the process was killed). SKIP LOCKED lets
+        # several workers and processes claim side by side.
+        now = datetime.now()
+        candidate = aliased(Job)
+        next_job = (
+            select(candidate.id)
+            .where(
+                candidate.status.in_(UNFINISHED),
+                or_(
+                    and_(candidate.status == QUEUED, candidate.run_after <= now),
+                    and_(
+                        candidate.status == RUNNING,
+                        candidate.heartbeat_at < now - timedelta(seconds=stale_after),
+                    ),
+                ),
+            )
+            .order_by(candidate.run_after, candidate.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await db.scalars(
+            update(Job)
+            .where(Job.id == next_job)
+            .values(
+                status=RUNNING,
+                attempts=Job.attempts + 1,
+                heartbeat_at=now,
+                started_at=func.coalesce(Job.started_at, now),
+            )
+            .returning(Job)
+        )
+        job = result.first()
+        await db.commit()
+        return job
+
+    @staticmethod
+    async def step(db: AsyncSession, job: Job, batch_size: int) -> Tuple[Optional[Job], int]:
+        # Runs one batch of the job's current phase and records the progress
+        # in the same transaction. Returns the updated job and the rows
+        # deleted, or (None, 0) when another worker has taken the job over.
+        phases = PHASES[job.kind]
+        names = [name for name, _ in phases]
+        index = names.index(job.step) if job.step in names else 0
+        name, phase = phases[index]
+        now = datetime.now()
+
+        values: dict = {"heartbeat_at": now, "step": name}
+        if job.total is None:
+            values["total"] = await db.scalar(select(TOTALS[job.kind](job)))
+        rows = await phase(db, job, batch_size)
+        values["processed"] = Job.processed + rows
+        if index == len(phases) - 1:
+            values.update(status=SUCCEEDED, finished_at=now, error=None)
+        elif rows < batch_size:
+            values["step"] = names[index + 1]
+
+        result = await db.scalars(
+            update(Job)
+            .where(Job.id == job.id, Job.status == RUNNING, Job.attempts == job.attempts)
+            .values(**values)
+            .returning(Job)
+        )
+        updated = result.first()
+        if updated is None:
+            await db.rollback()
+            return None, 0
+        await db.commit()
+        return updated, rows
+
+    @staticmethod
+    async def fail(
+        db: AsyncSession, job: Job, error: str, max_attempts: int, retry_delay: float
+    ) -> Optional[Job]:
+        # Queues the job again after a growing delay, from the phase it was
+        # in, until it has used up its attempts.
+        now = datetime.now()
+        final = job.attempts >= max_attempts
+        result = await db.scalars(
+            update(Job)
+            .where(Job.id == job.id, Job.status == RUNNING, Job.attempts == job.attempts)
+            .values(
+                status=FAILED if final else QUEUED,
+                error=error[:MAX_ERROR_LENGTH],
+                run_after=now + timedelta(seconds=retry_delay * job.attempts),
+                finished_at=now if final else None,
+            )
+            .returning(Job)
+        )
+        updated = result.first()
+        await db.commit()
+        return updated
+
+    @staticmethod
+    async def release(db: AsyncSession, job: Job) -> None:
+        # Hands a job back on shutdown so the next worker starts it at once;
+        # the interrupted claim does not count as an attempt.
+        await db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == RUNNING, Job.attempts == job.attempts)
+            .values(status=QUEUED, attempts=Job.attempts - 1, run_after=datetime.now())
+        )
+        await db.commit()
+
+    # Contact purge: the contact's deals and tickets in batches, then the
+    # contact itself together with anything added to it in the meantime.
+
+    @staticmethod
+    async def _contact_deals(db: AsyncSession, job: Job, limit: Optional[int]) -> int:
+        return await _delete_batch(
+            db, Deal, and_(Deal.contact_id == job.target_id, Deal.owner_id == job.user_id), limit
+        )
+
+    @staticmethod
+    async def _contact_tickets(db: AsyncSession, job: Job, limit: Optional[int]) -> int:
+        return await _delete_batch(
+            db,
+            Ticket,
+            and_(Ticket.contact_id == job.target_id, Ticket.owner_id == job.user_id),
+            limit,
+        )
+
+    @staticmethod
+    async def _contact(db: AsyncSession, job: Job, limit: Optional[int]) -> int:
+        rows = await JobService._contact_deals(db, job, None)
+        # Tickets go with the contact (ON DELETE CASCADE).
+        rows += await _delete_batch(
+            db, Contact, and_(Contact.id == job.target_id, Contact.user_id == job.user_id), None
+        )
+        return rows
+
+    # Account purge: the user's deals, tickets and contacts in batches, then
+    # the pipeline summary and the user row.
+
+    @staticmethod
+    async def _account_deals(db: AsyncSession, job: Job, limit: Optional[int]) -> int:
+        return await _delete_batch(db, Deal, Deal.owner_id == job.target_id, limit)
+
+    @staticmethod
+    async def _account_tickets(db: AsyncSession, job: Job, limit: Optional[int]) -> int:
+        return await _delete_batch(db, Ticket, Ticket.owner_id == job.target_id, limit)
+
+    @staticmethod
+    async def _account_contacts(db: AsyncSession, job: Job, limit: Optional[int]) -> int:
+        return await _delete_batch(db, Contact, Contact.user_id == job.target_id, limit)
+
+    @staticmethod
+    async def _account(db: AsyncSession, job: Job, limit: Optional[int]) -> int:
+        # Contacts written with a principal cached before the account was
+        # deleted would block the user row's delete.
+        rows = await JobService._account_contacts(db, job, None)
+        await db.execute(
+            delete(DealPipelineSummary).where(DealPipelineSummary.user_id == job.target_id)
+        )
+        result = await db.execute(
+            delete(User).where(User.id == job.target_id, User.deleted_at.is_not(None))
+        )
+        return rows + result.rowcount
+
+
+def _count(model: Any, criterion: Any):
+    return select(func.count()).select_from(model).where(criterion).scalar_subquery()
+
+
+# Rows a job is expected to delete, counted by the worker when it starts.
+TOTALS = {
+    PURGE_CONTACT: lambda job: (
+        _count(Deal, Deal.contact_id == job.target_id)
+        + _count(Ticket, Ticket.contact_id == job.target_id)
+        + 1
+    ),
+    PURGE_ACCOUNT: lambda job: (
+        _count(Deal, Deal.owner_id == job.target_id)
+        + _count(Ticket, Ticket.owner_id == job.target_id)
+        + _count(Contact, Contact.user_id == job.target_id)
+        + 1
+    ),
+}
+
+# Phases in order. Each runs in batches until one comes back short; the
+# last runs once and finishes the job in the same transaction.
+PHASES = {
+    PURGE_CONTACT: [
+        ("deals", JobService._contact_deals),
+        ("tickets", JobService._contact_tickets),
+        ("contact", JobService._contact),
+    ],
+    PURGE_ACCOUNT: [
+        ("deals", JobService._account_deals),
+        ("tickets", JobService._account_tickets),
+        ("contacts", JobService._account_contacts),
+        ("user", JobService._account),
+    ],
+}
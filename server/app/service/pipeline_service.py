@@ -0,0 +1,153 @@
+from collections import defaultdict
+from sqlalchemy import delete, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from ..model import Deal, DealPipelineSummary
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from fastapi import HTTPException, status
+
+# (owner_id, status, amount, sign): sign is +1 for a deal entering the
+# pipeline and -1 for one leaving it.
+Change = Tuple[Optional[int], Optional[str], Optional[float], int]
+
+# Deals with no status are counted under this key; the column is part of
+# the primary key so it cannot be NULL.
+NO_STATUS = ""
+
+# Relative tolerance for comparing float sums in check().
+AMOUNT_TOLERANCE = 1e-9
+
+
+class PipelineService:
+
+    @staticmethod
+    def added(deal: Any) -> Change:
+        return (deal.owner_id, deal.status, deal.amount, 1)
+
+    @staticmethod
+    def removed(deal: Any) -> Change:
+        return (deal.owner_id, deal.status, deal.amount, -1)
+
+    @staticmethod
+    async def apply(db: AsyncSession, changes: Iterable[Change]) -> None:
+        # Must run inside the transaction that writes the deals. Changes are
+        # folded into one delta per (owner, status) and upserted in key
+        # order, so concurrent writers lock summary rows in the same order.
+        deltas: Dict[Tuple[int, str], List[float]] = defaultdict(lambda: [0, 0.0])
+        for user_id, deal_status, amount, sign in changes:
+            if user_id is None:
+                continue
+            delta = deltas[(user_id, deal_status or NO_STATUS)]
+            delta[0] += sign
+            delta[1] += sign * (amount or 0.0)
+
+        rows = [
+            {"user_id": user_id, "status": deal_status, "deal_count": count, "total_amount": amount}
+            for (user_id, deal_status), (count, amount) in sorted(deltas.items())
+            if count or amount
+        ]
+        if not rows:
+            return
+        stmt = insert(DealPipelineSummary).values(rows)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[DealPipelineSummary.user_id, DealPipelineSummary.status],
+                set_={
+                    "deal_count": DealPipelineSummary.deal_count + stmt.excluded.deal_count,
+                    "total_amount": DealPipelineSummary.total_amount + stmt.excluded.total_amount,
+                },
+            )
+        )
+
+    @staticmethod
+    async def summary(db: AsyncSession, user_id: int) -> Dict[str, Any]:
+        try:
+            result = await db.execute(
+                select(
+                    DealPipelineSummary.status,
+                    DealPipelineSummary.deal_count,
+                    DealPipelineSummary.total_amount,
+                )
+                .where(DealPipelineSummary.user_id == user_id, DealPipelineSummary.deal_count > 0)
+                .order_by(DealPipelineSummary.status)
+            )
+            statuses = [
+                {"status": row.status or None, "deal_count": row.deal_count, "total_amount": row.total_amount}
+                for row in result.all()
+            ]
+            return {
+                "statuses": statuses,
+                "deal_count": sum(s["deal_count"] for s in statuses),
+                "total_amount": sum(s["total_amount"] for s in statuses),
+            }
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred while fetching the pipeline summary: {str(e)}",
+            )
+
+    @staticmethod
+    def _grouped():
+        # Rendered inline so the SELECT and GROUP BY expressions are identical.
+        deal_status = func.coalesce(Deal.status, literal_column(f"'{NO_STATUS}'"))
+        return (
+            select(
+                Deal.owner_id.label("user_id"),
+                deal_status.label("status"),
+                func.count(Deal.id).label("deal_count"),
+                func.coalesce(func.sum(Deal.amount), 0.0).label("total_amount"),
+            )
+            .where(Deal.owner_id.is_not(None))
+            .group_by(Deal.owner_id, deal_status)
+        )
+
+    @staticmethod
+    async def rebuild(db: AsyncSession) -> int:
+        # Recomputes the whole table from deals. Deal writes are blocked
+        # until this transaction commits so no delta is lost in between.
+        await db.execute(text("SET LOCAL statement_timeout = 0"))
+        await db.execute(text("LOCK TABLE deals IN SHARE MODE"))
+        await db.execute(delete(DealPipelineSummary))
+        grouped = PipelineService._grouped().subquery()
+        result = await db.execute(
+            insert(DealPipelineSummary).from_select(
+                ["user_id", "status", "deal_count", "total_amount"], select(grouped)
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+    @staticmethod
+    async def check(db: AsyncSession) -> List[Dict[str, Any]]:
+        # Compares the summary table with a full GROUP BY over deals and
+        # returns the (owner, status) pairs that differ.
+        result = await db.execute(PipelineService._grouped())
+        expected = {(row.user_id, row.status): (row.deal_count, row.total_amount) for row in result.all()}
+        result = await db.execute(
+            select(
+                DealPipelineSummary.user_id,
+                DealPipelineSummary.status,
+                DealPipelineSummary.deal_count,
+                DealPipelineSummary.total_amount,
+            ).where(
+                (DealPipelineSummary.deal_count != 0) | (DealPipelineSummary.total_amount != 0)
+            )
+        )
+        actual = {(row.user_id, row.status): (row.deal_count, row.total_amount) for row in result.all()}
+
+        mismatches = []
+        for key in sorted(expected.keys() | actual.keys()):
+            want = expected.get(key, (0, 0.0))
+            got = actual.get(key, (0, 0.0))
+            amount_tolerance = AMOUNT_TOLERANCE * max(1.0, abs(want[1]))
+            if want[0] != got[0] or abs(want[1] - got[1]) > amount_tolerance:
+                mismatches.append(
+                    {
+                        "user_id": key[0],
+                        "status": key[1] or None,
+                        "expected": {"deal_count": want[0], "total_amount": want[1]},
+                        "actual": {"deal_count": got[0], "total_amount": got[1]},
+                    }
+                )
+        return mismatches
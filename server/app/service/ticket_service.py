@@ -1,37 +1,55 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from ..model import Ticket
-from app.schema.ticket_schema import TicketCreate, TicketUpdate, TicketShow
-from typing import List, Any
+from ..model import Contact, Ticket
+from app.schema.ticket_schema import TicketCreate, TicketUpdate, TicketShow, TicketBulkUpdate
+from app.service.contact_service import ContactService
+from app.util.bulk import Bulk
+from app.util.etag import ETag
+from app.util.export import Export
+from app.util.pagination import Pagination
+from app.util.search import Search
+from typing import List, Any, Dict, Optional
+from datetime import datetime
 from fastapi import HTTPException, status
 
 
 class TicketService:
 
     @staticmethod
-    def create(db: Session, data: TicketCreate) -> Ticket:
+    async def create(db: AsyncSession, data: TicketCreate, user_id: int) -> Ticket:
+        # INSERT ... SELECT from the caller's contact: the ownership check
+        # and the insert are one statement, and RETURNING loads the row.
+        now = datetime.now()
+        values = dict(data.model_dump(), owner_id=user_id, created_at=now, updated_at=now)
+        owned = select(
+            *[literal(value, getattr(Ticket, key).type) for key, value in values.items()]
+        ).where(Contact.id == data.contact_id, ContactService.visible(user_id))
         try:
-            new_ticket = Ticket(
-                subject=data.subject,
-                description=data.description,
-                status=data.status,
-                contact_id=data.contact_id,
-            )
-            db.add(new_ticket)
-            db.commit()
-            db.refresh(new_ticket)
+            result = await db.scalars(
+                insert(Ticket).from_select(list(values), owned).returning(Ticket)
+            )
+            new_ticket = result.first()
+            if new_ticket is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Contact with id {data.contact_id} not found",
+                )
+            await db.commit()
             return new_ticket
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"An error occurred while creating the ticket: {str(e)}",
             )
 
     @staticmethod
-    def get_by_id(db: Session, ticket_id: int) -> Ticket:
+    async def get_by_id(db: AsyncSession, ticket_id: int, user_id: int) -> Ticket:
         try:
-            ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+            stmt = select(Ticket).where(Ticket.id == ticket_id, Ticket.owner_id == user_id)
+            result = await db.execute(stmt)
+            ticket = result.scalars().first()
             if not ticket:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -45,9 +63,47 @@ class TicketService:
             )
 
     @staticmethod
-    def get_all(db: Session) -> List[Any]:
+    async def get_version(db: AsyncSession, ticket_id: int, user_id: int) -> str:
+        result = await db.execute(
+            select(Ticket.id, Ticket.updated_at).where(
+                Ticket.id == ticket_id, Ticket.owner_id == user_id
+            )
+        )
+        row = result.first()
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Ticket with id {ticket_id} not found",
+            )
+        return ETag.for_row(row)
+
+    @staticmethod
+    async def get_all_version(
+        db: AsyncSession, user_id: int, limit: int, cursor: Optional[str] = None
+    ) -> str:
+        query = select(Ticket.id, Ticket.created_at, Ticket.updated_at).where(
+            Ticket.owner_id == user_id
+        )
+        result = await db.execute(Pagination.apply(query, Ticket, limit, cursor))
+        rows, next_cursor = Pagination.page(result.all(), limit)
+        return ETag.for_page(rows, next_cursor)
+
+    @staticmethod
+    async def get_all(
+        db: AsyncSession, user_id: int, limit: int, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
         try:
-            return db.query(Ticket).all()
+            # Served by ix_tickets_owner_id_created_at_id.
+            query = select(*[getattr(Ticket, c) for c in TicketShow.model_fields]).where(
+                Ticket.owner_id == user_id
+            )
+            result = await db.execute(Pagination.apply(query, Ticket, limit, cursor))
+            tickets, next_cursor = Pagination.page(result.all(), limit)
+            return {
+                "tickets": tickets,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None,
+            }
         except SQLAlchemyError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -55,40 +111,200 @@ class TicketService:
             )
 
     @staticmethod
-    def update(db: Session, ticket_id: int, data: TicketUpdate) -> Ticket:
+    async def search(
+        db: AsyncSession, user_id: int, q: str, limit: int, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        # Full-text search over subject and description of the user's tickets.
+        tsquery = Search.tsquery("english", q)
+        score = func.ts_rank_cd(Ticket.search_vector, tsquery)
+        query = select(Ticket, score.label("score")).where(
+            Ticket.owner_id == user_id, Ticket.search_vector.bool_op("@@")(tsquery)
+        )
         try:
-            ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-            if not ticket:
+            result = await db.execute(Search.apply(query, score, Ticket.id, limit, cursor))
+            tickets, next_cursor = Search.page(result.all(), limit)
+            return {
+                "tickets": tickets,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None,
+            }
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred while searching tickets: {str(e)}",
+            )
+
+    @staticmethod
+    def export(user_id: int, fmt: str, updated_since: Optional[datetime] = None):
+        columns = list(TicketShow.model_fields)
+        stmt = select(*[getattr(Ticket, col) for col in columns]).where(
+            Ticket.owner_id == user_id
+        )
+        if updated_since:
+            stmt = stmt.where(Ticket.updated_at >= updated_since)
+        stmt = stmt.order_by(Ticket.updated_at, Ticket.id)
+        return Export.stream(stmt, columns, fmt)
+
+    @staticmethod
+    async def update(
+        db: AsyncSession,
+        ticket_id: int,
+        user_id: int,
+        data: TicketUpdate,
+        if_match: Optional[str] = None,
+    ) -> Ticket:
+        # One UPDATE ... RETURNING, with the If-Match version checked in its
+        # WHERE clause.
+        try:
+            result = await db.scalars(
+                update(Ticket)
+                .where(
+                    Ticket.id == ticket_id,
+                    Ticket.owner_id == user_id,
+                    ETag.match_clause(Ticket, if_match),
+                )
+                .values(**data.model_dump(exclude_unset=True), updated_at=datetime.now())
+                .returning(Ticket)
+            )
+            ticket = result.first()
+            if ticket is None:
+                if if_match:
+                    etag = await TicketService.get_version(db, ticket_id, user_id)
+                    ETag.check_match(if_match, etag)
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Ticket with id {ticket_id} not found",
                 )
-            for key, value in data.model_dump(exclude_unset=True).items():
-                setattr(ticket, key, value)
-            db.commit()
-            db.refresh(ticket)
+            await db.commit()
             return ticket
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"An error occurred while updating the ticket: {str(e)}",
             )
 
     @staticmethod
-    def delete(db: Session, ticket_id: int) -> None:
+    async def delete(db: AsyncSession, ticket_id: int, user_id: int) -> None:
         try:
-            ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-            if not ticket:
+            result = await db.scalars(
+                delete(Ticket)
+                .where(Ticket.id == ticket_id, Ticket.owner_id == user_id)
+                .returning(Ticket.id)
+                .execution_options(synchronize_session=False)
+            )
+            if result.first() is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Ticket with id {ticket_id} not found",
                 )
-            db.delete(ticket)
-            db.commit()
+            await db.commit()
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"An error occurred while deleting the ticket: {str(e)}",
             )
+
+    @staticmethod
+    async def bulk_create(
+        db: AsyncSession, items: List[Dict[str, Any]], user_id: int
+    ) -> Dict[str, Any]:
+        valid, errors = Bulk.validate(TicketCreate, items)
+        tickets = []
+        try:
+            existing = await ContactService.owned_ids(
+                db, {item.contact_id for _, item in valid}, user_id
+            )
+
+            now = datetime.now()
+            rows = []
+            for index, item in valid:
+                if item.contact_id not in existing:
+                    errors.append(
+                        Bulk.error(index, f"Contact with id {item.contact_id} not found")
+                    )
+                else:
+                    rows.append(
+                        dict(item.model_dump(), owner_id=user_id, created_at=now, updated_at=now)
+                    )
+
+            if rows:
+                result = await db.scalars(insert(Ticket).values(rows).returning(Ticket))
+                tickets = result.all()
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred while creating the tickets: {str(e)}",
+            )
+        return {"tickets": tickets, "errors": sorted(errors, key=lambda e: e["index"])}
+
+    @staticmethod
+    async def bulk_update(
+        db: AsyncSession, items: List[Dict[str, Any]], user_id: int
+    ) -> Dict[str, Any]:
+        valid, errors = Bulk.validate(TicketBulkUpdate, items)
+        valid, duplicates = Bulk.unique_by(valid, "id", "id")
+        errors += duplicates
+        tickets = []
+        try:
+            ids = [item.id for _, item in valid]
+            existing = set()
+            if ids:
+                result = await db.scalars(
+                    select(Ticket.id).where(Ticket.id.in_(ids), Ticket.owner_id == user_id)
+                )
+                existing = set(result.all())
+
+            now = datetime.now()
+            params = []
+            for index, item in valid:
+                if item.id not in existing:
+                    errors.append(Bulk.error(index, f"Ticket with id {item.id} not found"))
+                else:
+                    params.append(dict(item.model_dump(exclude_unset=True), updated_at=now))
+
+            if params:
+                # Bulk UPDATE by primary key, sent as executemany batches.
+                await db.execute(update(Ticket), params)
+                result = await db.scalars(
+                    select(Ticket)
+                    .where(Ticket.id.in_([p["id"] for p in params]))
+                    .execution_options(populate_existing=True)
+                )
+                tickets = result.all()
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred while updating the tickets: {str(e)}",
+            )
+        return {"tickets": tickets, "errors": sorted(errors, key=lambda e: e["index"])}
+
+    @staticmethod
+    async def bulk_delete(db: AsyncSession, ids: List[int], user_id: int) -> Dict[str, Any]:
+        try:
+            result = await db.scalars(
+                delete(Ticket)
+                .where(Ticket.id.in_(ids), Ticket.owner_id == user_id)
+                .returning(Ticket.id)
+                .execution_options(synchronize_session=False)
+            )
+            deleted = result.all()
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An error occurred while deleting the tickets: {str(e)}",
+            )
+        found = set(deleted)
+        errors = [
+            Bulk.error(index, f"Ticket with id {id} not found")
+            for index, id in enumerate(ids)
+            if id not in found
+        ]
+        return {"deleted": deleted, "errors": errors}
@@ -1,38 +1,63 @@
-from sqlalchemy.orm import Session
-from ..model import User
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from ..model import Job, User
 from app.schema.user_schema import UserUpdate, PasswordChange
-from app.util.helper import Helper
-
-helper = Helper()
+from app.service.job_service import PURGE_ACCOUNT, JobService
+from app.util.password_hasher import password_hasher
+from app.util.principal_cache import principal_cache
 
 
 class UserService:
     @staticmethod
-    def update_profile(db: Session, user_id: int, user_update: UserUpdate):
-        user = db.query(User).filter(User.id == user_id).first()
+    async def get_by_id(db: AsyncSession, user_id: int):
+        result = await db.execute(
+            select(User).where(User.id == user_id, User.deleted_at.is_(None))
+        )
+        return result.scalars().first()
+
+    @staticmethod
+    async def update_profile(db: AsyncSession, user_id: int, user_update: UserUpdate):
+        user = await UserService.get_by_id(db, user_id)
         if user:
             for key, value in user_update.model_dump(exclude_unset=True).items():
                 setattr(user, key, value)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            principal_cache.invalidate(user_id)
+            await db.refresh(user)
         return user
 
     @staticmethod
-    def change_password(db: Session, user_id: int, password_change: PasswordChange):
-        user = db.query(User).filter(User.id == user_id).first()
-        if user and helper.match_hash_text(
+    async def change_password(
+        db: AsyncSession, user_id: int, password_change: PasswordChange
+    ):
+        user = await UserService.get_by_id(db, user_id)
+        if user is None:
+            return False
+        matches, _ = await password_hasher.verify(
             str(user.password), password_change.current_password
-        ):
-            user.password = helper.generate_hash_password(password_change.new_password) # type: ignore
-            db.commit()
+        )
+        if matches:
+            user.password = await password_hasher.hash(password_change.new_password) # type: ignore
+            await db.commit()
+            principal_cache.invalidate(user_id)
             return True
         return False
 
     @staticmethod
-    def delete_account(db: Session, user_id: int):
-        user = db.query(User).filter(User.id == user_id).first()
-        if user:
-            db.delete(user)
-            db.commit()
-            return True
-        return False
+    async def delete_account(db: AsyncSession, user_id: int) -> Optional[Job]:
+        # The account is closed at once and its data purged in the
+        # background, which also deletes the user row at the end.
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id, User.deleted_at.is_(None))
+            .values(deleted_at=datetime.now())
+            .returning(User.id)
+        )
+        if result.first() is None:
+            return None
+        job = await JobService.enqueue(db, PURGE_ACCOUNT, user_id, user_id)
+        await db.commit()
+        principal_cache.invalidate(user_id)
+        return job
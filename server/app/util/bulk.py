@@ -0,0 +1,41 @@
+from typing import Any, Dict, List, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+
+class Bulk:
+    MAX_ITEMS = 1000
+
+    @classmethod
+    def error(cls, index: int, detail: Any) -> Dict[str, Any]:
+        return {"index": index, "detail": detail}
+
+    @classmethod
+    def validate(
+        cls, schema: Type[BaseModel], items: List[Dict[str, Any]]
+    ) -> Tuple[List[Tuple[int, Any]], List[Dict[str, Any]]]:
+        # Each item is validated on its own so one malformed entry is
+        # reported back instead of rejecting the whole request with a 422.
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, schema.model_validate(item)))
+            except ValidationError as e:
+                errors.append(
+                    cls.error(index, e.errors(include_url=False, include_context=False))
+                )
+        return valid, errors
+
+    @classmethod
+    def unique_by(
+        cls, items: List[Tuple[int, Any]], field: str, label: str
+    ) -> Tuple[List[Tuple[int, Any]], List[Dict[str, Any]]]:
+        seen, unique, errors = set(), [], []
+        for index, item in items:
+            value = getattr(item, field)
+            if value is not None and value in seen:
+                errors.append(cls.error(index, f"Duplicate {label} {value} in request"))
+                continue
+            seen.add(value)
+            unique.append((index, item))
+        return unique, errors
@@ -0,0 +1,89 @@
+import hashlib
+import re
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, false, or_, true
+
+EPOCH = datetime(1970, 1, 1)
+# A strong tag produced by for_row().
+ROW_TAG = re.compile(r'"(\d+)-([0-9a-f]+)"')
+# Tags outside these ranges cannot come from for_row() (ids are INTEGER
+# columns) and would not fit the query parameters.
+MAX_ID = 2**31 - 1
+MAX_MICROS = (datetime.max - EPOCH) // timedelta(microseconds=1)
+
+
+class ETag:
+    # A row's version is its (id, updated_at); every write bumps updated_at,
+    # so the pair changes whenever the representation does.
+
+    @classmethod
+    def version(cls, id: int, updated_at: Optional[datetime]) -> str:
+        micros = (updated_at - EPOCH) // timedelta(microseconds=1) if updated_at else 0
+        return f"{id}-{micros:x}"
+
+    @classmethod
+    def for_row(cls, row: Any) -> str:
+        return f'"{cls.version(row.id, row.updated_at)}"'
+
+    @classmethod
+    def for_page(cls, rows: Iterable[Any], next_cursor: Optional[str]) -> str:
+        # A list page changes when any row on it changes, or when rows are
+        # added or removed (which changes the ids on the page or the cursor).
+        digest = hashlib.sha1()
+        for row in rows:
+            digest.update(cls.version(row.id, row.updated_at).encode() + b",")
+        digest.update((next_cursor or "").encode())
+        return f'"{digest.hexdigest()}"'
+
+    @classmethod
+    def _tags(cls, header: str):
+        return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+    @classmethod
+    def matches_none(cls, if_none_match: Optional[str], etag: str) -> bool:
+        # If-None-Match uses the weak comparison.
+        if not if_none_match:
+            return False
+        tags = cls._tags(if_none_match)
+        return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+    @classmethod
+    def check_match(cls, if_match: Optional[str], etag: str) -> None:
+        # If-Match uses the strong comparison; a weak tag never matches.
+        if not if_match:
+            return
+        tags = cls._tags(if_match)
+        if "*" not in tags and etag not in tags:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Resource has been modified",
+                headers={"ETag": etag},
+            )
+
+    @classmethod
+    def match_clause(cls, model: Any, if_match: Optional[str]):
+        # If-Match as a WHERE clause on (id, updated_at), so a conditional
+        # write checks the version in the same statement. Weak, foreign and
+        # out-of-range tags match nothing, as in check_match().
+        if not if_match:
+            return true()
+        tags = cls._tags(if_match)
+        if "*" in tags:
+            return true()
+        clauses = []
+        for tag in tags:
+            match = ROW_TAG.fullmatch(tag)
+            if not match:
+                continue
+            id, micros = int(match[1]), int(match[2], 16)
+            if id > MAX_ID or micros > MAX_MICROS:
+                continue
+            updated_at = EPOCH + timedelta(microseconds=micros) if micros else None
+            clauses.append(and_(model.id == id, model.updated_at == updated_at))
+        return or_(false(), *clauses)
+
+    @classmethod
+    def not_modified(cls, etag: str) -> Response:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
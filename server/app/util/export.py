@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Sequence
+
+from ..database import read_sessionmaker
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class Export:
+    MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+    FORMAT_PATTERN = "^(ndjson|csv)$"
+    BATCH_SIZE = 1000
+
+    @classmethod
+    def media_type(cls, fmt: str) -> str:
+        return cls.MEDIA_TYPES[fmt]
+
+    @classmethod
+    def encode(cls, rows: Sequence[Any], columns: List[str], fmt: str) -> bytes:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(
+                [v.isoformat() if isinstance(v, datetime) else v for v in row]
+                for row in rows
+            )
+            return buffer.getvalue().encode()
+        return "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default) + "\n"
+            for row in rows
+        ).encode()
+
+    @classmethod
+    async def stream(cls, stmt, columns: List[str], fmt: str) -> AsyncIterator[bytes]:
+        # The export owns its session: it has to outlive the request scope of
+        # get_db, because the body is produced after the handler returns.
+        # stream() + yield_per reads through a server-side cursor so only one
+        # batch of rows is held in memory at a time.
+        async with read_sessionmaker()() as db:
+            if fmt == "csv":
+                yield cls.encode([columns], columns, fmt)
+            result = await db.stream(stmt.execution_options(yield_per=cls.BATCH_SIZE))
+            async for rows in result.partitions():
+                yield cls.encode(rows, columns, fmt)
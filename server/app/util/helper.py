@@ -1,24 +1,10 @@
-import hashlib
 import time
+from http.cookies import SimpleCookie
+from typing import Optional
 import jwt
 
 
 class Helper:
-    @classmethod
-    def generate_hash_password(cls, password: str) -> str:
-        salt = "secret_salt_key"
-        return (
-            hashlib.sha256(salt.encode() + password.encode()).hexdigest() + ":" + salt
-        )
-
-    @classmethod
-    def match_hash_text(cls, hashed_text: str, provided_text: str) -> bool:
-        _hashedText, salt = hashed_text.split(":")
-        return (
-            _hashedText
-            == hashlib.sha256(salt.encode() + provided_text.encode()).hexdigest()
-        )
-
     @classmethod
     def generate_access_token(cls, payload: dict) -> str:
         return jwt.encode(
@@ -35,4 +21,16 @@ class Helper:
     def decode_jwt(cls, token: str):
         decoded_token = jwt.decode(token, "secret_key", algorithms=["HS256"])
         id = decoded_token["payload"]["user_id"]
-        return id
\ No newline at end of file
+        return id
+
+    @classmethod
+    def user_id_from_cookies(cls, cookie_header: str) -> Optional[int]:
+        # The access token's user id, checking only its signature and expiry
+        # (no database); authenticated_user still validates the user later.
+        token = SimpleCookie(cookie_header).get("access_token")
+        if token is None:
+            return None
+        try:
+            return cls.decode_jwt(token.value)
+        except (jwt.InvalidTokenError, KeyError, TypeError):
+            return None
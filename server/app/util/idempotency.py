@@ -0,0 +1,73 @@
+import asyncio
+import os
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# How long a stored response is replayed for (seconds).
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+# Responses with larger bodies are not stored (bytes).
+IDEMPOTENCY_MAX_BODY = int(os.getenv("IDEMPOTENCY_MAX_BODY", str(1024 * 1024)))
+# How long a duplicate waits for the original request before a 409 (seconds).
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
+
+
+class StoredResponse(NamedTuple):
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+
+class Entry:
+    # One Idempotency-Key: in flight until done is set, then either holds
+    # the response to replay or has been dropped so a retry runs again.
+    __slots__ = ("fingerprint", "expires_at", "response", "done")
+
+    def __init__(self, fingerprint: str, expires_at: float):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.response: Optional[StoredResponse] = None
+        self.done = asyncio.Event()
+
+
+# Bounded LRU of idempotency keys with a TTL, per process (the event loop
+# is its only user, so it needs no lock). Keys are scoped by user and path.
+class IdempotencyStore:
+    def __init__(self, maxsize: int = IDEMPOTENCY_MAX_ENTRIES, ttl: float = IDEMPOTENCY_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Entry]" = OrderedDict()
+        self.results: Counter = Counter()
+        self.evictions = 0
+
+    def get(self, key: Tuple) -> Optional[Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def begin(self, key: Tuple, fingerprint: str) -> Entry:
+        entry = self._entries[key] = Entry(fingerprint, time.monotonic() + self.ttl)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def finish(self, key: Tuple, entry: Entry, response: Optional[StoredResponse]) -> None:
+        # Without a response the key is released: waiters and later retries
+        # run the request themselves.
+        entry.response = response
+        if response is None and self._entries.get(key) is entry:
+            del self._entries[key]
+        entry.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "maxsize": self.maxsize, "evictions": self.evictions}
+
+
+idempotency_store = IdempotencyStore()
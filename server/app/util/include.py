@@ -0,0 +1,16 @@
+from typing import Optional, Set
+
+
+class Include:
+    # ?include=a,b names optional parts of a response from a fixed set.
+    DEFAULT_CHILD_LIMIT = 10
+    MAX_CHILD_LIMIT = 100
+
+    @classmethod
+    def pattern(cls, *names: str) -> str:
+        name = "|".join(names)
+        return f"^({name})(,({name}))*$"
+
+    @classmethod
+    def parse(cls, include: Optional[str]) -> Set[str]:
+        return set(include.split(",")) if include else set()
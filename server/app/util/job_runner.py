@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from typing import Dict, List, Optional
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.database import AsyncSessionLocal
+from app.model import Job
+from app.service.job_service import QUEUED, RUNNING, JobService
+
+logger = logging.getLogger(__name__)
+
+# Worker tasks per process; 0 leaves the jobs to other processes.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+# Rows deleted per transaction.
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "1000"))
+# Pause between batches so a large purge leaves room for requests (seconds).
+JOB_BATCH_PAUSE = float(os.getenv("JOB_BATCH_PAUSE", "0.05"))
+# Idle workers look for new jobs this often; jobs queued by this process
+# wake them at once (seconds).
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+# A running job without a heartbeat for this long belonged to a worker that
+# died and is claimed again (seconds).
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+# Retry delay after a failed attempt, multiplied by the attempt number.
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "10"))
+# On shutdown, workers get this long to finish their batch and hand their
+# job back before they are cancelled (seconds).
+JOB_STOP_TIMEOUT = float(os.getenv("JOB_STOP_TIMEOUT", "10"))
+
+
+class JobRunner:
+    # Background workers in the application's event loop. Each claims a
+    # job from the jobs table and runs it batch by batch, one transaction
+    # per batch, so no request waits on a purge and no transaction holds
+    # locks on more than a batch of rows. Progress is committed with every
+    # batch: a job interrupted by a restart is handed back (or, if the
+    # process died, found by its stale heartbeat) and continues from the
+    # phase it was in.
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker = AsyncSessionLocal,
+        workers: int = JOB_WORKERS,
+        batch_size: int = JOB_BATCH_SIZE,
+        batch_pause: float = JOB_BATCH_PAUSE,
+        poll_interval: float = JOB_POLL_INTERVAL,
+    ):
+        self.sessionmaker = sessionmaker
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.poll_interval = poll_interval
+        # (kind, outcome) of the attempts this process finished: succeeded,
+        # failed, or retried when the job went back to the queue.
+        self.results: Counter = Counter()
+        self.batches: Counter = Counter()
+        self.rows: Counter = Counter()
+        self._running: Dict[int, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def start(self):
+        if self.workers <= 0 or self._tasks:
+            return
+        self._stopping = False
+        self._wake = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+
+    def wake(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    def running(self) -> int:
+        return len(self._running)
+
+    async def stop(self):
+        if not self._tasks:
+            return
+        self._stopping = True
+        self.wake()
+        _, pending = await asyncio.wait(self._tasks, timeout=JOB_STOP_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self):
+        while not self._stopping:
+            # Cleared before claiming, so a job queued meanwhile still wakes us.
+            self._wake.clear()
+            try:
+                async with self.sessionmaker() as db:
+                    job = await JobService.claim(db, JOB_STALE_AFTER)
+            except Exception:
+                logger.exception("claiming a job failed")
+                job = None
+            if job is not None:
+                await self.run(job)
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, job: Job):
+        self._running[job.id] = job
+        try:
+            while job.status == RUNNING:
+                if self._stopping:
+                    async with self.sessionmaker() as db:
+                        await JobService.release(db, job)
+                    return
+                async with self.sessionmaker() as db:
+                    updated, rows = await JobService.step(db, job, self.batch_size)
+                if updated is None:
+                    logger.warning("job %s was taken over by another worker", job.id)
+                    return
+                job = updated
+                self.batches[job.kind] += 1
+                self.rows[job.kind] += rows
+                await asyncio.sleep(self.batch_pause)
+        except Exception as e:
+            logger.exception("job %s failed", job.id)
+            try:
+                async with self.sessionmaker() as db:
+                    job = await JobService.fail(
+                        db, job, str(e), JOB_MAX_ATTEMPTS, JOB_RETRY_DELAY
+                    ) or job
+            except Exception:
+                logger.exception("recording the failure of job %s failed", job.id)
+        finally:
+            self._running.pop(job.id, None)
+        if job.status != RUNNING:
+            self.results[(job.kind, "retried" if job.status == QUEUED else job.status)] += 1
+
+
+job_runner = JobRunner()
@@ -0,0 +1,104 @@
+import bisect
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Tuple
+
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+class Metrics:
+    # In-process request metrics rendered in the Prometheus text format.
+    # Routes are recorded by their template (e.g. /api/v1/contact/{contact_id})
+    # so the label cardinality stays bounded.
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._collectors: List[Tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def observe_request(self, method: str, route: str, status_code: int, duration: float) -> None:
+        status_class = f"{status_code // 100}xx"
+        with self._lock:
+            self._requests[(method, route, status_class)] += 1
+            histogram = self._latency.get((method, route))
+            if histogram is None:
+                histogram = self._latency[(method, route)] = Histogram(self.LATENCY_BUCKETS)
+            histogram.observe(duration)
+
+    def register(
+        self, name: str, metric_type: str, help: str, collect: Callable[[], Iterable[Sample]]
+    ) -> None:
+        # collect() is called on every scrape and returns (labels, value) pairs.
+        self._collectors.append((name, metric_type, help, collect))
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_total Total HTTP requests by route and status class.",
+            "# TYPE http_requests_total counter",
+        ]
+        with self._lock:
+            requests = sorted(self._requests.items())
+            latency = sorted(
+                (key, histogram.cumulative(), histogram.sum, histogram.count)
+                for key, histogram in self._latency.items()
+            )
+        for (method, route, status_class), count in requests:
+            lines.append(
+                f"http_requests_total{{{_labels(method=method, route=route, status=status_class)}}} {count}"
+            )
+
+        lines += [
+            "# HELP http_request_duration_seconds HTTP request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), cumulative, total, count in latency:
+            labels = _labels(method=method, route=route)
+            for bound, value in zip(self.LATENCY_BUCKETS, cumulative):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {value}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {total}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+
+        for name, metric_type, help, collect in self._collectors:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {metric_type}"]
+            for labels, value in collect():
+                sample = f"{name}{{{_labels(**labels)}}}" if labels else name
+                lines.append(f"{sample} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
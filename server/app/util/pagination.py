@@ -0,0 +1,58 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+
+class Pagination:
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
+
+    @classmethod
+    def encode_key(cls, *values: Any) -> str:
+        raw = json.dumps(list(values), separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode_key(cls, cursor: str, *types: Callable[[Any], Any]) -> Tuple[Any, ...]:
+        # Each value of the cursor is converted with the matching type; any
+        # malformed cursor is a 400.
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(types):
+                raise ValueError(cursor)
+            return tuple(convert(value) for convert, value in zip(types, values))
+        except (ValueError, TypeError, binascii.Error):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+            )
+
+    @classmethod
+    def encode_cursor(cls, created_at: datetime, id: int) -> str:
+        return cls.encode_key(created_at.isoformat(), id)
+
+    @classmethod
+    def decode_cursor(cls, cursor: str) -> Tuple[datetime, int]:
+        return cls.decode_key(cursor, datetime.fromisoformat, int)
+
+    @classmethod
+    def apply(cls, stmt, model, limit: int, cursor: Optional[str] = None):
+        # Keyset pagination on (created_at, id), newest first. One extra row
+        # is fetched so the caller can tell whether another page exists.
+        if cursor:
+            created_at, id = cls.decode_cursor(cursor)
+            stmt = stmt.where(tuple_(model.created_at, model.id) < (created_at, id))
+        return stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+    @classmethod
+    def page(cls, rows: List[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+        if len(rows) <= limit:
+            return rows, None
+        items = rows[:limit]
+        last = items[-1]
+        return items, cls.encode_cursor(last.created_at, last.id)
@@ -0,0 +1,176 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+class ScryptHasher:
+    # $scrypt$ln=14,r=8,p=1$<salt>$<hash>
+    scheme = "scrypt"
+
+    def __init__(self, log_n: int = 14, r: int = 8, p: int = 1, salt_size: int = 16, key_size: int = 32):
+        self.log_n = log_n
+        self.r = r
+        self.p = p
+        self.salt_size = salt_size
+        self.key_size = key_size
+
+    def _derive(self, password: str, salt: bytes, log_n: int, r: int, p: int, key_size: int) -> bytes:
+        return hashlib.scrypt(
+            password.encode(),
+            salt=salt,
+            n=1 << log_n,
+            r=r,
+            p=p,
+            maxmem=256 * r * (1 << log_n),
+            dklen=key_size,
+        )
+
+    def hash(self, password: str) -> str:
+        salt = secrets.token_bytes(self.salt_size)
+        key = self._derive(password, salt, self.log_n, self.r, self.p, self.key_size)
+        params = f"ln={self.log_n},r={self.r},p={self.p}"
+        return f"${self.scheme}${params}${_b64encode(salt)}${_b64encode(key)}"
+
+    def verify(self, encoded: str, password: str) -> bool:
+        try:
+            _, _, params, salt, key = encoded.split("$")
+            values = dict(item.split("=") for item in params.split(","))
+            expected = _b64decode(key)
+            derived = self._derive(
+                password, _b64decode(salt), int(values["ln"]), int(values["r"]), int(values["p"]), len(expected)
+            )
+        except (ValueError, KeyError):
+            return False
+        return hmac.compare_digest(derived, expected)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        return f"$ln={self.log_n},r={self.r},p={self.p}$" not in encoded
+
+
+class LegacySha256Hasher:
+    # sha256(salt + password) hex digest followed by ":salt", as written by
+    # the old Helper.generate_hash_password. It only verifies: new hashes
+    # always come from the default scheme, and a legacy hash is replaced by
+    # one on the next successful login.
+    scheme = "sha256"
+
+    def verify(self, encoded: str, password: str) -> bool:
+        digest, _, salt = encoded.partition(":")
+        expected = hashlib.sha256(salt.encode() + password.encode()).hexdigest()
+        return hmac.compare_digest(digest, expected)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        return True
+
+
+HASHERS = {hasher.scheme: hasher for hasher in (ScryptHasher(), LegacySha256Hasher())}
+DEFAULT_SCHEME = "scrypt"
+
+
+def identify(encoded: str) -> str:
+    if encoded.startswith("$"):
+        return encoded.split("$", 2)[1]
+    return LegacySha256Hasher.scheme
+
+
+# These two run inside the worker processes, so they have to be module
+# level functions.
+def _hash(password: str) -> str:
+    return HASHERS[DEFAULT_SCHEME].hash(password)
+
+
+def _verify(encoded: str, password: str) -> Tuple[bool, bool]:
+    hasher = HASHERS.get(identify(encoded))
+    if hasher is None or not hasher.verify(encoded, password):
+        return False, False
+    return True, hasher is not HASHERS[DEFAULT_SCHEME] or hasher.needs_rehash(encoded)
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class PasswordHasher:
+    # Hashing and verification are CPU bound (tens of ms each), so they run
+    # on a process pool instead of the event loop. At most max_pending calls
+    # may be queued or running; past that callers wait up to queue_timeout
+    # seconds and then get a 503.
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None, queue_timeout: float = 2.0):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.pending = 0
+        self.rejected = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Workers must not be forked from the running server: its threads
+            # (log listener, threadpool, driver) may hold locks at fork time.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=_mp_context()
+            )
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please try again.",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        finally:
+            self.pending -= 1
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, encoded: str, password: str) -> Tuple[bool, bool]:
+        # Returns (matches, needs_rehash).
+        return await self._submit(_verify, encoded, password)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or None,
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "0")) or None,
+    queue_timeout=float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "2.0")),
+)
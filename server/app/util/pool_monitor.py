@@ -0,0 +1,61 @@
+import math
+import threading
+import time
+from typing import Dict
+
+
+class PoolMonitor:
+    # Tracks how long requests wait for a database connection. The wait is
+    # kept as an exponentially decaying average over `window` seconds, so
+    # it falls back towards zero on its own once checkouts stop waiting.
+    def __init__(self, window: float = 5.0):
+        self.window = window
+        self._lock = threading.Lock()
+        self._average = 0.0
+        self._updated = time.monotonic()
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.shed = 0
+        self.last_wait = 0.0
+
+    def _decayed(self, now: float) -> float:
+        return self._average * math.exp(-(now - self._updated) / self.window)
+
+    def begin(self) -> float:
+        with self._lock:
+            self.waiting += 1
+        return time.perf_counter()
+
+    def end(self, started: float, timed_out: bool = False) -> None:
+        wait = time.perf_counter() - started
+        now = time.monotonic()
+        with self._lock:
+            self.waiting -= 1
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.last_wait = wait
+            # Weight the new sample by the time since the previous one, so a
+            # burst of checkouts does not reset the average instantly.
+            weight = 1 - math.exp(-max(now - self._updated, 0.05) / self.window)
+            current = self._decayed(now)
+            self._average = current + weight * (wait - current)
+            self._updated = now
+
+    def average_wait(self) -> float:
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "average_wait": self._decayed(time.monotonic()),
+                "last_wait": self.last_wait,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "shed": self.shed,
+            }
+
+
+pool_monitor = PoolMonitor()
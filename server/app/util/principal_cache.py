@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+# Upper bound on how long another worker process may keep using a principal
+# after a password change, role change or account deletion (seconds).
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "5"))
+
+
+# Bounded LRU of authenticated principals keyed by user id. UserService
+# invalidates entries on every write to the user row.
+#
+# The cache lives in each worker process and invalidation only reaches the
+# process that made the write. With several workers (uvicorn --workers N,
+# or several hosts) the others keep serving the old principal until its
+# TTL runs out, so a deleted account can still authenticate there, and
+# write rows the purge job has to pick up, for up to PRINCIPAL_CACHE_TTL
+# seconds. Keep the TTL short; removing the window needs a shared backend
+# or a cross-process invalidation channel.
+#
+# A fill that read the user before an invalidation must not put the old
+# row back: callers take a version() before reading and pass it to set(),
+# which drops the principal if the user was invalidated since. The last
+# invalidation per user is kept in a bounded LRU; entries pushed out of it
+# raise a floor that counts as an invalidation of every user.
+class PrincipalCache:
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._invalidated: "OrderedDict[int, int]" = OrderedDict()
+        self._clock = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_fills = 0
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return principal
+
+    def version(self) -> int:
+        with self._lock:
+            return self._clock
+
+    def set(self, user_id: int, principal: Dict[str, Any], version: Optional[int] = None) -> None:
+        with self._lock:
+            if version is not None and self._invalidated.get(user_id, self._floor) > version:
+                self.stale_fills += 1
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._clock += 1
+            self._invalidated[user_id] = self._clock
+            self._invalidated.move_to_end(user_id)
+            while len(self._invalidated) > self.maxsize:
+                _, invalidated_at = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, invalidated_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale_fills": self.stale_fills,
+            }
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,105 @@
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Optional
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged (milliseconds, 0 disables).
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# The same statement this many times in one request is reported as an N+1.
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+# In strict mode (tests) a request over its query budget fails instead of
+# only being logged.
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "0") == "1"
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+    __slots__ = ("count", "db_time", "statements", "budget")
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.statements: Counter = Counter()
+        self.budget: Optional[int] = None
+
+    def repeated(self):
+        return [
+            (statement, count)
+            for statement, count in self.statements.items()
+            if count >= N_PLUS_ONE_THRESHOLD
+        ]
+
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def redact(parameters: Any) -> Any:
+    # Keep the shape of the parameters (names and types), never the values.
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return {"executemany": len(parameters), "row": redact(parameters[0])}
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.db_time += elapsed
+        stats.statements[statement] += 1
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "slow query",
+            extra={
+                "fields": {
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "statement": statement,
+                    "parameters": redact(parameters),
+                }
+            },
+        )
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute.
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def query_budget(limit: int):
+    # Route dependency declaring how many statements the request may issue,
+    # authentication included. Async so FastAPI calls it on the event loop
+    # instead of sending it through the threadpool.
+    async def declare():
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.budget = limit
+
+    return Depends(declare)
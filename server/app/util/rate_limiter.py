@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rules separated by ";", each "METHOD PATH SCOPE=LIMIT/SECONDS":
+#   METHOD  an HTTP method or * for any
+#   PATH    a path prefix, or an exact path when it ends with $
+#   SCOPE   ip (client address) or user (the access token's user id;
+#           requests without a valid token are not counted)
+# Every matching rule is a separate bucket and all of them must admit the
+# request. An empty value disables rate limiting.
+DEFAULT_RATE_LIMITS = (
+    "POST /api/v1/authentication/login$ ip=10/60;"
+    "POST /api/v1/authentication/register$ ip=5/60;"
+    "GET /api/v1/contact/$ user=120/60;"
+    "GET /api/v1/deal/$ user=120/60;"
+    "GET /api/v1/ticket/$ user=120/60;"
+    "* /api/v1/ user=600/60;"
+    "* /api/v1/ ip=1200/60"
+)
+RATE_LIMITS = os.getenv("RATE_LIMITS", DEFAULT_RATE_LIMITS)
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "64"))
+# Seconds between sweeps for idle buckets.
+RATE_LIMIT_EVICT_INTERVAL = float(os.getenv("RATE_LIMIT_EVICT_INTERVAL", "30"))
+# Behind our proxy the client address is the last X-Forwarded-For entry.
+RATE_LIMIT_TRUST_FORWARDED_FOR = os.getenv("RATE_LIMIT_TRUST_FORWARDED_FOR", "0") == "1"
+
+
+class Rule(NamedTuple):
+    method: str
+    path: str
+    exact: bool
+    scope: str
+    limit: int
+    window: float
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}{'$' if self.exact else ''} {self.scope}"
+
+    @property
+    def per_second(self) -> float:
+        return self.limit / self.window
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.method != "*" and self.method != method:
+            return False
+        return path == self.path if self.exact else path.startswith(self.path)
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    window: float
+    remaining: int
+    # Seconds until the bucket is full again.
+    reset: int
+    # Seconds until the request would be admitted (0 when it was).
+    retry_after: int
+
+
+def parse_rules(spec: str) -> List[Rule]:
+    rules = []
+    for part in filter(None, (part.strip() for part in spec.split(";"))):
+        try:
+            method, path, quota = part.split()
+            scope, rate = quota.split("=")
+            limit, window = rate.split("/")
+            if scope not in ("ip", "user"):
+                raise ValueError(scope)
+            exact = path.endswith("$")
+            rules.append(
+                Rule(method.upper(), path.rstrip("$"), exact, scope, int(limit), float(window))
+            )
+        except ValueError:
+            raise ValueError(f"Invalid rate limit rule: {part!r}")
+    return rules
+
+
+class RateLimitBackend(ABC):
+    # Where the buckets live. MemoryBackend is per process; a shared store
+    # (e.g. Redis running the same arithmetic in a script) implements hit()
+    # and evict() so all workers draw from the same buckets.
+
+    @abstractmethod
+    async def hit(self, key: str, rule: Rule, cost: int = 1) -> Decision:
+        ...
+
+    async def evict(self) -> int:
+        return 0
+
+    def size(self) -> int:
+        return 0
+
+
+class MemoryBackend(RateLimitBackend):
+    # Token buckets in dicts split over shards by key hash, each shard with
+    # its own lock, so concurrent callers rarely contend. A bucket is
+    # (tokens, updated_at, full_at); once full_at has passed it is the same
+    # as no bucket and the sweep drops it.
+
+    def __init__(self, shards: int = RATE_LIMIT_SHARDS):
+        self._shards: List[Tuple[Dict[str, Tuple[float, float, float]], threading.Lock]] = [
+            ({}, threading.Lock()) for _ in range(max(1, shards))
+        ]
+
+    async def hit(self, key: str, rule: Rule, cost: int = 1) -> Decision:
+        buckets, lock = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with lock:
+            bucket = buckets.get(key)
+            tokens = rule.limit
+            if bucket is not None:
+                tokens = min(rule.limit, bucket[0] + (now - bucket[1]) * rule.per_second)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            full_at = now + (rule.limit - tokens) / rule.per_second
+            buckets[key] = (tokens, now, full_at)
+        return Decision(
+            allowed,
+            rule.limit,
+            rule.window,
+            int(tokens),
+            math.ceil(full_at - now),
+            0 if allowed else math.ceil((cost - tokens) / rule.per_second),
+        )
+
+    async def evict(self) -> int:
+        now = time.monotonic()
+        evicted = 0
+        for buckets, lock in self._shards:
+            with lock:
+                idle = [key for key, bucket in buckets.items() if bucket[2] <= now]
+                for key in idle:
+                    del buckets[key]
+            evicted += len(idle)
+        return evicted
+
+    def size(self) -> int:
+        return sum(len(buckets) for buckets, _ in self._shards)
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rules: List[Rule],
+        backend: Optional[RateLimitBackend] = None,
+        evict_interval: float = RATE_LIMIT_EVICT_INTERVAL,
+    ):
+        self.rules = rules
+        self.backend = backend or MemoryBackend()
+        self.evict_interval = evict_interval
+        self.results: Counter = Counter()
+        self.evicted = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def matching(self, method: str, path: str) -> List[Rule]:
+        return [rule for rule in self.rules if rule.matches(method, path)]
+
+    async def check(self, rules: List[Rule], keys: Dict[str, Optional[str]]) -> Optional[Decision]:
+        # Draws one token from each rule's bucket, stopping at the first
+        # that is empty. Returns the decision with the fewest tokens left,
+        # or None when no rule applied.
+        decision = None
+        for rule in rules:
+            key = keys.get(rule.scope)
+            if key is None:
+                continue
+            result = await self.backend.hit(f"{rule.name}|{key}", rule)
+            self.results[(rule.name, "allowed" if result.allowed else "rejected")] += 1
+            if decision is None or not result.allowed or result.remaining < decision.remaining:
+                decision = result
+            if not result.allowed:
+                break
+        return decision
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(self.evict_interval)
+            try:
+                self.evicted += await self.backend.evict()
+            except Exception:
+                logger.exception("rate limit eviction failed")
+
+    def start(self):
+        if self.rules and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._evict_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+rate_limiter = RateLimiter(parse_rules(RATE_LIMITS))
@@ -0,0 +1,109 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary: 0 when it has replayed
+# everything it received, otherwise the age of the last replayed commit.
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    __slots__ = ("name", "engine", "sessionmaker", "lag", "healthy", "checked_at")
+
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = async_sessionmaker(
+            bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+        # Unknown until the first probe; replicas are not used before that.
+        self.lag: Optional[float] = None
+        self.healthy = False
+        self.checked_at = 0.0
+
+
+class ReplicaSet:
+    # Picks a read replica for a read-only session: the healthy replica
+    # within max_lag seconds of the primary that has the fewest checked-out
+    # connections (round-robin among ties). Falls back to the primary when
+    # no replica qualifies, or when the caller asks for it (read-your-writes).
+    def __init__(self, primary: async_sessionmaker, replicas: List[Replica], max_lag: float = 5.0, probe_interval: float = 2.0):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.probe_interval = probe_interval
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self.primary_reads = 0
+        self.replica_reads = 0
+
+    def choose(self, primary: bool = False) -> async_sessionmaker:
+        candidates = [] if primary else [
+            replica
+            for replica in self.replicas
+            if replica.healthy and replica.lag is not None and replica.lag <= self.max_lag
+        ]
+        if not candidates:
+            self.primary_reads += 1
+            return self.primary
+        offset = next(self._counter)
+        candidates = candidates[offset % len(candidates):] + candidates[:offset % len(candidates)]
+        replica = min(candidates, key=lambda r: r.engine.pool.checkedout())
+        self.replica_reads += 1
+        return replica.sessionmaker
+
+    async def probe(self) -> None:
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    replica.lag = float(await conn.scalar(LAG_QUERY))
+                replica.healthy = True
+            except Exception as e:
+                if replica.healthy:
+                    logger.warning(f"Read replica {replica.name} is unavailable: {e}")
+                replica.healthy = False
+            replica.checked_at = time.monotonic()
+
+    async def _probe_forever(self) -> None:
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.probe_interval)
+
+    def start(self) -> None:
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._probe_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "lag": replica.lag,
+                    "checked_out": replica.engine.pool.checkedout(),
+                }
+                for replica in self.replicas
+            ],
+        }
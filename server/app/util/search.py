@@ -0,0 +1,38 @@
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import func, literal_column, tuple_
+from app.util.pagination import Pagination
+
+
+class Search:
+    MAX_QUERY_LENGTH = 200
+    ESCAPE = "!"
+
+    @classmethod
+    def tsquery(cls, config: str, q: str):
+        # websearch_to_tsquery never fails on user input: quotes, "or" and
+        # "-word" are understood and anything else is treated as words.
+        return func.websearch_to_tsquery(literal_column(f"'{config}'::regconfig"), q)
+
+    @classmethod
+    def prefix(cls, q: str) -> str:
+        # LIKE pattern matching values that start with q; use with
+        # escape=Search.ESCAPE.
+        escaped = q.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+        return escaped + "%"
+
+    @classmethod
+    def apply(cls, stmt, score, id_column, limit: int, cursor: Optional[str] = None):
+        # Keyset pagination on (score, id), best match first; the score
+        # expression is repeated in the WHERE clause of later pages.
+        if cursor:
+            last_score, last_id = Pagination.decode_key(cursor, float, int)
+            stmt = stmt.where(tuple_(score, id_column) < (last_score, last_id))
+        return stmt.order_by(score.desc(), id_column.desc()).limit(limit + 1)
+
+    @classmethod
+    def page(cls, rows: List[Tuple[Any, float]], limit: int) -> Tuple[List[Any], Optional[str]]:
+        items = [item for item, _ in rows[:limit]]
+        if len(rows) <= limit:
+            return items, None
+        last, score = rows[limit - 1]
+        return items, Pagination.encode_key(score, last.id)
@@ -1,31 +1,80 @@
+import re
+from typing import Dict, List, Optional, Union
+
+
+def _alternation(literals: List[str]) -> str:
+    return "|".join(re.escape(literal) for literal in literals)
+
+
 class SecurityRule:
+    SQL_INJECTION_KEYWORDS = ["SELECT", "INSERT", "DELETE", "UPDATE", "DROP", "UNION"]
+    XSS_PATTERNS = ["<script>", "javascript:", "onload=", "onerror="]
+    PATH_TRAVERSAL_PATTERNS = ["../", "..\\"]
+    COMMAND_INJECTION_CHARS = ["&&", "|", ";", ">", "$", "`", "\\"]
+
+    RULES: Dict[str, List[str]] = {
+        "sql_injection": SQL_INJECTION_KEYWORDS,
+        "xss": XSS_PATTERNS,
+        "path_traversal": PATH_TRAVERSAL_PATTERNS,
+        "command_injection": COMMAND_INJECTION_CHARS,
+    }
+    # Longest literal across all rules; a streaming scan keeps this many
+    # bytes minus one from the previous chunk so no match is split.
+    MAX_PATTERN_LENGTH = max(len(p) for patterns in RULES.values() for p in patterns)
+
+    # One combined alternation over every rule, matched against the
+    # lower-cased body. It is kept flat (no groups, no IGNORECASE) so the
+    # regex engine can use its literal-prefix fast path; the matched literal
+    # is mapped back to its rule afterwards.
+    PATTERN = re.compile(
+        "|".join(_alternation(patterns) for patterns in RULES.values()).lower().encode()
+    )
+    RULE_BY_LITERAL = {
+        pattern.lower().encode(): name
+        for name, patterns in RULES.items()
+        for pattern in patterns
+    }
+    _RULE_PATTERNS = {
+        name: re.compile(_alternation(patterns), re.IGNORECASE)
+        for name, patterns in RULES.items()
+    }
+
+    @staticmethod
+    def scan(input_data: Union[str, bytes]) -> Optional[str]:
+        if isinstance(input_data, str):
+            input_data = input_data.encode("utf-8")
+        match = SecurityRule.PATTERN.search(input_data.lower())
+        return SecurityRule.RULE_BY_LITERAL[match.group()] if match else None
 
     @staticmethod
     def detect_sql_injection(input_data: str) -> bool:
-        dangerous_keywords = ["SELECT", "INSERT", "DELETE", "UPDATE", "DROP", "UNION"]
-        for keyword in dangerous_keywords:
-            if keyword.lower() in input_data.lower():
-                return True
-        return False
+        return SecurityRule._RULE_PATTERNS["sql_injection"].search(input_data) is not None
 
     @staticmethod
     def detect_xss(input_data: str) -> bool:
-        xss_patterns = ["<script>", "javascript:", "onload=", "onerror="]
-        for pattern in xss_patterns:
-            if pattern.lower() in input_data.lower():
-                return True
-        return False
+        return SecurityRule._RULE_PATTERNS["xss"].search(input_data) is not None
 
     @staticmethod
     def detect_path_traversal(input_data: str) -> bool:
-        if "../" in input_data or "..\\" in input_data:
-            return True
-        return False
-    
+        return SecurityRule._RULE_PATTERNS["path_traversal"].search(input_data) is not None
+
     @staticmethod
     def detect_command_injection(input_data: str) -> bool:
-        dangerous_chars = ["&&", "|", ";", ">", "$", "`", "\\"]
-        for char in dangerous_chars:
-            if char in input_data:
-                return True
-        return False
\ No newline at end of file
+        return SecurityRule._RULE_PATTERNS["command_injection"].search(input_data) is not None
+
+
+class StreamScanner:
+    # Incremental SecurityRule.scan over a body that arrives in chunks.
+    # After a hit, match holds the (lower-cased) literal that matched.
+    def __init__(self):
+        self._tail = b""
+        self.match: Optional[bytes] = None
+
+    def feed(self, chunk: bytes) -> Optional[str]:
+        data = self._tail + chunk.lower()
+        match = SecurityRule.PATTERN.search(data)
+        if match:
+            self.match = match.group()
+            return SecurityRule.RULE_BY_LITERAL[self.match]
+        self._tail = data[-(SecurityRule.MAX_PATTERN_LENGTH - 1):]
+        return None
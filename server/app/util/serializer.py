@@ -0,0 +1,64 @@
+from typing import Any, Dict, Mapping, Optional
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy.engine import Row
+
+
+class Serializer:
+    # Validates and encodes response bodies in one pass inside pydantic-core,
+    # instead of FastAPI's validate -> jsonable_encoder -> json.dumps. Input
+    # may be ORM objects or selected column rows (from_attributes).
+    _adapters: Dict[Any, TypeAdapter] = {}
+
+    @classmethod
+    def adapter(cls, schema: Any) -> TypeAdapter:
+        # Building a TypeAdapter compiles the schema; do it once per type.
+        adapter = cls._adapters.get(schema)
+        if adapter is None:
+            adapter = cls._adapters[schema] = TypeAdapter(schema)
+        return adapter
+
+    @classmethod
+    def prepare(cls, *schemas: Any) -> None:
+        # Compile adapters at import time rather than on the first request.
+        for schema in schemas:
+            cls.adapter(schema)
+
+    @classmethod
+    def _plain(cls, data: Any) -> Any:
+        # Column rows are turned into dicts up front: validating a dict is
+        # several times faster than reading a Row's attributes one by one.
+        if isinstance(data, dict):
+            return {key: cls._plain(value) for key, value in data.items()}
+        if isinstance(data, list) and data and isinstance(data[0], Row):
+            keys = data[0]._fields
+            return [dict(zip(keys, row)) for row in data]
+        if isinstance(data, Row):
+            return dict(zip(data._fields, data))
+        return data
+
+    @classmethod
+    def dump(cls, schema: Any, data: Any, exclude_unset: bool = False) -> bytes:
+        # exclude_unset leaves out optional fields the data does not have,
+        # rather than writing them as null.
+        adapter = cls.adapter(schema)
+        return adapter.dump_json(
+            adapter.validate_python(cls._plain(data), from_attributes=True),
+            exclude_unset=exclude_unset,
+        )
+
+    @classmethod
+    def response(
+        cls,
+        schema: Any,
+        data: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        exclude_unset: bool = False,
+    ) -> Response:
+        return Response(
+            content=cls.dump(schema, data, exclude_unset),
+            status_code=status_code,
+            headers=headers,
+            media_type="application/json",
+        )
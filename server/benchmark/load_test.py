@@ -0,0 +1,405 @@
+# Load test of every router in app/main.py, directly and through the proxy.
+#
+#   python -m benchmark.load_test --volume 10k --spawn --proxy --output load.json
+#
+# Seeds the configured database (see benchmark/seed.py), logs in as the
+# load-test user and runs --concurrency virtual users for --duration seconds
+# after a --warmup. Each virtual user has its own cookies and a fixed random
+# seed, so a run sends the same request mix every time. Results are written
+# as JSON: throughput, status counts and p50/p95/p99 latency per endpoint,
+# for the API and (with --proxy) for proxy/proxy_server.py in front of it.
+#
+# --spawn starts uvicorn (and the proxy) itself with the current environment;
+# otherwise point --target / --proxy-url at running servers. --in-process
+# drives the ASGI app without a server, for quick smoke runs.
+#
+# One user drives the whole load, so rate limiting is off (RATE_LIMITS="")
+# unless RATE_LIMITS is exported.
+#
+# Smoke run against SQLite (PostgreSQL-only endpoints such as search and
+# the deal pipeline show up as errors there):
+#
+#   export ASYNC_DATABASE_URL=sqlite+aiosqlite:///bench.db DATABASE_URL=sqlite:///bench.db
+#   export DB_STATEMENT_TIMEOUT_MS=0
+#   python -m benchmark.load_test --volume 10k --duration 10 --in-process
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.database import async_engine
+from benchmark import seed as seeding
+
+API = "/api/v1"
+PROXY_PORT = 8080
+
+# name -> (weight, method, path, params, body); the callables receive the
+# virtual user's random generator and the seeded id ranges.
+Endpoint = Tuple[int, str, Callable, Optional[Callable], Optional[Callable]]
+
+
+def pick(rng: random.Random, ids: Optional[List[int]]) -> int:
+    return rng.randint(*ids) if ids else 1
+
+
+def search_term(rng: random.Random) -> str:
+    return rng.choice(seeding.FIRST_NAMES)[: rng.randint(3, 5)]
+
+
+ENDPOINTS: Dict[str, Endpoint] = {
+    "root": (1, "GET", lambda rng, ids: "/", None, None),
+    "metrics": (1, "GET", lambda rng, ids: "/metrics", None, None),
+    "auth_private": (3, "GET", lambda rng, ids: f"{API}/authentication/private", None, None),
+    "auth_login": (
+        1,
+        "POST",
+        lambda rng, ids: f"{API}/authentication/login",
+        None,
+        lambda rng, ids: {"email": seeding.BENCH_EMAIL, "password": seeding.BENCH_PASSWORD},
+    ),
+    "user_profile_update": (
+        1,
+        "PUT",
+        lambda rng, ids: f"{API}/user/profile",
+        None,
+        lambda rng, ids: {"username": seeding.BENCH_USERNAME},
+    ),
+    "contact_list": (10, "GET", lambda rng, ids: f"{API}/contact/", lambda rng, ids: {"limit": 50}, None),
+    "contact_get": (
+        10, "GET", lambda rng, ids: f"{API}/contact/{pick(rng, ids['contact_ids'])}", None, None
+    ),
+    "contact_list_counts": (
+        2,
+        "GET",
+        lambda rng, ids: f"{API}/contact/",
+        lambda rng, ids: {"limit": 50, "include": "counts"},
+        None,
+    ),
+    "contact_detail": (
+        4,
+        "GET",
+        lambda rng, ids: f"{API}/contact/{pick(rng, ids['contact_ids'])}",
+        lambda rng, ids: {"include": "deals,tickets,counts"},
+        None,
+    ),
+    "contact_search": (
+        4, "GET", lambda rng, ids: f"{API}/contact/search", lambda rng, ids: {"q": search_term(rng)}, None
+    ),
+    "contact_create": (
+        2,
+        "POST",
+        lambda rng, ids: f"{API}/contact/",
+        None,
+        lambda rng, ids: {
+            "first_name": rng.choice(seeding.FIRST_NAMES),
+            "last_name": rng.choice(seeding.LAST_NAMES),
+            "email": f"load-{ids['run']}-{rng.getrandbits(48):x}@bench.example.com",
+        },
+    ),
+    "contact_update": (
+        2,
+        "PUT",
+        lambda rng, ids: f"{API}/contact/{pick(rng, ids['contact_ids'])}",
+        None,
+        lambda rng, ids: {"phone": f"+90{rng.randrange(10**10):010d}"},
+    ),
+    "deal_list": (8, "GET", lambda rng, ids: f"{API}/deal/", lambda rng, ids: {"limit": 50}, None),
+    "deal_get": (8, "GET", lambda rng, ids: f"{API}/deal/{pick(rng, ids['deal_ids'])}", None, None),
+    "deal_pipeline": (3, "GET", lambda rng, ids: f"{API}/deal/pipeline", None, None),
+    "deal_create": (
+        1,
+        "POST",
+        lambda rng, ids: f"{API}/deal/",
+        None,
+        lambda rng, ids: {
+            "title": f"Load deal {rng.getrandbits(32):x}",
+            "amount": rng.randrange(100, 100000),
+            "contact_id": pick(rng, ids["contact_ids"]),
+        },
+    ),
+    "deal_update": (
+        2,
+        "PUT",
+        lambda rng, ids: f"{API}/deal/{pick(rng, ids['deal_ids'])}",
+        None,
+        lambda rng, ids: {"status": rng.choice(seeding.STATUSES)},
+    ),
+    "ticket_list": (8, "GET", lambda rng, ids: f"{API}/ticket/", lambda rng, ids: {"limit": 50}, None),
+    "ticket_get": (8, "GET", lambda rng, ids: f"{API}/ticket/{pick(rng, ids['ticket_ids'])}", None, None),
+    "ticket_search": (
+        3,
+        "GET",
+        lambda rng, ids: f"{API}/ticket/search",
+        lambda rng, ids: {"q": rng.choice(seeding.WORDS)},
+        None,
+    ),
+    "ticket_create": (
+        1,
+        "POST",
+        lambda rng, ids: f"{API}/ticket/",
+        None,
+        lambda rng, ids: {
+            "subject": " ".join(rng.sample(seeding.WORDS, 2)),
+            "contact_id": pick(rng, ids["contact_ids"]),
+        },
+    ),
+}
+
+
+def percentile(timings: List[float], fraction: float) -> float:
+    return timings[max(int(len(timings) * fraction) - 1, 0)]
+
+
+def summarize(timings: List[float], statuses: Counter, errors: int, seconds: float) -> Dict[str, Any]:
+    timings = sorted(timings)
+    count = len(timings)
+    failed = errors + sum(n for code, n in statuses.items() if code >= 500)
+    summary = {
+        "requests": count + errors,
+        "req_per_sec": round(count / seconds, 2),
+        "failed": failed,
+        "status": {str(code): n for code, n in sorted(statuses.items())},
+    }
+    if timings:
+        summary.update(
+            mean_ms=round(statistics.fmean(timings), 2),
+            p50_ms=round(statistics.median(timings), 2),
+            p95_ms=round(percentile(timings, 0.95), 2),
+            p99_ms=round(percentile(timings, 0.99), 2),
+            max_ms=round(timings[-1], 2),
+        )
+    return summary
+
+
+class Recorder:
+    def __init__(self):
+        self.recording = False
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+
+    def add(self, name: str, elapsed_ms: Optional[float], status: Optional[int]) -> None:
+        if not self.recording:
+            return
+        if status is None:
+            self.errors[name] += 1
+            return
+        self.timings[name].append(elapsed_ms)
+        self.statuses[name][status] += 1
+
+    def report(self, seconds: float) -> Dict[str, Any]:
+        names = sorted(set(self.timings) | set(self.errors))
+        endpoints = {
+            name: summarize(self.timings[name], self.statuses[name], self.errors[name], seconds)
+            for name in names
+        }
+        overall = summarize(
+            [t for name in names for t in self.timings[name]],
+            sum(self.statuses.values(), Counter()),
+            sum(self.errors.values()),
+            seconds,
+        )
+        return {"overall": overall, "endpoints": endpoints}
+
+
+async def virtual_user(
+    client: httpx.AsyncClient,
+    number: int,
+    seed: int,
+    ids: Dict[str, Any],
+    login_cookies: Dict[str, str],
+    recorder: Recorder,
+    deadline: float,
+) -> None:
+    rng = random.Random(f"{seed}-{number}")
+    names = list(ENDPOINTS)
+    weights = [ENDPOINTS[name][0] for name in names]
+    # Cookies are kept per virtual user (not in the shared client), so the
+    # read-your-writes cookie only affects the user that wrote.
+    cookies = dict(login_cookies)
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        _, method, path, params, body = ENDPOINTS[name]
+        headers = {"Cookie": "; ".join(f"{k}={v}" for k, v in cookies.items())}
+        started = time.perf_counter()
+        try:
+            response = await client.request(
+                method,
+                path(rng, ids),
+                params=params(rng, ids) if params else None,
+                json=body(rng, ids) if body else None,
+                headers=headers,
+            )
+            await response.aread()
+        except httpx.HTTPError:
+            recorder.add(name, None, None)
+            continue
+        recorder.add(name, (time.perf_counter() - started) * 1000, response.status_code)
+        cookies.update(response.cookies)
+
+
+async def login(client: httpx.AsyncClient) -> Dict[str, str]:
+    response = await client.post(
+        f"{API}/authentication/login",
+        json={"email": seeding.BENCH_EMAIL, "password": seeding.BENCH_PASSWORD},
+    )
+    response.raise_for_status()
+    return dict(response.cookies)
+
+
+async def drive(client: httpx.AsyncClient, args, ids: Dict[str, Any]) -> Dict[str, Any]:
+    login_cookies = await login(client)
+    client.cookies.clear()
+    recorder = Recorder()
+    start = time.perf_counter()
+    deadline = start + args.warmup + args.duration
+
+    async def start_recording():
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+
+    recording = asyncio.create_task(start_recording())
+    await asyncio.gather(
+        *(
+            virtual_user(client, n, args.seed, ids, login_cookies, recorder, deadline)
+            for n in range(args.concurrency)
+        )
+    )
+    await recording
+    return recorder.report(time.perf_counter() - start - args.warmup)
+
+
+def client_for(base_url: str, concurrency: int, transport=None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=base_url,
+        transport=transport,
+        timeout=30.0,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    )
+
+
+async def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not become ready within {timeout}s")
+            await asyncio.sleep(0.2)
+
+
+def spawn(args) -> List[subprocess.Popen]:
+    processes = [
+        subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--host", "127.0.0.1", "--port", str(args.port),
+                "--workers", str(args.workers), "--no-access-log",
+            ]
+        )
+    ]
+    if args.proxy:
+        env = dict(os.environ, PROXY_UPSTREAM_URL=f"http://127.0.0.1:{args.port}")
+        processes.append(subprocess.Popen([sys.executable, "-m", "proxy.proxy_server"], env=env))
+    return processes
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    seeded = await seeding.seed(
+        seeding.contacts_for(args), args.deals_per_contact, args.tickets_per_contact
+    )
+    await async_engine.dispose()
+    ids = dict(seeded, run=f"{int(time.time()):x}")
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "database": async_engine.dialect.name,
+            "contacts": seeded["contacts"],
+            "deals_per_contact": args.deals_per_contact,
+            "tickets_per_contact": args.tickets_per_contact,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "targets": {},
+    }
+
+    if args.in_process:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with client_for("http://app", args.concurrency, transport) as client:
+            results["targets"]["in_process"] = await drive(client, args, ids)
+    else:
+        processes = spawn(args) if args.spawn else []
+        target = f"http://127.0.0.1:{args.port}" if args.spawn else args.target
+        proxy_url = f"http://127.0.0.1:{PROXY_PORT}" if args.spawn else args.proxy_url
+        try:
+            await wait_ready(f"{target}/")
+            async with client_for(target, args.concurrency) as client:
+                results["targets"]["direct"] = await drive(client, args, ids)
+            if args.proxy:
+                await wait_ready(f"{proxy_url}/")
+                async with client_for(proxy_url, args.concurrency) as client:
+                    results["targets"]["proxy"] = await drive(client, args, ids)
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the database and load test the API.")
+    seeding.add_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--target", default="http://127.0.0.1:8000")
+    parser.add_argument("--proxy", action="store_true", help="also run the load through the proxy")
+    parser.add_argument("--proxy-url", default=f"http://127.0.0.1:{PROXY_PORT}")
+    parser.add_argument("--spawn", action="store_true", help="start uvicorn and the proxy")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--in-process", action="store_true", help="drive the ASGI app directly")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    # Read by app.util.rate_limiter in the spawned servers and in-process.
+    os.environ.setdefault("RATE_LIMITS", "")
+    asyncio.run(main(args))
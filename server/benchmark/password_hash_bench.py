@@ -0,0 +1,68 @@
+# Login throughput of the password hasher.
+#
+#   python -m benchmark.password_hash_bench
+#
+# Runs CONCURRENCY concurrent verifications through PasswordHasher for each
+# pool size and reports logins/sec overall and per worker process, plus the
+# cost of a single verification inline. "legacy_sha256" is the previous
+# single SHA-256, for reference.
+import asyncio
+import json
+import os
+import time
+
+from app.util.password_hasher import HASHERS, PasswordHasher, _verify
+
+PASSWORD = "correct horse battery staple"
+LOGINS = 200
+CONCURRENCY = 64
+
+
+async def run(workers: int, encoded: str) -> float:
+    hasher = PasswordHasher(max_workers=workers, max_pending=CONCURRENCY, queue_timeout=60)
+    # Warm the pool so process start-up is not measured.
+    await asyncio.gather(*(hasher.verify(encoded, PASSWORD) for _ in range(workers)))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(hasher.verify(encoded, PASSWORD) for _ in range(LOGINS)))
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+    assert all(matches for matches, _ in results)
+    return LOGINS / elapsed
+
+
+def inline_ms(encoded: str, number: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        _verify(encoded, PASSWORD)
+    return (time.perf_counter() - start) / number * 1000
+
+
+def main():
+    encoded = HASHERS["scrypt"].hash(PASSWORD)
+    legacy = HASHERS["sha256"].verify
+    start = time.perf_counter()
+    for _ in range(10000):
+        legacy("0" * 64 + ":secret_salt_key", PASSWORD)
+    legacy_us = (time.perf_counter() - start) / 10000 * 1e6
+
+    cores = os.cpu_count() or 1
+    results = {
+        "cpu_count": cores,
+        "scrypt_verify_ms": round(inline_ms(encoded), 2),
+        "legacy_sha256_verify_us": round(legacy_us, 2),
+        "pool": [],
+    }
+    for workers in sorted({1, max(1, cores // 2), cores}):
+        rate = asyncio.run(run(workers, encoded))
+        results["pool"].append(
+            {
+                "workers": workers,
+                "logins_per_sec": round(rate, 1),
+                "logins_per_sec_per_core": round(rate / workers, 1),
+            }
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# Search latency at scale.
+#
+#   python -m benchmark.search_bench [--rows 1000000] [--queries 200]
+#
+# Seeds --rows contacts and --rows tickets (one per contact) spread over
+# --users users in the configured database, unless they are already there,
+# then runs ContactService.search and TicketService.search for several kinds
+# of query as one of those users and prints p50/p95/p99 latency in ms.
+# Needs PostgreSQL; the seeded rows are left in place for later runs.
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from sqlalchemy import func, select, text
+
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.model import Contact, User
+from app.service.contact_service import ContactService
+from app.service.ticket_service import TicketService
+
+FIRST_NAMES = [
+    "alice", "bora", "can", "deniz", "elif", "emre", "fatma", "gizem", "hakan", "irem",
+    "james", "kerem", "leyla", "mehmet", "nora", "oguz", "pelin", "robert", "selin", "tolga",
+]
+LAST_NAMES = [
+    "acar", "baker", "celik", "demir", "erdogan", "fischer", "garcia", "kaya", "koch", "lopez",
+    "martin", "ozturk", "polat", "sahin", "schmidt", "smith", "tas", "walker", "yildiz", "zorlu",
+]
+TICKET_WORDS = [
+    "invoice", "refund", "login", "password", "export", "crash", "slow", "billing", "upgrade",
+    "cancel", "shipping", "delay", "error", "timeout", "report", "integration", "webhook",
+    "discount", "contract", "renewal", "migration", "duplicate", "missing", "permission",
+]
+BENCH_EMAIL = "search-bench-{}@example.com"
+
+
+async def seed(rows: int, users: int) -> int:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        user_ids = []
+        for n in range(users):
+            email = BENCH_EMAIL.format(n)
+            user_id = await db.scalar(select(User.id).where(User.email == email))
+            if user_id is None:
+                user = User(username=f"search-bench-{n}", email=email, password="!")
+                db.add(user)
+                await db.flush()
+                user_id = user.id
+            user_ids.append(user_id)
+        await db.commit()
+
+        existing = await db.scalar(
+            select(func.count()).select_from(Contact).where(Contact.user_id.in_(user_ids))
+        )
+        if existing < rows:
+            await db.execute(
+                text(
+                    """
+                    WITH p AS (
+                        SELECT CAST(:user_ids AS int[]) AS users,
+                               CAST(:first AS text[]) AS first_names,
+                               CAST(:last AS text[]) AS last_names
+                    )
+                    INSERT INTO contacts (user_id, first_name, last_name, email, phone, created_at, updated_at)
+                    SELECT p.users[1 + i % cardinality(p.users)],
+                           p.first_names[1 + i % cardinality(p.first_names)],
+                           p.last_names[1 + (i / cardinality(p.first_names)) % cardinality(p.last_names)],
+                           'bench' || i || '.' || p.first_names[1 + i % cardinality(p.first_names)] || '@example.com',
+                           '+90' || lpad((CAST(i AS bigint) * 7919 % 10000000000)::text, 10, '0'),
+                           now(), now()
+                    FROM p, generate_series(CAST(:start AS int), CAST(:stop AS int)) AS i
+                    """
+                ),
+                {
+                    "user_ids": user_ids,
+                    "first": FIRST_NAMES,
+                    "last": LAST_NAMES,
+                    "start": existing + 1,
+                    "stop": rows,
+                },
+            )
+            await db.execute(
+                text(
+                    """
+                    WITH p AS (SELECT CAST(:words AS text[]) AS words)
+                    INSERT INTO tickets (contact_id, owner_id, subject, description, status, created_at, updated_at)
+                    SELECT c.id, c.user_id,
+                           p.words[1 + c.id % cardinality(p.words)] || ' ' ||
+                           p.words[1 + (c.id / 7) % cardinality(p.words)],
+                           (SELECT string_agg(p.words[1 + (c.id * 31 + k * 17) % cardinality(p.words)], ' ')
+                              FROM generate_series(1, 30) AS k),
+                           'new', now(), now()
+                    FROM p, contacts c
+                    WHERE c.user_id = ANY(CAST(:user_ids AS int[]))
+                      AND NOT EXISTS (SELECT 1 FROM tickets t WHERE t.contact_id = c.id)
+                    """
+                ),
+                {"words": TICKET_WORDS, "user_ids": user_ids},
+            )
+            await db.commit()
+            await db.execute(text("ANALYZE contacts"))
+            await db.execute(text("ANALYZE tickets"))
+            await db.commit()
+        return user_ids[0]
+
+
+def typo(word: str, rng: random.Random) -> str:
+    index = rng.randrange(1, len(word) - 1)
+    return word[:index] + word[index + 1] + word[index] + word[index + 2:]
+
+
+def queries(kind: str, count: int, rng: random.Random):
+    for _ in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        if kind == "contact_full_name":
+            yield f"{first} {last}"
+        elif kind == "contact_prefix":
+            yield first[:3]
+        elif kind == "contact_typo":
+            yield typo(last, rng)
+        elif kind == "contact_email":
+            yield f"bench{rng.randrange(1, 1000)}.{first}"
+        else:
+            yield " ".join(rng.sample(TICKET_WORDS, 2))
+
+
+async def run(kind: str, user_id: int, count: int, limit: int) -> dict:
+    rng = random.Random(kind)
+    search = TicketService.search if kind == "ticket_words" else ContactService.search
+    timings = []
+    async with AsyncSessionLocal() as db:
+        for q in queries(kind, count, rng):
+            start = time.perf_counter()
+            await search(db, user_id, q, limit)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "query": kind,
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 2),
+        "p99_ms": round(timings[int(len(timings) * 0.99) - 1], 2),
+    }
+
+
+async def main(args):
+    user_id = await seed(args.rows, args.users)
+    results = []
+    for kind in ["contact_full_name", "contact_prefix", "contact_typo", "contact_email", "ticket_words"]:
+        results.append(await run(kind, user_id, args.queries, args.limit))
+    await async_engine.dispose()
+    print(json.dumps({"rows": args.rows, "users": args.users, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure contact and ticket search latency.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
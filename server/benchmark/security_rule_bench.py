@@ -0,0 +1,76 @@
+# Cost per KB of request body for the security scan.
+#
+#   python -m benchmark.security_rule_bench
+#
+# "legacy" is the previous implementation (four detect_* passes, each
+# lower-casing the body again and searching once per keyword); "single_pass"
+# is SecurityRule.scan; "streaming" feeds the same body in 16 KiB chunks
+# through StreamScanner, as SecurityMiddleware does. Bodies are clean, which
+# is the worst case: every pattern has to be ruled out over the whole body.
+import json
+import random
+import string
+import timeit
+
+from app.util.security_rule import SecurityRule, StreamScanner
+
+SIZES_KB = [1, 16, 256, 1024]
+CHUNK_SIZE = 16 * 1024
+
+
+def legacy_scan(body: str) -> bool:
+    for keywords in (SecurityRule.SQL_INJECTION_KEYWORDS, SecurityRule.XSS_PATTERNS):
+        for keyword in keywords:
+            if keyword.lower() in body.lower():
+                return True
+    if "../" in body or "..\\" in body:
+        return True
+    for char in SecurityRule.COMMAND_INJECTION_CHARS:
+        if char in body:
+            return True
+    return False
+
+
+def streaming_scan(body: bytes) -> bool:
+    scanner = StreamScanner()
+    for start in range(0, len(body), CHUNK_SIZE):
+        if scanner.feed(body[start:start + CHUNK_SIZE]):
+            return True
+    return False
+
+
+def clean_body(size_kb: int) -> bytes:
+    rng = random.Random(size_kb)
+    alphabet = string.ascii_letters + string.digits + " .,:-@"
+    items = []
+    while len(json.dumps(items)) < size_kb * 1024:
+        items.append({"subject": "".join(rng.choices(alphabet, k=60)), "status": "new"})
+    return json.dumps(items).encode()[: size_kb * 1024]
+
+
+def bench(fn, arg, size_kb: int) -> float:
+    timer = timeit.Timer(lambda: fn(arg))
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=5, number=number)) / number
+    return best / size_kb * 1e6
+
+
+def main():
+    results = []
+    for size_kb in SIZES_KB:
+        body = clean_body(size_kb)
+        text = body.decode()
+        assert not legacy_scan(text) and SecurityRule.scan(body) is None
+        results.append(
+            {
+                "body_kb": size_kb,
+                "legacy_us_per_kb": round(bench(legacy_scan, text, size_kb), 3),
+                "single_pass_us_per_kb": round(bench(SecurityRule.scan, body, size_kb), 3),
+                "streaming_us_per_kb": round(bench(streaming_scan, body, size_kb), 3),
+            }
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# Seeds the configured database with a load-test data set.
+#
+#   python -m benchmark.seed --volume 1m [--deals-per-contact 2] [--tickets-per-contact 1]
+#
+# Creates (or reuses) the load-test user and tops its contacts up to the
+# requested volume, each with its deals and tickets. Runs are idempotent:
+# rows already there are kept, so a 10m data set can be grown from a 1m one.
+#
+# PostgreSQL (ASYNC_DATABASE_URL=postgresql+asyncpg://...) is migrated with
+# `alembic upgrade head` and filled with generate_series in chunks. A SQLite
+# URL (sqlite+aiosqlite:///bench.db) gets a stand-in schema without the
+# PostgreSQL-only search columns, for smoke runs.
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateColumn
+
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.model import Contact, Deal, Ticket, User
+from app.service.pipeline_service import PipelineService
+from app.util.password_hasher import ScryptHasher
+
+VOLUMES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+BENCH_USERNAME = "load-bench"
+BENCH_EMAIL = "load-bench@example.com"
+BENCH_PASSWORD = "load-bench-password"
+CHUNK = 250_000
+SQLITE_CHUNK = 5_000
+
+FIRST_NAMES = [
+    "alice", "bora", "can", "deniz", "elif", "emre", "fatma", "gizem", "hakan", "irem",
+    "james", "kerem", "leyla", "mehmet", "nora", "oguz", "pelin", "robert", "selin", "tolga",
+]
+LAST_NAMES = [
+    "acar", "baker", "celik", "demir", "erdogan", "fischer", "garcia", "kaya", "koch", "lopez",
+    "martin", "ozturk", "polat", "sahin", "schmidt", "smith", "tas", "walker", "yildiz", "zorlu",
+]
+WORDS = [
+    "invoice", "refund", "login", "password", "export", "crash", "slow", "billing", "upgrade",
+    "cancel", "shipping", "delay", "error", "timeout", "report", "integration", "webhook",
+]
+STATUSES = ["open", "negotiation", "won", "lost"]
+
+
+# SQLite has no tsvector or to_tsvector(): the generated search columns
+# become plain nullable columns there.
+@compiles(TSVECTOR, "sqlite")
+def _tsvector_sqlite(type_, compiler, **kw):
+    return "TEXT"
+
+
+@compiles(CreateColumn, "sqlite")
+def _computed_sqlite(element, compiler, **kw):
+    column = element.element
+    if column.computed is None:
+        return compiler.visit_create_column(element, **kw)
+    return f"{compiler.preparer.format_column(column)} {compiler.type_compiler.process(column.type)}"
+
+
+def is_sqlite() -> bool:
+    return async_engine.dialect.name == "sqlite"
+
+
+def migrate() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config("alembic.ini"), "head")
+
+
+async def bench_user(db) -> int:
+    user_id = await db.scalar(select(User.id).where(User.email == BENCH_EMAIL))
+    if user_id is None:
+        user = User(
+            username=BENCH_USERNAME,
+            email=BENCH_EMAIL,
+            password=ScryptHasher().hash(BENCH_PASSWORD),
+        )
+        db.add(user)
+        await db.flush()
+        user_id = user.id
+    await db.commit()
+    return user_id
+
+
+async def seed_postgres(db, user_id: int, start: int, stop: int, deals: int, tickets: int) -> None:
+    # One statement per chunk inserts the contacts and, from their
+    # RETURNING ids, their deals and tickets.
+    for chunk_start in range(start, stop + 1, CHUNK):
+        await db.execute(text("SET LOCAL statement_timeout = 0"))
+        await db.execute(
+            text(
+                """
+                WITH p AS (
+                    SELECT CAST(:first AS text[]) AS first_names,
+                           CAST(:last AS text[]) AS last_names,
+                           CAST(:words AS text[]) AS words,
+                           CAST(:statuses AS text[]) AS statuses
+                ),
+                c AS (
+                    INSERT INTO contacts (user_id, first_name, last_name, email, phone, created_at, updated_at)
+                    SELECT :user_id,
+                           p.first_names[1 + i % cardinality(p.first_names)],
+                           p.last_names[1 + (i / cardinality(p.first_names)) % cardinality(p.last_names)],
+                           'load' || i || '@bench.example.com',
+                           '+90' || lpad((CAST(i AS bigint) * 7919 % 10000000000)::text, 10, '0'),
+                           now(), now()
+                    FROM p, generate_series(CAST(:start AS int), CAST(:stop AS int)) AS i
+                    RETURNING id
+                ),
+                d AS (
+                    INSERT INTO deals (contact_id, owner_id, title, amount, status, created_at, updated_at)
+                    SELECT c.id, :user_id, 'Deal ' || c.id || '-' || k, (c.id * 37 + k * 11) % 100000,
+                           p.statuses[1 + (c.id + k) % cardinality(p.statuses)], now(), now()
+                    FROM p, c, generate_series(1, CAST(:deals AS int)) AS k
+                )
+                INSERT INTO tickets (contact_id, owner_id, subject, description, status, created_at, updated_at)
+                SELECT c.id, :user_id,
+                       p.words[1 + (c.id + k) % cardinality(p.words)] || ' ' ||
+                       p.words[1 + (c.id / 7 + k) % cardinality(p.words)],
+                       p.words[1 + (c.id * 31) % cardinality(p.words)] || ' ' ||
+                       p.words[1 + (c.id * 17 + k) % cardinality(p.words)],
+                       'new', now(), now()
+                FROM p, c, generate_series(1, CAST(:tickets AS int)) AS k
+                """
+            ),
+            {
+                "first": FIRST_NAMES,
+                "last": LAST_NAMES,
+                "words": WORDS,
+                "statuses": STATUSES,
+                "user_id": user_id,
+                "start": chunk_start,
+                "stop": min(chunk_start + CHUNK - 1, stop),
+                "deals": deals,
+                "tickets": tickets,
+            },
+        )
+        await db.commit()
+    await PipelineService.rebuild(db)
+    for table in ("contacts", "deals", "tickets"):
+        await db.execute(text(f"ANALYZE {table}"))
+    await db.commit()
+
+
+async def seed_sqlite(db, user_id: int, start: int, stop: int, deals: int, tickets: int) -> None:
+    now = datetime.now()
+    next_id = (await db.scalar(select(func.max(Contact.id)))) or 0
+    for chunk_start in range(start, stop + 1, SQLITE_CHUNK):
+        contacts, deal_rows, ticket_rows = [], [], []
+        for i in range(chunk_start, min(chunk_start + SQLITE_CHUNK - 1, stop) + 1):
+            next_id += 1
+            first = FIRST_NAMES[i % len(FIRST_NAMES)]
+            contacts.append(
+                {
+                    "id": next_id,
+                    "user_id": user_id,
+                    "first_name": first,
+                    "last_name": LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)],
+                    "email": f"load{i}@bench.example.com",
+                    "phone": f"+90{i * 7919 % 10_000_000_000:010d}",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+            deal_rows += [
+                {
+                    "contact_id": next_id,
+                    "owner_id": user_id,
+                    "title": f"Deal {next_id}-{k}",
+                    "amount": (next_id * 37 + k * 11) % 100000,
+                    "status": STATUSES[(next_id + k) % len(STATUSES)],
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for k in range(1, deals + 1)
+            ]
+            ticket_rows += [
+                {
+                    "contact_id": next_id,
+                    "owner_id": user_id,
+                    "subject": f"{WORDS[(next_id + k) % len(WORDS)]} {WORDS[(next_id // 7 + k) % len(WORDS)]}",
+                    "description": WORDS[next_id * 31 % len(WORDS)],
+                    "status": "new",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for k in range(1, tickets + 1)
+            ]
+        await db.execute(insert(Contact), contacts)
+        if deal_rows:
+            await db.execute(insert(Deal), deal_rows)
+        if ticket_rows:
+            await db.execute(insert(Ticket), ticket_rows)
+        await db.commit()
+
+
+async def id_range(db, model, user_id: int):
+    owner = Contact.user_id if model is Contact else model.owner_id
+    query = select(func.min(model.id), func.max(model.id)).where(owner == user_id)
+    low, high = (await db.execute(query)).one()
+    return [low, high] if low is not None else None
+
+
+async def seed(contacts: int, deals: int, tickets: int) -> dict:
+    if is_sqlite():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    else:
+        await asyncio.to_thread(migrate)
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        user_id = await bench_user(db)
+        existing = await db.scalar(
+            select(func.count()).select_from(Contact).where(Contact.user_id == user_id)
+        )
+        if existing < contacts:
+            fill = seed_sqlite if is_sqlite() else seed_postgres
+            await fill(db, user_id, existing + 1, contacts, deals, tickets)
+        return {
+            "user_id": user_id,
+            "email": BENCH_EMAIL,
+            "password": BENCH_PASSWORD,
+            "contacts": max(existing, contacts),
+            "inserted": max(contacts - existing, 0),
+            "seconds": round(time.perf_counter() - started, 2),
+            "contact_ids": await id_range(db, Contact, user_id),
+            "deal_ids": await id_range(db, Deal, user_id),
+            "ticket_ids": await id_range(db, Ticket, user_id),
+        }
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--volume", choices=sorted(VOLUMES), default="10k")
+    parser.add_argument("--contacts", type=int, help="overrides --volume")
+    parser.add_argument("--deals-per-contact", type=int, default=2)
+    parser.add_argument("--tickets-per-contact", type=int, default=1)
+
+
+def contacts_for(args) -> int:
+    return args.contacts or VOLUMES[args.volume]
+
+
+async def main(args):
+    result = await seed(contacts_for(args), args.deals_per_contact, args.tickets_per_contact)
+    await async_engine.dispose()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the database for load tests.")
+    add_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
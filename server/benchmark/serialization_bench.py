@@ -0,0 +1,155 @@
+# Throughput of the deal list endpoint before and after the fast
+# serialization path.
+#
+#   python -m benchmark.serialization_bench
+#
+# Each variant serves GET /deals?limit=N from an in-memory SQLite database
+# through the full ASGI stack (httpx ASGITransport, no network):
+#   before       - ORM instances, response_model=DealList, JSONResponse
+#   orjson       - same, with ORJSONResponse as the response class
+#   after        - column rows, Serializer.response(DealList, ...)
+# The numbers are relative: SQLite stands in for PostgreSQL, so only the
+# application-side cost of hydrating and encoding the page is compared.
+# The "encode_only" results serve a page fetched once up front, which
+# leaves out the database and shows the response encoding on its own.
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.model import Deal
+from app.schema.deal_schema import DealList, DealShow
+from app.util.pagination import Pagination
+from app.util.serializer import Serializer
+
+PAGE_SIZES = [50, 200, 1000]
+DURATION = 2.0
+
+engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
+
+
+async def orm_page(db: AsyncSession, limit: int):
+    result = await db.execute(Pagination.apply(select(Deal), Deal, limit))
+    deals, next_cursor = Pagination.page(result.scalars().all(), limit)
+    return {"deals": deals, "next_cursor": next_cursor, "has_more": next_cursor is not None}
+
+
+def build_app(variant: str, prefetched=None) -> FastAPI:
+    if prefetched is not None:
+        app = FastAPI(default_response_class=ORJSONResponse if variant != "before" else JSONResponse)
+        if variant == "after":
+
+            @app.get("/deals", response_model=DealList)
+            async def fast_prefetched(limit: int):
+                return Serializer.response(DealList, prefetched[limit])
+
+        else:
+
+            @app.get("/deals", response_model=DealList)
+            async def slow_prefetched(limit: int):
+                return prefetched[limit]
+
+        return app
+
+    if variant == "after":
+        app = FastAPI(default_response_class=ORJSONResponse)
+
+        @app.get("/deals", response_model=DealList)
+        async def fast(limit: int, db: AsyncSession = Depends(get_db)):
+            query = select(*[getattr(Deal, c) for c in DealShow.model_fields])
+            result = await db.execute(Pagination.apply(query, Deal, limit))
+            deals, next_cursor = Pagination.page(result.all(), limit)
+            body = {"deals": deals, "next_cursor": next_cursor, "has_more": next_cursor is not None}
+            return Serializer.response(DealList, body)
+
+        return app
+
+    response_class = ORJSONResponse if variant == "orjson" else JSONResponse
+    app = FastAPI(default_response_class=response_class)
+
+    @app.get("/deals", response_model=DealList)
+    async def slow(limit: int, db: AsyncSession = Depends(get_db)):
+        return await orm_page(db, limit)
+
+    return app
+
+
+async def seed(rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Deal.__table__.create)
+    async with SessionLocal() as db:
+        db.add_all(
+            Deal(title=f"Deal {i}", amount=i * 10.5, status="open", contact_id=i % 100 + 1)
+            for i in range(rows)
+        )
+        await db.commit()
+
+
+async def throughput(app: FastAPI, limit: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.get("/deals", params={"limit": limit})
+        assert response.status_code == 200 and len(response.json()["deals"]) == limit
+        count, start = 0, time.perf_counter()
+        while time.perf_counter() - start < DURATION:
+            await client.get("/deals", params={"limit": limit})
+            count += 1
+        return count / (time.perf_counter() - start)
+
+
+async def prefetch(columns: bool):
+    pages = {}
+    async with SessionLocal() as db:
+        for limit in PAGE_SIZES:
+            if columns:
+                query = select(*[getattr(Deal, c) for c in DealShow.model_fields])
+                result = await db.execute(Pagination.apply(query, Deal, limit))
+                deals, next_cursor = Pagination.page(result.all(), limit)
+                pages[limit] = {"deals": deals, "next_cursor": next_cursor, "has_more": True}
+            else:
+                pages[limit] = await orm_page(db, limit)
+    return pages
+
+
+async def compare(apps):
+    results = []
+    for limit in PAGE_SIZES:
+        rates = {variant: await throughput(app, limit) for variant, app in apps.items()}
+        results.append(
+            {
+                "limit": limit,
+                **{f"{variant}_req_per_sec": round(rate, 1) for variant, rate in rates.items()},
+                "speedup": round(rates["after"] / rates["before"], 2),
+            }
+        )
+    return results
+
+
+async def main():
+    await seed(max(PAGE_SIZES) + 1)
+    variants = ("before", "orjson", "after")
+    end_to_end = await compare({variant: build_app(variant) for variant in variants})
+    orm_pages, column_pages = await prefetch(columns=False), await prefetch(columns=True)
+    encode_only = await compare(
+        {
+            variant: build_app(variant, column_pages if variant == "after" else orm_pages)
+            for variant in variants
+        }
+    )
+    await engine.dispose()
+    print(json.dumps({"end_to_end": end_to_end, "encode_only": encode_only}, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,156 @@
+# Deal and ticket list latency for one tenant as other tenants' data grows.
+#
+#   python -m benchmark.tenant_scaling_bench [--steps 0,100000,1000000,5000000]
+#
+# Migrates the configured database, seeds one measured tenant with --contacts
+# contacts (two deals and one ticket each), then grows the other tenants'
+# data step by step: at each step there are that many contacts, deals and
+# tickets owned by --other-users other users. After each step it times
+# DealService.get_all and TicketService.get_all for the measured tenant, on
+# the first page and on page --deep-page (following cursors), and prints
+# p50/p95/p99 in ms. With the owner_id indexes the numbers stay flat; the
+# "growth" ratios compare the last step with the first.
+# Needs PostgreSQL; the seeded rows are left in place for later runs.
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from sqlalchemy import func, select, text
+
+from app.database import AsyncSessionLocal, async_engine
+from app.model import Contact, User
+from app.service.deal_service import DealService
+from app.service.ticket_service import TicketService
+from benchmark.seed import migrate
+
+TENANT_EMAIL = "tenant-bench@example.com"
+OTHER_EMAIL = "tenant-bench-other-{}@example.com"
+CHUNK = 250_000
+
+
+async def ensure_user(db, username: str, email: str) -> int:
+    user_id = await db.scalar(select(User.id).where(User.email == email))
+    if user_id is None:
+        user = User(username=username, email=email, password="!")
+        db.add(user)
+        await db.flush()
+        user_id = user.id
+    return user_id
+
+
+async def grow(db, user_ids, rows: int, deals: int) -> None:
+    # Tops the contacts of user_ids up to rows, each with its deals and one
+    # ticket; owners are assigned round-robin.
+    existing = await db.scalar(
+        select(func.count()).select_from(Contact).where(Contact.user_id.in_(user_ids))
+    )
+    for start in range(existing + 1, rows + 1, CHUNK):
+        await db.execute(text("SET LOCAL statement_timeout = 0"))
+        await db.execute(
+            text(
+                """
+                WITH c AS (
+                    INSERT INTO contacts (user_id, first_name, last_name, email, created_at, updated_at)
+                    SELECT (CAST(:user_ids AS int[]))[1 + i % cardinality(CAST(:user_ids AS int[]))],
+                           'tenant', 'bench' || i,
+                           'tenant' || (CAST(:user_ids AS int[]))[1] || '-' || i || '@bench.example.com',
+                           now() - i * interval '1 second', now()
+                    FROM generate_series(CAST(:start AS int), CAST(:stop AS int)) AS i
+                    RETURNING id, user_id, created_at
+                ),
+                d AS (
+                    INSERT INTO deals (contact_id, owner_id, title, amount, status, created_at, updated_at)
+                    SELECT c.id, c.user_id, 'Deal ' || c.id || '-' || k, c.id % 1000, 'open',
+                           c.created_at, now()
+                    FROM c, generate_series(1, CAST(:deals AS int)) AS k
+                )
+                INSERT INTO tickets (contact_id, owner_id, subject, status, created_at, updated_at)
+                SELECT c.id, c.user_id, 'Ticket ' || c.id, 'new', c.created_at, now()
+                FROM c
+                """
+            ),
+            {
+                "user_ids": list(user_ids),
+                "start": start,
+                "stop": min(start + CHUNK - 1, rows),
+                "deals": deals,
+            },
+        )
+        await db.commit()
+    for table in ("contacts", "deals", "tickets"):
+        await db.execute(text(f"ANALYZE {table}"))
+    await db.commit()
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+        "p99_ms": round(timings[int(len(timings) * 0.99) - 1], 3),
+    }
+
+
+async def measure(user_id: int, args) -> dict:
+    results = {}
+    for name, service, key in (("deals", DealService, "deals"), ("tickets", TicketService, "tickets")):
+        async with AsyncSessionLocal() as db:
+            cursor = None
+            for _ in range(args.deep_page - 1):
+                cursor = (await service.get_all(db, user_id, args.limit, cursor))["next_cursor"]
+            for page, page_cursor in (("first_page", None), ("deep_page", cursor)):
+                timings = []
+                for _ in range(args.queries):
+                    start = time.perf_counter()
+                    result = await service.get_all(db, user_id, args.limit, page_cursor)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    assert len(result[key]) == args.limit
+                results[f"{name}_{page}"] = summarize(timings)
+    return results
+
+
+async def main(args):
+    await asyncio.to_thread(migrate)
+    async with AsyncSessionLocal() as db:
+        tenant_id = await ensure_user(db, "tenant-bench", TENANT_EMAIL)
+        others = [
+            await ensure_user(db, f"tenant-bench-other-{n}", OTHER_EMAIL.format(n))
+            for n in range(args.other_users)
+        ]
+        await db.commit()
+        await grow(db, [tenant_id], args.contacts, 2)
+
+    steps = []
+    for rows in sorted(int(step) for step in args.steps.split(",")):
+        async with AsyncSessionLocal() as db:
+            await grow(db, others, rows, 1)
+        steps.append({"other_tenant_rows": rows, **await measure(tenant_id, args)})
+    await async_engine.dispose()
+
+    first, last = steps[0], steps[-1]
+    growth = {
+        key: round(last[key]["p50_ms"] / first[key]["p50_ms"], 2)
+        for key in first
+        if key != "other_tenant_rows"
+    }
+    print(
+        json.dumps(
+            {"tenant_contacts": args.contacts, "limit": args.limit, "steps": steps, "growth": growth},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure owner-scoped list latency as other tenants' data grows."
+    )
+    parser.add_argument("--steps", default="0,100000,1000000,5000000")
+    parser.add_argument("--contacts", type=int, default=2_000)
+    parser.add_argument("--other-users", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--deep-page", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,234 @@
+# Write latency and statements per write: ORM round trips vs RETURNING.
+#
+#   python -m benchmark.write_bench [--writes 500]
+#
+# Creates, updates and deletes --writes contacts, deals and tickets as the
+# load-test user (see benchmark.seed), each write in its own session like a
+# request, two ways:
+#   orm        - the previous write path: SELECT the row (and the contact
+#                for deals and tickets), change it through the session,
+#                commit, then refresh it with another SELECT
+#   returning  - the service methods: one INSERT/UPDATE/DELETE ... RETURNING
+#                (plus the pipeline upsert for deals); a contact delete only
+#                queues its purge job, which is run after the timings
+# and prints p50/p95/p99 in ms and statements per write for each. Runs
+# against the configured database. SQLite works for the statement counts,
+# except that its RETURNING cannot read the locked sub-select, so deal
+# updates there see no pipeline change and skip the upsert.
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+from sqlalchemy import delete, select
+
+from app.database import AsyncSessionLocal, async_engine
+from app.model import Contact, Deal, Ticket
+from app.schema.contact_schema import ContactCreate, ContactUpdate
+from app.schema.deal_schema import DealCreate, DealUpdate
+from app.schema.ticket_schema import TicketCreate, TicketUpdate
+from app.service.contact_service import ContactService
+from app.service.deal_service import DealService
+from app.service.job_service import JobService
+from app.service.pipeline_service import PipelineService
+from app.service.ticket_service import TicketService
+from app.util.job_runner import JOB_STALE_AFTER, JobRunner
+from app.util.query_stats import QueryStats, current_query_stats
+from benchmark.seed import seed
+
+
+def contact_data():
+    return ContactCreate(
+        first_name="write", last_name="bench", email=f"write-{uuid.uuid4().hex}@bench.example.com"
+    )
+
+
+class OrmWrites:
+    # The write path before RETURNING, kept here as the baseline.
+
+    @staticmethod
+    async def owned(db, contact_id, user_id):
+        result = await db.scalars(
+            select(Contact.id).where(Contact.id == contact_id, Contact.user_id == user_id)
+        )
+        assert result.first() is not None
+
+    @staticmethod
+    async def create(db, model, values, user_id):
+        if model is not Contact:
+            await OrmWrites.owned(db, values["contact_id"], user_id)
+            values = dict(values, owner_id=user_id)
+        else:
+            values = dict(values, user_id=user_id)
+        row = model(**values)
+        db.add(row)
+        if model is Deal:
+            await PipelineService.apply(db, [PipelineService.added(row)])
+        await db.commit()
+        await db.refresh(row)
+        return row.id
+
+    @staticmethod
+    async def get(db, model, id, user_id, for_update=False):
+        owner = Contact.user_id if model is Contact else model.owner_id
+        stmt = select(model).where(model.id == id, owner == user_id)
+        if for_update:
+            stmt = stmt.with_for_update()
+        return (await db.scalars(stmt)).one()
+
+    @staticmethod
+    async def update(db, model, id, values, user_id):
+        row = await OrmWrites.get(db, model, id, user_id, for_update=model is Deal)
+        changes = [PipelineService.removed(row)] if model is Deal else []
+        for key, value in values.items():
+            setattr(row, key, value)
+        if model is Deal:
+            await PipelineService.apply(db, changes + [PipelineService.added(row)])
+        await db.commit()
+        await db.refresh(row)
+
+    @staticmethod
+    async def delete(db, model, id, user_id):
+        row = await OrmWrites.get(db, model, id, user_id, for_update=model is Deal)
+        if model is Deal:
+            await PipelineService.apply(db, [PipelineService.removed(row)])
+        if model is Contact:
+            await db.execute(delete(Deal).where(Deal.contact_id == id))
+        await db.delete(row)
+        await db.commit()
+
+
+def orm_variant(contact_id):
+    return {
+        "contact": (
+            lambda db, u: OrmWrites.create(db, Contact, contact_data().model_dump(), u),
+            lambda db, id, u: OrmWrites.update(db, Contact, id, {"phone": "+900000000000"}, u),
+            lambda db, id, u: OrmWrites.delete(db, Contact, id, u),
+        ),
+        "deal": (
+            lambda db, u: OrmWrites.create(
+                db,
+                Deal,
+                {"title": "write bench", "amount": 10, "status": "open", "contact_id": contact_id},
+                u,
+            ),
+            lambda db, id, u: OrmWrites.update(db, Deal, id, {"status": "won", "amount": 20}, u),
+            lambda db, id, u: OrmWrites.delete(db, Deal, id, u),
+        ),
+        "ticket": (
+            lambda db, u: OrmWrites.create(
+                db, Ticket, {"subject": "write bench", "status": "new", "contact_id": contact_id}, u
+            ),
+            lambda db, id, u: OrmWrites.update(db, Ticket, id, {"status": "closed"}, u),
+            lambda db, id, u: OrmWrites.delete(db, Ticket, id, u),
+        ),
+    }
+
+
+def returning_variant(contact_id):
+    async def created(write):
+        return (await write).id
+
+    return {
+        "contact": (
+            lambda db, u: created(ContactService.create(db, contact_data(), u)),
+            lambda db, id, u: ContactService.update(
+                db, id, ContactUpdate(phone="+900000000000"), u
+            ),
+            ContactService.delete,
+        ),
+        "deal": (
+            lambda db, u: created(
+                DealService.create(
+                    db,
+                    DealCreate(
+                        title="write bench", amount=10, status="open", contact_id=contact_id
+                    ),
+                    u,
+                )
+            ),
+            lambda db, id, u: DealService.update(db, id, u, DealUpdate(status="won", amount=20)),
+            DealService.delete,
+        ),
+        "ticket": (
+            lambda db, u: created(
+                TicketService.create(
+                    db,
+                    TicketCreate(subject="write bench", status="new", contact_id=contact_id),
+                    u,
+                )
+            ),
+            lambda db, id, u: TicketService.update(db, id, u, TicketUpdate(status="closed")),
+            TicketService.delete,
+        ),
+    }
+
+
+async def timed(samples, write, *args):
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            result = await write(db, *args)
+        samples["ms"].append((time.perf_counter() - start) * 1000)
+        samples["statements"].append(stats.count)
+        return result
+    finally:
+        current_query_stats.reset(token)
+
+
+def summarize(samples):
+    timings = sorted(samples["ms"])
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+        "p99_ms": round(timings[int(len(timings) * 0.99) - 1], 3),
+        "statements": round(statistics.mean(samples["statements"]), 2),
+    }
+
+
+async def run(variant, user_id, writes):
+    results = {}
+    for entity, (create, update, remove) in variant.items():
+        samples = {op: {"ms": [], "statements": []} for op in ("create", "update", "delete")}
+        for _ in range(writes):
+            id = await timed(samples["create"], create, user_id)
+            await timed(samples["update"], update, id, user_id)
+            await timed(samples["delete"], remove, id, user_id)
+        for op, op_samples in samples.items():
+            results[f"{entity}_{op}"] = summarize(op_samples)
+    return results
+
+
+async def drain():
+    runner = JobRunner(batch_pause=0)
+    while True:
+        async with AsyncSessionLocal() as db:
+            job = await JobService.claim(db, JOB_STALE_AFTER)
+        if job is None:
+            return
+        await runner.run(job)
+
+
+async def main(args):
+    seeded = await seed(1, 0, 0)
+    user_id, contact_id = seeded["user_id"], seeded["contact_ids"][0]
+    report = {"writes": args.writes, "dialect": async_engine.dialect.name}
+    for name, variant in (("orm", orm_variant), ("returning", returning_variant)):
+        report[name] = await run(variant(contact_id), user_id, args.writes)
+    await drain()
+    report["speedup_p50"] = {
+        key: round(report["orm"][key]["p50_ms"] / report["returning"][key]["p50_ms"], 2)
+        for key in report["orm"]
+    }
+    await async_engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ORM round-trip writes with RETURNING.")
+    parser.add_argument("--writes", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
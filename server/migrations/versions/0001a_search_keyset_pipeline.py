@@ -0,0 +1,139 @@
+"""search columns, keyset indexes and the deal pipeline summary
+
+Brings a baseline (create_all) database up to what the application needed
+before the later revisions:
+
+- the generated search columns contacts.full_name, contacts.search_vector
+  and tickets.search_vector (adding a stored generated column rewrites the
+  table under an ACCESS EXCLUSIVE lock, so run this off-peak);
+- the deal_pipeline_summary table, filled once from the existing deals;
+- the keyset pagination indexes and the GIN full-text and trigram search
+  indexes, built CONCURRENTLY so writes are not blocked.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001a"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, options)
+INDEXES = [
+    ("ix_contacts_user_id_created_at_id", "contacts", ["user_id", "created_at", "id"], {}),
+    ("ix_contacts_user_id_updated_at_id", "contacts", ["user_id", "updated_at", "id"], {}),
+    ("ix_deals_created_at_id", "deals", ["created_at", "id"], {}),
+    ("ix_deals_updated_at_id", "deals", ["updated_at", "id"], {}),
+    ("ix_tickets_created_at_id", "tickets", ["created_at", "id"], {}),
+    ("ix_tickets_updated_at_id", "tickets", ["updated_at", "id"], {}),
+    (
+        "ix_contacts_search_vector",
+        "contacts",
+        ["search_vector"],
+        {"postgresql_using": "gin"},
+    ),
+    (
+        "ix_contacts_full_name_trgm",
+        "contacts",
+        ["full_name"],
+        {"postgresql_using": "gin", "postgresql_ops": {"full_name": "gin_trgm_ops"}},
+    ),
+    (
+        "ix_contacts_email_trgm",
+        "contacts",
+        ["email"],
+        {"postgresql_using": "gin", "postgresql_ops": {"email": "gin_trgm_ops"}},
+    ),
+    (
+        "ix_tickets_search_vector",
+        "tickets",
+        ["search_vector"],
+        {"postgresql_using": "gin"},
+    ),
+]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column(
+        "contacts",
+        sa.Column(
+            "full_name",
+            sa.String(),
+            sa.Computed("first_name || ' ' || last_name", persisted=True),
+        ),
+    )
+    op.add_column(
+        "contacts",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "to_tsvector('simple', first_name || ' ' || last_name || ' ' "
+                "|| coalesce(email, '') || ' ' || coalesce(phone, ''))",
+                persisted=True,
+            ),
+        ),
+    )
+    op.add_column(
+        "tickets",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', subject), 'A') "
+                "|| setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+        ),
+    )
+
+    op.create_table(
+        "deal_pipeline_summary",
+        sa.Column("user_id", sa.Integer(), primary_key=True),
+        sa.Column("status", sa.String(), primary_key=True),
+        sa.Column("deal_count", sa.Integer(), nullable=False),
+        sa.Column("total_amount", sa.Float(), nullable=False),
+    )
+    # What PipelineService.rebuild() computes. Deals have no owner_id until
+    # 0003, so the owner is read through the contact (0003 copies the same
+    # value into owner_id). The SHARE lock holds deal writes until commit.
+    op.execute("LOCK TABLE deals IN SHARE MODE")
+    op.execute(
+        """
+        INSERT INTO deal_pipeline_summary (user_id, status, deal_count, total_amount)
+        SELECT c.user_id, coalesce(d.status, ''), count(d.id), coalesce(sum(d.amount), 0.0)
+        FROM deals d
+        JOIN contacts c ON c.id = d.contact_id
+        WHERE c.user_id IS NOT NULL
+        GROUP BY c.user_id, coalesce(d.status, '')
+        """
+    )
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **options,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    op.drop_table("deal_pipeline_summary")
+    op.drop_column("tickets", "search_vector")
+    op.drop_column("contacts", "search_vector")
+    op.drop_column("contacts", "full_name")
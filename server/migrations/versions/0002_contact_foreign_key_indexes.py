@@ -0,0 +1,70 @@
+"""index contact foreign keys and cascade contact deletes
+
+deals.contact_id and tickets.contact_id had no index, so every contact
+delete scanned both tables. The indexes are built CONCURRENTLY to avoid
+blocking writes; the foreign keys are re-added NOT VALID and validated
+afterwards, which only needs a SHARE UPDATE EXCLUSIVE lock.
+
+contacts.user_id is already the leading column of the
+(user_id, created_at, id) index, so it gets no separate index.
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001a"
+branch_labels = None
+depends_on = None
+
+FOREIGN_KEYS = [("deals", "deals_contact_id_fkey"), ("tickets", "tickets_contact_id_fkey")]
+
+
+def _replace_foreign_key(table, name, on_delete):
+    op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}")
+    op.execute(
+        f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY (contact_id) "
+        f"REFERENCES contacts (id){on_delete} NOT VALID"
+    )
+
+
+def _validate():
+    # Validating in its own transaction releases the ACCESS EXCLUSIVE lock
+    # taken by ADD CONSTRAINT before the tables are scanned.
+    with op.get_context().autocommit_block():
+        for table, name in FOREIGN_KEYS:
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        for table, _ in FOREIGN_KEYS:
+            op.create_index(
+                f"ix_{table}_contact_id",
+                table,
+                ["contact_id"],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+    for table, name in FOREIGN_KEYS:
+        _replace_foreign_key(table, name, " ON DELETE CASCADE")
+    _validate()
+
+
+def downgrade():
+    for table, name in FOREIGN_KEYS:
+        _replace_foreign_key(table, name, "")
+    _validate()
+
+    with op.get_context().autocommit_block():
+        for table, _ in FOREIGN_KEYS:
+            op.drop_index(
+                f"ix_{table}_contact_id",
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,119 @@
+"""owner_id on deals and tickets
+
+Deals and tickets get the user_id of their contact as owner_id, so lists
+and ownership checks are scoped with one index lookup instead of a join
+through contacts. The column is backfilled in committed batches of
+BATCH_SIZE rows, so no long transaction holds row locks. Only then are the
+(owner_id, created_at, id) and (owner_id, updated_at, id) indexes built
+CONCURRENTLY; they replace the unscoped (created_at, id) and
+(updated_at, id) indexes.
+
+A BEFORE INSERT trigger fills owner_id when a writer leaves it out, which
+covers workers still running the previous release during the rollout.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+TABLES = ["deals", "tickets"]
+BATCH_SIZE = 10000
+
+
+def _backfill(table):
+    # COMMIT inside DO needs PostgreSQL 11+ and no surrounding transaction.
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            batch_start bigint := 0;
+            last_id bigint;
+        BEGIN
+            SELECT coalesce(max(id), 0) INTO last_id FROM {table};
+            WHILE batch_start <= last_id LOOP
+                UPDATE {table} t SET owner_id = c.user_id
+                FROM contacts c
+                WHERE c.id = t.contact_id
+                  AND t.owner_id IS NULL
+                  AND t.id >= batch_start AND t.id < batch_start + {BATCH_SIZE};
+                batch_start := batch_start + {BATCH_SIZE};
+                COMMIT;
+            END LOOP;
+        END $$
+        """
+    )
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column("owner_id", sa.Integer(), nullable=True))
+
+    op.execute(
+        """
+        CREATE FUNCTION set_owner_from_contact() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.owner_id IS NULL THEN
+                SELECT user_id INTO NEW.owner_id FROM contacts WHERE id = NEW.contact_id;
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_set_owner BEFORE INSERT ON {table} "
+            "FOR EACH ROW EXECUTE FUNCTION set_owner_from_contact()"
+        )
+
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            _backfill(table)
+        for table in TABLES:
+            for column in ("created_at", "updated_at"):
+                op.create_index(
+                    f"ix_{table}_owner_id_{column}_id",
+                    table,
+                    ["owner_id", column, "id"],
+                    postgresql_concurrently=True,
+                    if_not_exists=True,
+                )
+                op.drop_index(
+                    f"ix_{table}_{column}_id",
+                    table_name=table,
+                    postgresql_concurrently=True,
+                    if_exists=True,
+                )
+        for table in TABLES:
+            op.execute(f"ANALYZE {table}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            for column in ("created_at", "updated_at"):
+                op.create_index(
+                    f"ix_{table}_{column}_id",
+                    table,
+                    [column, "id"],
+                    postgresql_concurrently=True,
+                    if_not_exists=True,
+                )
+                op.drop_index(
+                    f"ix_{table}_owner_id_{column}_id",
+                    table_name=table,
+                    postgresql_concurrently=True,
+                    if_exists=True,
+                )
+
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_set_owner ON {table}")
+        op.drop_column(table, "owner_id")
+    op.execute("DROP FUNCTION IF EXISTS set_owner_from_contact()")
@@ -0,0 +1,49 @@
+"""order a contact's deals and tickets by the contact_id index
+
+The contact detail view reads a contact's newest deals and tickets. The
+(contact_id) indexes become (contact_id, created_at, id), which still cover
+the foreign keys and also return the rows in that order, so the per-contact
+limit stops after the first rows instead of sorting all of them. The new
+indexes are built CONCURRENTLY before the old ones are dropped.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+TABLES = ["deals", "tickets"]
+
+
+def _swap(table, create, columns, drop):
+    op.create_index(
+        create, table, columns, postgresql_concurrently=True, if_not_exists=True
+    )
+    op.drop_index(drop, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            _swap(
+                table,
+                f"ix_{table}_contact_id_created_at_id",
+                ["contact_id", "created_at", "id"],
+                f"ix_{table}_contact_id",
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            _swap(
+                table,
+                f"ix_{table}_contact_id",
+                ["contact_id"],
+                f"ix_{table}_contact_id_created_at_id",
+            )
@@ -0,0 +1,58 @@
+"""background jobs and soft-deleted users
+
+Adds the jobs table read by the in-process JobRunner, which purges deleted
+contacts and accounts in committed batches. users.deleted_at marks an
+account whose purge is pending; adding a nullable column without a default
+only touches the catalog.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+UNFINISHED = sa.text("status IN ('queued', 'running')")
+
+
+def upgrade():
+    op.add_column("users", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("target_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("step", sa.String(), nullable=True),
+        sa.Column("total", sa.Integer(), nullable=True),
+        sa.Column("processed", sa.Integer(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("run_after", sa.DateTime(), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_jobs_user_id_id", "jobs", ["user_id", "id"])
+    op.create_index(
+        "ix_jobs_unfinished_run_after", "jobs", ["run_after"], postgresql_where=UNFINISHED
+    )
+    op.create_index(
+        "uq_jobs_unfinished_kind_target_id",
+        "jobs",
+        ["kind", "target_id"],
+        unique=True,
+        postgresql_where=UNFINISHED,
+    )
+
+
+def downgrade():
+    op.drop_table("jobs")
+    op.drop_column("users", "deleted_at")
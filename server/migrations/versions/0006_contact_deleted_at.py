@@ -0,0 +1,25 @@
+"""soft-deleted contacts
+
+contacts.deleted_at marks a contact whose purge job is pending, so list,
+search and detail reads hide it at once. Adding a nullable column without
+a default only touches the catalog.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("contacts", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("contacts", "deleted_at")
@@ -1,72 +1,414 @@
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
 from http.server import BaseHTTPRequestHandler, HTTPServer
-import requests 
+import requests
+from requests.adapters import HTTPAdapter
+import json
 import logging
-from urllib.parse import urlparse
+import os
+import threading
+import time
+from typing import Optional
+from proxy.response_cache import CacheEntry, ResponseCache, parse_route_ttls
 
 # Logging ayarları
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+UPSTREAM_URL = os.getenv("PROXY_UPSTREAM_URL", "http://localhost:8000")
+MAX_WORKERS = int(os.getenv("PROXY_MAX_WORKERS", "64"))
+MAX_CONNECTIONS = int(os.getenv("PROXY_MAX_CONNECTIONS", "32"))
+# Accepted connections allowed to wait for a free worker; beyond that new
+# clients get an immediate 503 instead of timing out in the queue.
+MAX_QUEUED = int(os.getenv("PROXY_MAX_QUEUED", "128"))
+UPSTREAM_TIMEOUT = float(os.getenv("PROXY_UPSTREAM_TIMEOUT", "30"))
+CLIENT_IDLE_TIMEOUT = float(os.getenv("PROXY_CLIENT_IDLE_TIMEOUT", "15"))
+CHUNK_SIZE = 64 * 1024
+
+CACHE_ENABLED = os.getenv("PROXY_CACHE_ENABLED", "0") == "1"
+CACHE_ROUTE_TTLS = parse_route_ttls(
+    os.getenv("PROXY_CACHE_TTLS", "/api/v1/contact=5,/api/v1/deal=5,/api/v1/ticket=5")
+)
+CACHE_MAX_BYTES = int(os.getenv("PROXY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_MAX_ENTRY_BYTES = int(os.getenv("PROXY_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+CACHE_WAIT_TIMEOUT = float(os.getenv("PROXY_CACHE_WAIT_TIMEOUT", "10"))
+# Deleting a contact also deletes its deals and tickets. Contact responses
+# can embed a contact's deals and tickets and their counts (include=), so
+# deal and ticket writes clear them too.
+CACHE_INVALIDATES = {
+    "/api/v1/contact": ("/api/v1/contact", "/api/v1/deal", "/api/v1/ticket"),
+    "/api/v1/deal": ("/api/v1/deal", "/api/v1/contact"),
+    "/api/v1/ticket": ("/api/v1/ticket", "/api/v1/contact"),
+}
+STATS_PATH = "/__proxy/stats"
+OVERLOADED_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Type: text/plain\r\n"
+    b"Content-Length: 19\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+    b"Service Unavailable"
+)
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Connection-level headers that must not be forwarded (RFC 9110, 7.6.1).
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+}
+
+
+def build_upstream_session(max_connections: int) -> requests.Session:
+    session = requests.Session()
+    # Only the client's own headers are forwarded; requests' defaults such as
+    # Accept-Encoding would otherwise change what the backend sends back.
+    session.headers.clear()
+    # The session is shared by every client, so it must never keep cookies.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.trust_env = False
+    adapter = HTTPAdapter(
+        pool_connections=1, pool_maxsize=max_connections, pool_block=True, max_retries=0
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class _BodyReader:
+    # File-like view over the next `length` bytes of the client socket, so
+    # the upstream request body is sent in blocks instead of being buffered.
+    def __init__(self, rfile, length: int):
+        self.rfile = rfile
+        self.length = length
+        self.remaining = length
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.rfile.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def _read_chunked(rfile):
+    while True:
+        size = int(rfile.readline().split(b";", 1)[0].strip(), 16)
+        if size == 0:
+            # Skip optional trailers up to the terminating empty line.
+            while rfile.readline() not in (b"\r\n", b"\n", b""):
+                pass
+            return
+        yield rfile.read(size)
+        rfile.readline()
+
+
 class ProxyHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        # Gelen isteği logla
-        logger.info(f"Gelen GET isteği: {self.path}")
+    protocol_version = "HTTP/1.1"
+    timeout = CLIENT_IDLE_TIMEOUT
 
-        # İsteği hedef sunucuya yönlendir
-        response = requests.get(f"http://localhost:8000{self.path}")
+    def do_GET(self):
+        if self.path == STATS_PATH:
+            self._send_stats()
+        elif self.server.cache is not None and self.server.cache.ttl_for(self.path) is not None:
+            self._proxy_cached()
+        else:
+            self._proxy()
 
-        # Hedef sunucunun cevabını geri döndür
-        self.send_response(response.status_code)
-        self.end_headers()
-        self.wfile.write(response.content)
+    def do_HEAD(self):
+        self._proxy()
 
     def do_POST(self):
-        # Gelen POST isteğini logla
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length).decode('utf-8')
-        logger.info(f"Gelen POST isteği: {self.path} - Veriler: {post_data}")
+        self._proxy()
 
-        # İsteği hedef sunucuya yönlendir
-        headers = {key: value for (key, value) in self.headers.items()}
-        response = requests.post(f"http://localhost:8000{self.path}", data=post_data, headers=headers)
+    def do_PUT(self):
+        self._proxy()
 
-        # Hedef sunucunun cevabını geri döndür
-        self.send_response(response.status_code)
-        self.end_headers()
-        self.wfile.write(response.content)
+    def do_PATCH(self):
+        self._proxy()
 
-    def do_PUT(self):
-        # Gelen PUT isteğini logla
-        content_length = int(self.headers['Content-Length'])
-        put_data = self.rfile.read(content_length).decode('utf-8')
-        logger.info(f"Gelen PUT isteği: {self.path} - Veriler: {put_data}")
+    def do_DELETE(self):
+        self._proxy()
 
-        # İsteği hedef sunucuya yönlendir
-        headers = {key: value for (key, value) in self.headers.items()}
-        response = requests.put(f"http://localhost:8000{self.path}", data=put_data, headers=headers)
+    def do_OPTIONS(self):
+        self._proxy()
 
-        # Hedef sunucunun cevabını geri döndür
-        self.send_response(response.status_code)
+    def _request_body(self):
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            return _read_chunked(self.rfile)
+        length = int(self.headers.get("Content-Length") or 0)
+        return _BodyReader(self.rfile, length) if length else None
+
+    def _request_headers(self):
+        headers = {
+            key: value
+            for key, value in self.headers.items()
+            if key.lower() not in HOP_BY_HOP_HEADERS and key.lower() != "host"
+        }
+        forwarded_for = self.headers.get("X-Forwarded-For")
+        client_ip = self.client_address[0]
+        headers["X-Forwarded-For"] = (
+            f"{forwarded_for}, {client_ip}" if forwarded_for else client_ip
+        )
+        return headers
+
+    def _send_stats(self):
+        cache = self.server.cache
+        body = json.dumps(
+            {"cache": cache.stats() if cache else None, "rejected": self.server.rejected}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
-        self.wfile.write(response.content)
+        self.wfile.write(body)
 
-    def do_DELETE(self):
-        # Gelen DELETE isteğini logla
-        logger.info(f"Gelen DELETE isteği: {self.path}")
+    def _send_cached(self, entry: CacheEntry):
+        etag = next((value for key, value in entry.headers if key.lower() == "etag"), None)
+        if etag and self._etag_matches(etag):
+            self.log_request(304)
+            self.send_response_only(304)
+            self.send_header("ETag", etag)
+            self.send_header("X-Proxy-Cache", "HIT")
+            self.end_headers()
+            return
+        self.log_request(entry.status)
+        self.send_response_only(entry.status, entry.reason)
+        for key, value in entry.headers:
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(entry.body)))
+        self.send_header("Age", str(int(time.monotonic() - entry.stored_at)))
+        self.send_header("X-Proxy-Cache", "HIT")
+        self.end_headers()
+        self.wfile.write(entry.body)
+
+    def _etag_matches(self, etag: str) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+    def _proxy_cached(self):
+        cache = self.server.cache
+        key = cache.key(
+            self.command,
+            self.path,
+            self.headers.get("Cookie"),
+            self.headers.get("Accept-Encoding", ""),
+        )
+        if "no-cache" not in self.headers.get("Cache-Control", ""):
+            entry = cache.get(key)
+            if entry is not None:
+                logger.debug(f"Cache hit: {self.path}")
+                self._send_cached(entry)
+                return
+
+        leader, event, generation = cache.begin(key)
+        if not leader:
+            # Another worker is already fetching this response; wait for it
+            # instead of sending a duplicate request upstream.
+            event.wait(CACHE_WAIT_TIMEOUT)
+            entry = cache.get(key)
+            if entry is not None:
+                self._send_cached(entry)
+            else:
+                self._proxy()
+            return
+
+        try:
+            self._proxy(
+                on_complete=lambda status, reason, headers, body: self._store(
+                    key, generation, status, reason, headers, body
+                )
+            )
+        finally:
+            cache.end(key)
+
+    def _store(self, key, generation, status, reason, headers, body):
+        cache_control = {k.lower(): v for k, v in headers}.get("cache-control", "").lower()
+        if status != 200 or "no-store" in cache_control:
+            return
+        if any(name.lower() == "set-cookie" for name, _ in headers):
+            return
+        headers = [(k, v) for k, v in headers if k.lower() not in ("content-length", "date")]
+        ttl = self.server.cache.ttl_for(self.path)
+        self.server.cache.put(key, CacheEntry(status, reason, headers, body, ttl), generation)
+
+    def _proxy(self, on_complete=None):
+        # Gelen isteği logla
+        logger.info(f"Gelen {self.command} isteği: {self.path}")
+
+        cache = self.server.cache
+        if cache is not None and self.command in MUTATING_METHODS:
+            cache.invalidate(self.path)
 
         # İsteği hedef sunucuya yönlendir
-        response = requests.delete(f"http://localhost:8000{self.path}")
+        try:
+            upstream = self.server.session.request(
+                self.command,
+                f"{self.server.upstream_url}{self.path}",
+                headers=self._request_headers(),
+                data=self._request_body(),
+                stream=True,
+                allow_redirects=False,
+                timeout=self.server.upstream_timeout,
+            )
+        except requests.RequestException as e:
+            logger.error(f"Upstream isteği başarısız: {self.command} {self.path} - {e}")
+            self.close_connection = True
+            self.send_error(502, "Bad Gateway")
+            return
 
         # Hedef sunucunun cevabını geri döndür
-        self.send_response(response.status_code)
+        try:
+            self._relay(upstream, on_complete)
+        finally:
+            upstream.close()
+            # Invalidate again once the write has been applied, so a read
+            # racing with it cannot leave a stale entry behind.
+            if cache is not None and self.command in MUTATING_METHODS:
+                cache.invalidate(self.path)
+
+    def _relay(self, upstream: requests.Response, on_complete=None):
+        status_code = upstream.status_code
+        self.log_request(status_code)
+        self.send_response_only(status_code, upstream.reason)
+
+        has_body = self.command != "HEAD" and status_code >= 200 and status_code not in (204, 304)
+        headers = [
+            (key, value)
+            for key, value in upstream.raw.headers.iteritems()
+            if key.lower() not in HOP_BY_HOP_HEADERS
+        ]
+        chunked = has_body and "content-length" not in upstream.raw.headers
+        for key, value in headers:
+            self.send_header(key, value)
+        if on_complete is not None:
+            self.send_header("X-Proxy-Cache", "MISS")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
         self.end_headers()
-        self.wfile.write(response.content)
 
-def run(server_class=HTTPServer, handler_class=ProxyHandler, port=8080):
+        if not has_body:
+            return
+        # Stream the body as it arrives; content encoding is passed through
+        # untouched since the client negotiated it with the backend. When the
+        # response is a cache candidate, a copy is kept up to the entry limit.
+        captured, captured_size = [], 0
+        for chunk in upstream.raw.stream(CHUNK_SIZE, decode_content=False):
+            if not chunk:
+                continue
+            if chunked:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            else:
+                self.wfile.write(chunk)
+            if on_complete is not None and captured is not None:
+                captured_size += len(chunk)
+                if captured_size > self.server.cache.max_entry_bytes:
+                    captured = None
+                else:
+                    captured.append(chunk)
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
+        if on_complete is not None and captured is not None:
+            on_complete(status_code, upstream.reason, headers, b"".join(captured))
+
+
+class PooledProxyServer(HTTPServer):
+    # Each accepted client connection is served by a bounded worker pool,
+    # while all workers share one keep-alive connection pool to the backend.
+    # At most max_queued connections wait for a worker; the rest are refused.
+    def __init__(
+        self,
+        server_address,
+        handler_class,
+        upstream_url: str = UPSTREAM_URL,
+        max_workers: int = MAX_WORKERS,
+        max_connections: int = MAX_CONNECTIONS,
+        max_queued: int = MAX_QUEUED,
+        upstream_timeout: float = UPSTREAM_TIMEOUT,
+        cache: Optional[ResponseCache] = None,
+    ):
+        super().__init__(server_address, handler_class)
+        self.upstream_url = upstream_url.rstrip("/")
+        self.upstream_timeout = upstream_timeout
+        self.session = build_upstream_session(max_connections)
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="proxy-worker"
+        )
+        self.slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self.rejected = 0
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            self.rejected += 1
+            self._reject(request)
+            return
+        try:
+            self.executor.submit(self._process_request_worker, request, client_address)
+        except RuntimeError:
+            # The executor is shutting down.
+            self.slots.release()
+            self.shutdown_request(request)
+
+    def _reject(self, request):
+        try:
+            request.settimeout(1)
+            request.sendall(OVERLOADED_RESPONSE)
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+def build_cache() -> Optional[ResponseCache]:
+    if not CACHE_ENABLED:
+        return None
+    return ResponseCache(
+        route_ttls=CACHE_ROUTE_TTLS,
+        max_bytes=CACHE_MAX_BYTES,
+        max_entry_bytes=CACHE_MAX_ENTRY_BYTES,
+        invalidates=CACHE_INVALIDATES,
+    )
+
+
+def run(server_class=PooledProxyServer, handler_class=ProxyHandler, port=8080):
     server_address = ('', port)
-    httpd = server_class(server_address, handler_class)
+    httpd = server_class(server_address, handler_class, cache=build_cache())
     print(f"Proxy sunucu {port} portunda başlatıldı...")
-    httpd.serve_forever()
+    try:
+        httpd.serve_forever()
+    finally:
+        if httpd.cache is not None:
+            logger.info(f"Proxy cache istatistikleri: {httpd.cache.stats()}")
+        httpd.server_close()
 
 if __name__ == "__main__":
     run()
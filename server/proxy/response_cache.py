@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import OrderedDict
+from http.cookies import CookieError, SimpleCookie
+from typing import Dict, List, Optional, Tuple
+
+CacheKey = Tuple[str, str, str, str]
+
+
+class CacheEntry:
+    __slots__ = ("status", "reason", "headers", "body", "stored_at", "expires_at", "size")
+
+    def __init__(self, status: int, reason: str, headers: List[Tuple[str, str]], body: bytes, ttl: float):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.stored_at = time.monotonic()
+        self.expires_at = self.stored_at + ttl
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers)
+
+
+def parse_route_ttls(value: str) -> Dict[str, float]:
+    # "/api/v1/contact=5,/api/v1/deal=10" -> {"/api/v1/contact": 5.0, ...}
+    ttls = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        prefix, _, ttl = item.partition("=")
+        ttls[prefix.rstrip("/")] = float(ttl)
+    return ttls
+
+
+def auth_cookie(cookie_header: Optional[str], name: str = "access_token") -> str:
+    if not cookie_header:
+        return ""
+    try:
+        cookie = SimpleCookie(cookie_header)
+    except CookieError:
+        return ""
+    morsel = cookie.get(name)
+    return morsel.value if morsel else ""
+
+
+class ResponseCache:
+    # In-memory LRU for idempotent GET responses, bounded by total bytes.
+    # Concurrent misses on the same key are coalesced: the first caller
+    # becomes the leader and fetches upstream, the rest wait for its result.
+    def __init__(
+        self,
+        route_ttls: Dict[str, float],
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 1024 * 1024,
+        invalidates: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ):
+        self.route_ttls = route_ttls
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.invalidates = invalidates or {}
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[CacheKey, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bytes_saved = 0
+
+    def ttl_for(self, path: str) -> Optional[float]:
+        route = path.split("?", 1)[0].rstrip("/")
+        best = None
+        for prefix, ttl in self.route_ttls.items():
+            if route == prefix or route.startswith(prefix + "/"):
+                if best is None or len(prefix) > len(best[0]):
+                    best = (prefix, ttl)
+        return best[1] if best else None
+
+    @staticmethod
+    def key(
+        method: str, path: str, cookie_header: Optional[str], accept_encoding: str = ""
+    ) -> CacheKey:
+        # Responses are per user (auth cookie) and per negotiated encoding.
+        return (method, path, auth_cookie(cookie_header), accept_encoding)
+
+    def get(self, key: CacheKey) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += len(entry.body)
+            return entry
+
+    def begin(self, key: CacheKey) -> Tuple[bool, threading.Event, int]:
+        with self._lock:
+            event = self._inflight.get(key)
+            if event is not None:
+                self.coalesced += 1
+                return False, event, self._generation
+            event = self._inflight[key] = threading.Event()
+            return True, event, self._generation
+
+    def end(self, key: CacheKey) -> None:
+        with self._lock:
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def put(self, key: CacheKey, entry: CacheEntry, generation: int) -> None:
+        if entry.size > self.max_entry_bytes:
+            return
+        with self._lock:
+            # A write went through while this response was in flight; it may
+            # already be stale, so do not cache it.
+            if generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.bytes += entry.size
+            while self.bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, path: str) -> None:
+        route = path.split("?", 1)[0]
+        resource = "/".join(route.split("/")[:4]).rstrip("/")
+        prefixes = self.invalidates.get(resource, (resource,))
+        with self._lock:
+            self._generation += 1
+            stale = [
+                key
+                for key in self._entries
+                if any(
+                    key[1] == prefix or key[1].startswith((prefix + "/", prefix + "?"))
+                    for prefix in prefixes
+                )
+            ]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "bytes_saved": self.bytes_saved,
+            }